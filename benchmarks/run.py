@@ -0,0 +1,303 @@
+"""Замеры горячих путей FitoPyBox на синтетических проектах с сравнением с базовым результатом.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline baseline.json    # код 1 при замедлении больше порога
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+from benchmarks.synthetic import generate_assets, generate_project, generate_requirements, history_entries
+from fitopybox.metrics import REGRESSION_THRESHOLD
+RESULTS_VERSION = 1
+SCALES = [10, 100, 1000, 10000]
+QUICK_SCALES = [10, 100, 1000]
+HISTORY_ENTRIES = 100000
+HISTORY_APPENDS = 200
+REQUIREMENT_LINES = 5000
+ASSET_FILES = 2000
+PREVIEW_CALLS = 200
+# Замеры короче этого порога не считаются замедлением: на них сильнее влияет шум системы
+NOISE_FLOOR = 0.001
+GROUPS = ["scan", "requirements", "assets", "history", "preview", "build", "startup"]
+class Suite:
+    """Набор замеров: для каждого - медиана, минимум и максимум по нескольким запускам"""
+    def __init__(self, repeat, verbose=True):
+        self.repeat = repeat
+        self.verbose = verbose
+        self.results = {}
+    def measure(self, name, function, runs=None, setup=None, **params):
+        """Время function() в секундах; setup() вызывается перед каждым запуском и в замер не входит.
+        Вывод замеряемой функции подавляется, чтобы не искажать время печатью."""
+        samples = []
+        for _ in range(runs or self.repeat):
+            if setup is not None:
+                setup()
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                function()
+                samples.append(time.perf_counter() - started)
+        result = {"median": statistics.median(samples), "min": min(samples), "max": max(samples),
+                  "runs": len(samples), "params": params}
+        self.results[name] = result
+        if self.verbose:
+            print(f"{name:<40} {format_time(result['median']):>10}  (мин. {format_time(result['min'])}, "
+                  f"запусков {result['runs']})", flush=True)
+        return result
+def format_time(seconds):
+    if seconds < 1:
+        return f"{seconds * 1000:.2f} мс"
+    return f"{seconds:.2f} с"
+def clear_cache(*parts):
+    from fitopybox.paths import cache_dir
+    shutil.rmtree(cache_dir(*parts), ignore_errors=True)
+def bench_scan(suite, root, scales):
+    """Обход импортов, extract_imports и отпечаток сборки для проектов разного размера"""
+    from fitopybox.config import BuildConfig
+    from fitopybox.deps import extract_imports, scan_project
+    from fitopybox.envindex import load_index
+    from fitopybox.fingerprint import compute_fingerprint
+    suite.measure("envindex.build", lambda: load_index(rebuild=True), runs=1)
+    suite.measure("envindex.load", load_index)
+    index = load_index()
+    for modules in scales:
+        script = generate_project(os.path.join(root, f"project{modules}"), modules)
+        runs = 1 if modules >= 10000 else None
+        suite.measure(f"scan.cold.{modules}", lambda: scan_project(script), runs=runs,
+                      setup=lambda: clear_cache("scan"), modules=modules)
+        suite.measure(f"scan.warm.{modules}", lambda: scan_project(script), runs=runs, modules=modules)
+        suite.measure(f"extract_imports.{modules}", lambda: extract_imports(script, index), runs=runs,
+                      modules=modules)
+        config = BuildConfig(script=script)
+        suite.measure(f"fingerprint.{modules}", lambda: compute_fingerprint(config), runs=runs, modules=modules)
+def bench_requirements(suite, root):
+    """Разбор большого requirements.txt с включаемыми файлами"""
+    from fitopybox.deps import declared_requirements, parse_requirements_file
+    requirements_file = generate_requirements(os.path.join(root, "requirements"), REQUIREMENT_LINES)
+    script = os.path.join(os.path.dirname(requirements_file), "main.py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write("print('ok')\n")
+    suite.measure("requirements.parse", lambda: parse_requirements_file(requirements_file),
+                  lines=REQUIREMENT_LINES)
+    suite.measure("requirements.declared", lambda: declared_requirements(script), lines=REQUIREMENT_LINES)
+def bench_assets(suite, root):
+    """Архив ресурсов: первая подготовка и повтор без изменений"""
+    from fitopybox.assets import AssetStager
+    from fitopybox.config import BuildConfig, PACKED_ASSETS
+    project = os.path.join(root, "assets_project")
+    generate_assets(os.path.join(project, "assets"), ASSET_FILES)
+    script = os.path.join(project, "main.py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write("print('ok')\n")
+    config = BuildConfig(script=script, additional_files=["assets"], asset_mode=PACKED_ASSETS,
+                         workpath=os.path.join(project, "build"))
+    os.makedirs(config.work_dir, exist_ok=True)
+    suite.measure("assets.stage.cold", lambda: AssetStager(config).stage(),
+                  setup=lambda: shutil.rmtree(config.work_dir, ignore_errors=True) or os.makedirs(config.work_dir),
+                  files=ASSET_FILES)
+    suite.measure("assets.stage.warm", lambda: AssetStager(config).stage(), files=ASSET_FILES)
+def bench_history(suite, root):
+    """История на HISTORY_ENTRIES записей: перенос build_history.json в SQLite, добавление, чтение, статистика"""
+    from fitopybox.history import (HistoryStore, LEGACY_HISTORY_FILE, add_history_entry, load_history)
+    from fitopybox.metrics import metrics_trend
+    source = os.path.join(root, "history_source.json")
+    with open(source, "w", encoding="utf-8") as f:
+        json.dump(list(history_entries(HISTORY_ENTRIES)), f)
+    history_dir = os.path.join(root, "history")
+    database = os.path.join(history_dir, "build_history.db")
+    def fresh_legacy_history():
+        shutil.rmtree(history_dir, ignore_errors=True)
+        os.makedirs(history_dir)
+        shutil.copyfile(source, os.path.join(history_dir, LEGACY_HISTORY_FILE))
+    suite.measure("history.migrate", lambda: HistoryStore(database).close(), runs=min(suite.repeat, 3),
+                  setup=fresh_legacy_history, entries=HISTORY_ENTRIES)
+    def append():
+        for number in range(HISTORY_APPENDS):
+            add_history_entry(f"pyinstaller --onefile bench{number}.py", f"/bench/bench{number}.py",
+                              path=database, status="success", metrics={"wall_time": 1.0})
+    suite.measure("history.append", append, entries=HISTORY_ENTRIES, appends=HISTORY_APPENDS)
+    def first_page():
+        with HistoryStore(database) as store:
+            store.page()
+    def search():
+        with HistoryStore(database) as store:
+            store.count(search="app7")
+            store.page(search="app7")
+    suite.measure("history.first_page", first_page, entries=HISTORY_ENTRIES)
+    suite.measure("history.search", search, entries=HISTORY_ENTRIES)
+    suite.measure("history.load_all", lambda: load_history(database), entries=HISTORY_ENTRIES)
+    entries = load_history(database)
+    suite.measure("history.stats", lambda: metrics_trend(entries), entries=HISTORY_ENTRIES)
+def bench_preview(suite, root):
+    """Построение команды PyInstaller: как в update_command_preview и, если есть PyQt6, в самом окне"""
+    from fitopybox.config import BuildConfig
+    from fitopybox.workcache import managed_config
+    script = generate_project(os.path.join(root, "preview_project"), 10)
+    def preview():
+        for _ in range(PREVIEW_CALLS):
+            managed_config(BuildConfig.from_fields(script, name="App", icon="", hidden_imports="requests, yaml",
+                                                   additional_files="assets;config.json",
+                                                   exclude_modules="tkinter")).preview()
+    suite.measure("preview.config", preview, calls=PREVIEW_CALLS)
+    try:
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        print("preview.window: пропущен (PyQt6 не установлен)")
+        return
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import main
+    app = QApplication.instance() or QApplication([])
+    window = main.FitoPyBox()
+    window.ensure_page(1, 2, 3)
+    window.file_path.setText(script)
+    # Поиск интерпретаторов идёт в фоне; замер - после его завершения
+    while any(getattr(window, name) is not None for name in ("toolchain_thread", "deps_thread", "icon_thread")):
+        app.processEvents()
+        time.sleep(0.01)
+    def update_window():
+        for _ in range(PREVIEW_CALLS):
+            window.update_command_preview()
+    suite.measure("preview.window", update_window, calls=PREVIEW_CALLS)
+    window.deleteLater()
+    app.processEvents()
+def write_hello(project):
+    os.makedirs(project, exist_ok=True)
+    script = os.path.join(project, "hello.py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write("print('hello')\n")
+    return script
+def build_script(python, script, *options):
+    """Сборка через командную строку FitoPyBox из этого репозитория"""
+    environment = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    completed = subprocess.run([python, "-m", "fitopybox", "build", script, "--python", python, *options],
+                               cwd=os.path.dirname(script), env=environment, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Сборка завершилась с кодом {completed.returncode}:\n{completed.stdout[-2000:]}")
+def bench_build(suite, root, python):
+    """Сборка простого скрипта через командную строку и проверка актуальности без изменений"""
+    script = write_hello(os.path.join(root, "build_project"))
+    try:
+        suite.measure("build.trivial", lambda: build_script(python, script, "--force", "--no-history"), runs=1)
+    except RuntimeError as e:
+        print(f"build: пропущен ({e})", file=sys.stderr)
+        return
+    suite.measure("build.up_to_date", lambda: build_script(python, script, "--no-history"))
+def bench_startup(suite, root, python):
+    """Запуск простого скрипта: обычный onefile и один файл с кэшем распаковки - первый запуск версии
+    (с распаковкой) и повторный"""
+    from fitopybox.extractcache import find_compiler
+    script = write_hello(os.path.join(root, "startup_project"))
+    executable = "hello.exe" if os.name == "nt" else "hello"
+    onefile = os.path.join(root, "startup_onefile")
+    cached = os.path.join(root, "startup_cached")
+    try:
+        build_script(python, script, "--no-history", "--distpath", onefile)
+        build_script(python, script, "--no-history", "--extract-cache", "--distpath", cached)
+    except RuntimeError as e:
+        print(f"startup: пропущен ({e})", file=sys.stderr)
+        return
+    apps = os.path.join(root, "startup_apps")
+    environment = dict(os.environ, FITOPYBOX_APP_CACHE=apps)
+    def launch(path):
+        subprocess.run([path], env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    launch(os.path.join(onefile, executable))
+    suite.measure("startup.onefile", lambda: launch(os.path.join(onefile, executable)))
+    stub = find_compiler() is not None
+    suite.measure("startup.extract_cache.first", lambda: launch(os.path.join(cached, executable)),
+                  setup=lambda: shutil.rmtree(apps, ignore_errors=True), stub=stub)
+    suite.measure("startup.extract_cache.warm", lambda: launch(os.path.join(cached, executable)), stub=stub)
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Строки сравнения с базовым результатом и список замедлившихся замеров"""
+    lines = []
+    regressions = []
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            lines.append(f"{name:<40} {format_time(result['median']):>10}  новый замер")
+            continue
+        change = (result["median"] - before["median"]) / before["median"] if before["median"] else 0
+        regressed = change > threshold and result["median"] - before["median"] > NOISE_FLOOR
+        if regressed:
+            regressions.append(name)
+        lines.append(f"{name:<40} {format_time(result['median']):>10}  было {format_time(before['median'])}, "
+                     f"{change:+.1%}{'  ЗАМЕДЛЕНИЕ' if regressed else ''}")
+    return lines, regressions
+def environment_info():
+    return {"python": sys.version.split()[0], "implementation": platform.python_implementation(),
+            "platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count()}
+def create_parser():
+    parser = argparse.ArgumentParser(description="Замеры производительности FitoPyBox")
+    parser.add_argument("--only", action="append", choices=GROUPS, default=[],
+                        help="только указанные группы замеров (можно повторять)")
+    parser.add_argument("--quick", action="store_true", help=f"без проекта на {SCALES[-1]} модулей")
+    parser.add_argument("--repeat", type=int, default=5, help="запусков каждого замера")
+    parser.add_argument("--python", default=sys.executable, help="интерпретатор с PyInstaller для замеров сборки и запуска")
+    parser.add_argument("--output", default="", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", default="", help="сравнить с сохранёнными результатами")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="допустимое замедление относительно базового результата (доля)")
+    parser.add_argument("--keep", action="store_true", help="не удалять сгенерированные проекты")
+    return parser
+def main(argv=None):
+    args = create_parser().parse_args(argv)
+    groups = args.only or GROUPS
+    root = tempfile.mkdtemp(prefix="fitopybox_bench_")
+    # Кэши FitoPyBox и история сборок - во временной папке, чтобы не затрагивать пользовательские
+    os.environ["FITOPYBOX_CACHE_DIR"] = os.path.join(root, "cache")
+    previous_dir = os.getcwd()
+    os.chdir(root)
+    suite = Suite(args.repeat)
+    print(f"Проекты и кэши: {root}")
+    try:
+        if "scan" in groups:
+            bench_scan(suite, root, QUICK_SCALES if args.quick else SCALES)
+        if "requirements" in groups:
+            bench_requirements(suite, root)
+        if "assets" in groups:
+            bench_assets(suite, root)
+        if "history" in groups:
+            bench_history(suite, root)
+        if "preview" in groups:
+            bench_preview(suite, root)
+        if "build" in groups:
+            bench_build(suite, root, args.python)
+        if "startup" in groups:
+            bench_startup(suite, root, args.python)
+    finally:
+        os.chdir(previous_dir)
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+    report = {"version": RESULTS_VERSION, "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+              "environment": environment_info(), "results": suite.results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"Результаты сохранены: {args.output}")
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("environment") != report["environment"]:
+        print("Внимание: базовый результат получен в другом окружении, сравнение может быть неточным",
+              file=sys.stderr)
+    lines, regressions = compare(suite.results, baseline.get("results", {}), args.threshold)
+    print(f"\nСравнение с {args.baseline}:")
+    print("\n".join(lines))
+    if regressions:
+        print(f"Замедлились: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Синтетические проекты для замеров: модули с импортами, большие requirements.txt и деревья ресурсов"""
+import os
+import random
+MODULES_PER_PACKAGE = 100
+STDLIB_MODULES = ["os", "sys", "json", "re", "collections", "itertools", "functools", "pathlib", "typing",
+                  "dataclasses", "logging", "subprocess", "threading", "hashlib", "datetime", "math"]
+THIRD_PARTY_MODULES = ["requests", "numpy", "yaml", "PIL", "attr", "click", "jinja2", "lxml", "pandas", "six"]
+MODULE_BODY = '''
+
+class Handler{index}:
+    """Обработчик {index}"""
+    def __init__(self, value=None):
+        self.value = value
+        self.items = []
+    def process(self, data):
+        result = []
+        for item in data:
+            if isinstance(item, dict):
+                result.append({{key: value for key, value in item.items() if value is not None}})
+            elif item:
+                result.append(item)
+        self.items.extend(result)
+        return result
+def helper_{index}(values, factor={index}):
+    total = 0
+    for value in values:
+        try:
+            total += value * factor
+        except TypeError:
+            continue
+    return total
+'''
+def package_name(index):
+    return f"pkg{index // MODULES_PER_PACKAGE}"
+def generate_project(root, modules, seed=0, fan_out=3):
+    """Проект из modules модулей в пакетах по MODULES_PER_PACKAGE. Модуль i импортирует модуль i + 1 (так
+    все модули достижимы из скрипта) и ещё до fan_out случайных модулей абсолютным или относительным импортом,
+    а также модули стандартной библиотеки и сторонние пакеты. Возвращает путь к главному скрипту."""
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    for package in sorted({package_name(index) for index in range(modules)}):
+        os.makedirs(os.path.join(root, package), exist_ok=True)
+        with open(os.path.join(root, package, "__init__.py"), "w", encoding="utf-8") as f:
+            f.write(f'"""Пакет {package}"""\n')
+    for index in range(modules):
+        package = package_name(index)
+        lines = [f"import {name}" for name in rng.sample(STDLIB_MODULES, 3)]
+        if rng.random() < 0.3:
+            lines.append(f"import {rng.choice(THIRD_PARTY_MODULES)}")
+        targets = [index + 1] if index + 1 < modules else []
+        targets.extend(rng.randrange(modules) for _ in range(rng.randint(0, fan_out)))
+        for target in targets:
+            if package_name(target) == package and rng.random() < 0.5:
+                lines.append(f"from . import mod{target}")
+            else:
+                lines.append(f"from {package_name(target)} import mod{target}")
+        with open(os.path.join(root, package, f"mod{index}.py"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + MODULE_BODY.format(index=index))
+    script = os.path.join(root, "main.py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write("import sys\nfrom pkg0 import mod0\n\nif __name__ == \"__main__\":\n    print(mod0.helper_0([1, 2, 3]))\n")
+    return script
+def generate_requirements(root, lines, includes=2, seed=0):
+    """requirements.txt из lines требований разных видов (версии, extras, маркеры, комментарии,
+    переносы строк), часть из которых вынесена во включаемые через -r файлы. Возвращает путь к файлу."""
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    files = [[] for _ in range(includes + 1)]
+    for index in range(lines):
+        name = f"package-{index}"
+        kind = index % 6
+        if kind == 0:
+            line = f"{name}=={rng.randint(0, 9)}.{rng.randint(0, 20)}.{rng.randint(0, 9)}"
+        elif kind == 1:
+            line = f"{name}[extra,other]>=1.0,<2.0"
+        elif kind == 2:
+            line = f"{name} ; python_version >= \"3.8\"  # комментарий"
+        elif kind == 3:
+            line = f"{name}~=2.1 \\\n    --hash=sha256:{rng.getrandbits(256):064x}"
+        elif kind == 4:
+            line = f"# закомментированный {name}\n{name}"
+        else:
+            line = name
+        files[index % len(files)].append(line)
+    for number in range(1, len(files)):
+        with open(os.path.join(root, f"requirements-{number}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(files[number]) + "\n")
+    path = os.path.join(root, "requirements.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("--index-url https://pypi.org/simple\n")
+        f.writelines(f"-r requirements-{number}.txt\n" for number in range(1, len(files)))
+        f.write("\n".join(files[0]) + "\n")
+    return path
+def generate_assets(root, files, size=4096, depth=3, duplicates=0.1, seed=0):
+    """Дерево ресурсов из files файлов размером около size байт во вложенных папках;
+    доля duplicates файлов повторяет содержимое других. Возвращает путь к корню дерева."""
+    rng = random.Random(seed)
+    contents = []
+    for index in range(files):
+        parts = [f"dir{rng.randrange(8)}" for _ in range(rng.randint(0, depth))]
+        directory = os.path.join(root, *parts)
+        os.makedirs(directory, exist_ok=True)
+        if contents and rng.random() < duplicates:
+            data = rng.choice(contents)
+        else:
+            data = rng.randbytes(rng.randint(size // 2, size * 3 // 2))
+            contents.append(data)
+        with open(os.path.join(directory, f"asset{index}.bin"), "wb") as f:
+            f.write(data)
+    return root
+def history_entries(count, files=50, seed=0):
+    """Записи истории сборок в формате build_history.json с метриками и профилем"""
+    rng = random.Random(seed)
+    statuses = ["success"] * 8 + ["failed", "skipped"]
+    for index in range(count):
+        file_path = f"/projects/app{index % files}/main.py"
+        yield {"timestamp": f"2025-{index % 12 + 1:02d}-{index % 28 + 1:02d} 12:{index % 60:02d}:00",
+               "command": f"pyinstaller --onefile --name app{index % files} {file_path}", "file": file_path,
+               "status": rng.choice(statuses),
+               "metrics": {"wall_time": rng.uniform(5, 60), "cpu_time": rng.uniform(5, 60),
+                           "peak_memory": rng.randint(100, 900) * 1024 * 1024,
+                           "artifact_size": rng.randint(5, 90) * 1024 * 1024,
+                           "bundled_files": rng.randint(50, 3000), "exit_status": 0},
+               "profile": {"phases": [{"name": "Analysis", "duration": rng.uniform(1, 20)},
+                                      {"name": "PKG", "duration": rng.uniform(1, 10)}], "hooks": []}}
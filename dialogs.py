@@ -0,0 +1,1286 @@
+"""Диалоги и фоновые потоки FitoPyBox; модуль загружается при первом открытии диалога или запуске сборки"""
+import os
+import threading
+import time
+from PyQt6.QtWidgets import (QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QLineEdit,
+                            QCheckBox, QFileDialog, QComboBox, QDialog, QMessageBox, QPlainTextEdit,
+                            QTableWidget, QTableWidgetItem, QHeaderView, QSpinBox, QProgressBar,
+                            QAbstractItemView, QTableView, QTreeWidget, QTreeWidgetItem)
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor, QImage, QImageReader, QPixmap
+from fitopybox.analyzer import KIND_TITLES, analyze_bundle
+from fitopybox.artifacts import find_executable
+from fitopybox.artifactstore import load_manifest as load_artifact, restore_artifact, run_artifact
+from fitopybox.buildenv import create_environment
+from fitopybox.config import BuildConfig, format_command
+from fitopybox.history import HistoryStore, add_history_entry, PAGE_SIZE as HISTORY_PAGE_SIZE
+from fitopybox.icons import ICON_SIZES, needs_conversion, prepare_icon_file
+from fitopybox.manifest import (MANIFEST_FILE, SEPARATE_MODE, SHARED_MODE, Manifest, load_manifest,
+                                prepare_shared, save_manifest)
+from fitopybox.metrics import (METRIC_FIELDS, METRIC_TITLES, REGRESSION_THRESHOLD, display_value,
+                               export_csv, export_json, metrics_trend)
+from fitopybox.pipeline import check_up_to_date, finish_build
+from fitopybox.profiling import BuildProfiler
+from fitopybox.runner import kill_process_tree, start_build_process, stream_output
+from fitopybox.service import ServiceClient
+from fitopybox.startup import (STARTUP_RUNS, STARTUP_TIMEOUT, benchmark_startup, record_startup,
+                               report_lines as startup_report_lines)
+from fitopybox.trim import SMOKE_TIMEOUT, run_trim
+from fitopybox.variants import (CRITERIA, DEFAULT_VARIANT_OPTIONS, OPTION_TITLES, VARIANT_OPTIONS, VARIANT_RUNS,
+                                rank_variants, run_matrix, unavailable_options, variant_matrix)
+from fitopybox.workcache import managed_config
+BUILD_LOG_MAX_LINES = 5000
+class TaskThread(QThread):
+    """Выполнение долгой функции вне потока интерфейса"""
+    result_ready = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
+    def __init__(self, function, *args, parent=None):
+        super().__init__(parent)
+        self.function = function
+        self.args = args
+    def run(self):
+        try:
+            self.result_ready.emit(self.function(*self.args))
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+class BuildThread(QThread):
+    """Фоновый запуск PyInstaller с построчной передачей вывода. Если задан config, здесь же до запуска
+    проверяются изменения и готовятся ресурсы и иконка, а после - сохраняется результат (finish_build);
+    итог (статус, метрики, отчёт профиля) - в result"""
+    output_received = pyqtSignal(str)
+    build_finished = pyqtSignal(int)
+    def __init__(self, command, cwd, parent=None, config=None, force=False):
+        super().__init__(parent)
+        self.command = command
+        self.cwd = cwd
+        self.config = config
+        self.force = force
+        self.fingerprint = None
+        self.process = None
+        self.cancelled = False
+        self.usage = {}
+        self.result = {}
+        self.profiler = BuildProfiler()
+    def on_line(self, line):
+        self.profiler.feed(line)
+        self.output_received.emit(line)
+    def prepare(self):
+        """Подготовка перед запуском PyInstaller; True, если сборку можно пропустить.
+        Команда строится после подготовки иконки: в ней путь к ICO из кэша иконок."""
+        self.fingerprint, up_to_date = check_up_to_date(self.config, self.force, on_line=self.output_received.emit)
+        self.command = self.config.to_command()
+        return up_to_date
+    def run(self):
+        if self.config is not None:
+            try:
+                up_to_date = self.prepare()
+            except Exception as e:
+                self.output_received.emit(f"Ошибка подготовки сборки: {e}")
+                self.result = {"status": "failed"}
+                self.build_finished.emit(-1)
+                return
+            if up_to_date:
+                self.result = {"status": "skipped"}
+                self.build_finished.emit(0)
+                return
+        try:
+            self.process = start_build_process(self.command, self.cwd)
+        except Exception as e:
+            self.output_received.emit(f"Не удалось запустить PyInstaller: {e}")
+            returncode = -1
+        else:
+            if self.cancelled:
+                kill_process_tree(self.process)
+            returncode, self.usage = stream_output(self.process, self.on_line)
+        if self.config is not None:
+            try:
+                self.finish(returncode)
+            except Exception as e:
+                # Сигнал о завершении отправляется в любом случае, иначе окно так и останется в состоянии сборки
+                self.output_received.emit(f"Ошибка сохранения результата сборки: {e}")
+                self.result = {"status": "failed"}
+                returncode = returncode or -1
+        self.build_finished.emit(returncode)
+    def finish(self, returncode):
+        """Отпечаток, упаковка в один файл, хранилище сборок и история - вне потока интерфейса"""
+        command = None if self.command == self.config.to_command() else format_command(self.command)
+        status, metrics, _ = finish_build(self.config, self.fingerprint, returncode, self.usage, self.cancelled,
+                                          profiler=self.profiler, command=command,
+                                          on_line=self.output_received.emit)
+        self.result = {"status": status, "metrics": metrics,
+                       "report": self.profiler.report_lines() if status != "cancelled" else []}
+    def cancel(self):
+        self.cancelled = True
+        if self.process is not None:
+            kill_process_tree(self.process)
+class SharedBuildThread(BuildThread):
+    """Общая сборка целей манифеста: spec-файл, иконки целей и отпечаток готовятся в потоке перед запуском"""
+    def __init__(self, manifest, options, parent=None):
+        super().__init__(None, manifest.root, parent, config=manifest.suite_config(**options))
+        self.manifest = manifest
+        self.options = options
+    def prepare(self):
+        self.config, self.command, self.fingerprint, up_to_date = prepare_shared(self.manifest, **self.options)
+        if up_to_date:
+            add_history_entry(format_command(self.command), self.config.script, status="skipped")
+        return up_to_date
+class ServiceBuildThread(QThread):
+    """Сборка через службу сборки; сигналы как у BuildThread, итог службы - в result"""
+    output_received = pyqtSignal(str)
+    build_finished = pyqtSignal(int)
+    def __init__(self, config, force=False, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.force = force
+        self.client = None
+        self.cancelled = False
+        self.result = {}
+    def on_event(self, event):
+        if event["type"] == "queued":
+            self.output_received.emit(f"Задание в очереди службы сборки (позиция {event['position']})")
+        elif event["type"] == "started":
+            self.output_received.emit("Сборка начата процессом службы")
+    def run(self):
+        try:
+            self.client = ServiceClient()
+            if self.cancelled:
+                self.result = {"status": "cancelled"}
+            else:
+                self.result = self.client.build(self.config, self.force, on_line=self.output_received.emit,
+                                                on_event=self.on_event)
+        except OSError as e:
+            self.result = {"status": "failed", "error": f"Служба сборки недоступна: {e}"}
+        if self.result.get("error"):
+            self.result["status"] = "failed"
+            self.output_received.emit(self.result["error"])
+        self.build_finished.emit(self.result.get("returncode", -1))
+    def cancel(self):
+        self.cancelled = True
+        if self.client is not None:
+            self.client.cancel()
+class EnvironmentThread(QThread):
+    """Создание изолированного окружения сборки с построчной передачей вывода pip"""
+    output_received = pyqtSignal(str)
+    result_ready = pyqtSignal(str)
+    error_occurred = pyqtSignal(str)
+    def __init__(self, python, requirements_file, parent=None):
+        super().__init__(parent)
+        self.python = python
+        self.requirements_file = requirements_file
+    def run(self):
+        try:
+            self.result_ready.emit(create_environment(self.python, self.requirements_file, self.output_received.emit))
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+class StartupBenchmarkThread(QThread):
+    """Серия запусков собранной программы с сохранением результата в историю"""
+    run_finished = pyqtSignal(str, int, object)
+    result_ready = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
+    def __init__(self, config, runs, timeout, cold, until_output, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.options = {"runs": runs, "timeout": timeout, "cold": cold, "until_output": until_output}
+    def run(self):
+        try:
+            result = benchmark_startup(self.config, on_run=self.run_finished.emit, **self.options)
+            record_startup(self.config, result)
+            self.result_ready.emit(result)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+class TrimThread(QThread):
+    """Пробная сборка с автоматическими исключениями и проверкой запуском"""
+    output_received = pyqtSignal(str)
+    result_ready = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
+    def __init__(self, config, allowlist, verify, timeout, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.allowlist = allowlist
+        self.verify = verify
+        self.timeout = timeout
+        self.process = None
+        self.cancelled = False
+    def set_process(self, process):
+        self.process = process
+        if self.cancelled:
+            kill_process_tree(process)
+    def run(self):
+        try:
+            result = run_trim(self.config, self.allowlist, verify=self.verify, timeout=self.timeout,
+                              on_line=self.output_received.emit, on_process=self.set_process)
+            self.result_ready.emit(result)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+    def cancel(self):
+        self.cancelled = True
+        if self.process is not None:
+            kill_process_tree(self.process)
+class VariantMatrixThread(QThread):
+    """Параллельная сборка вариантов и замер их запуска"""
+    output_received = pyqtSignal(str)
+    variant_updated = pyqtSignal(int, object)
+    result_ready = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
+    def __init__(self, config, names, workers, runs, timeout, force, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.names = names
+        self.options = {"workers": workers, "runs": runs, "timeout": timeout, "force": force}
+        self.stop = threading.Event()
+        self.processes = []
+    def add_process(self, process):
+        self.processes.append(process)
+        if self.stop.is_set():
+            kill_process_tree(process)
+    def run(self):
+        try:
+            results = run_matrix(self.config, self.names,
+                                 on_line=lambda label, line: self.output_received.emit(f"[{label}] {line}"),
+                                 on_variant=self.variant_updated.emit, on_process=self.add_process,
+                                 stop=self.stop, **self.options)
+            self.result_ready.emit(results)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+    def cancel(self):
+        self.stop.set()
+        for process in self.processes:
+            kill_process_tree(process)
+def load_icon_images(path, sizes):
+    """Изображения иконки нужных размеров. Выполняется в фоновом потоке (QImage, в отличие от QPixmap, это допускает):
+    PNG и SVG берутся из кэша подготовленных иконок, из ICO выбирается ближайший размер."""
+    if needs_conversion(path):
+        return {size: QImage(file) for size, file in prepare_icon_file(path).items() if size in sizes}
+    reader = QImageReader(path)
+    frames = []
+    for index in range(max(reader.imageCount(), 1)):
+        reader.jumpToImage(index)
+        image = reader.read()
+        if not image.isNull():
+            frames.append(image)
+    if not frames:
+        raise ValueError(f"Не удалось прочитать иконку: {reader.errorString()}")
+    images = {}
+    for size in sizes:
+        image = min(frames, key=lambda frame: (frame.width() < size, abs(frame.width() - size)))
+        if image.width() != size:
+            image = image.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        images[size] = image
+    return images
+class IconPreviewDialog(QDialog):
+    """Иконка во всех размерах ICO; изображения готовятся в фоне"""
+    def __init__(self, icon_path, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Предпросмотр иконки")
+        self.setMinimumSize(300, 300)
+        layout = QVBoxLayout(self)
+        self.labels = {}
+        for size in ICON_SIZES:
+            label = QLabel("…")
+            label.setToolTip(f"{size}×{size}")
+            label.setMinimumHeight(size)
+            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            layout.addWidget(label)
+            self.labels[size] = label
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+        self.load_thread = TaskThread(load_icon_images, icon_path, ICON_SIZES, parent=self)
+        self.load_thread.result_ready.connect(self.show_images)
+        self.load_thread.error_occurred.connect(self.show_error)
+        self.load_thread.start()
+    def show_images(self, images):
+        for size, label in self.labels.items():
+            if size in images:
+                label.setPixmap(QPixmap.fromImage(images[size]))
+            else:
+                label.clear()
+    def show_error(self, message):
+        for label in self.labels.values():
+            label.clear()
+        self.labels[ICON_SIZES[0]].setText(message)
+    def done(self, result):
+        if self.load_thread.isRunning():
+            self.load_thread.wait()
+        super().done(result)
+class HistoryTableModel(QAbstractTableModel):
+    """Модель истории сборок, подгружающая записи страницами по мере прокрутки"""
+    COLUMNS = ["Время", "Статус", "Файл", "Команда"]
+    STATUS_NAMES = {"success": "Успешно", "skipped": "Без изменений", "failed": "Ошибка", "cancelled": "Отменено",
+                    "benchmark": "Замер запуска"}
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.entries = []
+        self.total = 0
+        self.search = ""
+        self.status = ""
+        self.reload()
+    def reload(self):
+        self.beginResetModel()
+        self.entries = []
+        self.total = self.store.count(self.search, self.status)
+        self.endResetModel()
+    def set_filter(self, search, status):
+        self.search = search
+        self.status = status
+        self.reload()
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self.entries) < self.total
+    def fetchMore(self, parent=QModelIndex()):
+        before_id = self.entries[-1]["id"] if self.entries else None
+        page = self.store.page(before_id, HISTORY_PAGE_SIZE, self.search, self.status)
+        if not page:
+            self.total = len(self.entries)
+            return
+        self.beginInsertRows(QModelIndex(), len(self.entries), len(self.entries) + len(page) - 1)
+        self.entries.extend(page)
+        self.endInsertRows()
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return entry["timestamp"]
+            if column == 1:
+                return self.STATUS_NAMES.get(entry["status"], entry["status"])
+            if column == 2:
+                return entry["file"]
+            return entry["command"]
+        if role == Qt.ItemDataRole.ToolTipRole and index.column() >= 2:
+            return entry["file"] if index.column() == 2 else entry["command"]
+        return None
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+class BuildHistoryDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("История сборок")
+        self.setMinimumSize(900, 500)
+        self.store = HistoryStore()
+        layout = QVBoxLayout(self)
+        filter_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск по файлу или команде...")
+        self.status_filter = QComboBox()
+        self.status_filter.addItem("Все", "")
+        for status, title in HistoryTableModel.STATUS_NAMES.items():
+            self.status_filter.addItem(title, status)
+        filter_layout.addWidget(self.search_input, 1)
+        filter_layout.addWidget(self.status_filter)
+        layout.addLayout(filter_layout)
+        self.model = HistoryTableModel(self.store, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 150)
+        self.table.setColumnWidth(1, 110)
+        self.table.setColumnWidth(2, 250)
+        self.table.doubleClicked.connect(self.show_entry_details)
+        self.table.selectionModel().selectionChanged.connect(self.update_artifact_buttons)
+        layout.addWidget(self.table, 1)
+        self.count_label = QLabel()
+        layout.addWidget(self.count_label)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.apply_filter)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.status_filter.currentIndexChanged.connect(self.apply_filter)
+        button_layout = QHBoxLayout()
+        self.restore_button = QPushButton("Восстановить сборку")
+        self.restore_button.setToolTip("Скопировать сохранённый результат этой сборки в выбранную папку")
+        self.restore_button.clicked.connect(self.restore_selected)
+        self.run_button = QPushButton("Запустить сборку")
+        self.run_button.setToolTip("Запустить сохранённый результат этой сборки без пересборки")
+        self.run_button.clicked.connect(self.run_selected)
+        clear_button = QPushButton("Очистить историю")
+        clear_button.clicked.connect(self.clear_history)
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(self.restore_button)
+        button_layout.addWidget(self.run_button)
+        button_layout.addStretch(1)
+        button_layout.addWidget(clear_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        self.load_history()
+    def load_history(self):
+        self.model.reload()
+        self.update_count()
+        self.update_artifact_buttons()
+    def selected_entry(self):
+        rows = self.table.selectionModel().selectedRows()
+        return self.model.entries[rows[0].row()] if rows else None
+    def update_artifact_buttons(self):
+        entry = self.selected_entry()
+        enabled = bool(entry and entry.get("artifact_id"))
+        self.restore_button.setEnabled(enabled)
+        self.run_button.setEnabled(enabled)
+    def selected_artifact(self):
+        """Описание сохранённого результата выбранной сборки или None, если он уже удалён из хранилища"""
+        entry = self.selected_entry()
+        try:
+            return load_artifact(entry["artifact_id"])
+        except KeyError:
+            QMessageBox.warning(self, "Хранилище сборок",
+                                "Результат этой сборки удалён из хранилища (превышен размер или срок хранения)")
+            return None
+    def restore_selected(self):
+        manifest = self.selected_artifact()
+        if manifest is None:
+            return
+        directory = QFileDialog.getExistingDirectory(self, "Папка для восстановления сборки",
+                                                     os.path.dirname(manifest["output"]))
+        if not directory:
+            return
+        try:
+            path = restore_artifact(manifest["id"], directory)
+        except (KeyError, OSError) as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось восстановить сборку: {e}")
+            return
+        QMessageBox.information(self, "Сборка восстановлена", path)
+    def run_selected(self):
+        manifest = self.selected_artifact()
+        if manifest is None:
+            return
+        try:
+            run_artifact(manifest["id"], wait=False)
+        except (KeyError, OSError) as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось запустить сборку: {e}")
+    def show_entry_details(self, index):
+        entry = self.model.entries[index.row()]
+        lines = [f"Файл: {entry['file']}", f"Команда: {entry['command']}"]
+        for field, value in (entry.get("metrics") or {}).items():
+            if value is not None and field in METRIC_TITLES:
+                lines.append(f"{METRIC_TITLES[field]}: {display_value(field, value)}")
+        profile = entry.get("profile")
+        if profile:
+            lines.append("")
+            lines.append("Этапы сборки:")
+            lines.extend(f"  {phase['name']}: {phase['duration']:.2f} с" for phase in profile["phases"])
+            if profile["hooks"]:
+                lines.append("Самые долгие хуки:")
+                lines.extend(f"  {hook['module']}: {hook['duration']:.2f} с" for hook in profile["hooks"][:5])
+        if entry.get("trace"):
+            lines.append(f"Трассировка (Chrome trace): {entry['trace']}")
+        if entry.get("artifact_id"):
+            lines.append(f"Результат в хранилище сборок: {entry['artifact_id']}")
+        if entry.get("startup"):
+            lines.append("")
+            lines.extend(startup_report_lines(entry["startup"]))
+        QMessageBox.information(self, "Сборка", "\n".join(lines))
+    def apply_filter(self):
+        self.model.set_filter(self.search_input.text().strip(), self.status_filter.currentData())
+        self.update_count()
+    def update_count(self):
+        if self.model.total:
+            self.count_label.setText(f"Записей: {self.model.total}")
+        else:
+            self.count_label.setText("История пуста")
+    def clear_history(self):
+        reply = QMessageBox.question(self, "Подтверждение", 
+                                   "Вы уверены, что хотите очистить историю?",
+                                   QMessageBox.StandardButton.Yes | 
+                                   QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            self.store.clear()
+            self.load_history()
+    def done(self, result):
+        self.store.close()
+        super().done(result)
+class BuildStatsDialog(QDialog):
+    """Динамика метрик сборок по целям с выгрузкой в CSV/JSON"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Статистика сборок")
+        self.setMinimumSize(1000, 500)
+        self.rows = []
+        layout = QVBoxLayout(self)
+        target_layout = QHBoxLayout()
+        target_layout.addWidget(QLabel("Цель:"))
+        self.target_combo = QComboBox()
+        with HistoryStore() as store:
+            for file_path in store.files():
+                self.target_combo.addItem(file_path)
+        self.target_combo.currentTextChanged.connect(self.load_target)
+        target_layout.addWidget(self.target_combo, 1)
+        layout.addLayout(target_layout)
+        self.table = QTableWidget(0, len(METRIC_FIELDS) + 2)
+        self.table.setHorizontalHeaderLabels(["Время", "Статус"] + [METRIC_TITLES[field] for field in METRIC_FIELDS])
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        layout.addWidget(self.table, 1)
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+        button_layout = QHBoxLayout()
+        csv_button = QPushButton("Экспорт CSV")
+        csv_button.clicked.connect(lambda: self.export("csv"))
+        json_button = QPushButton("Экспорт JSON")
+        json_button.clicked.connect(lambda: self.export("json"))
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(csv_button)
+        button_layout.addWidget(json_button)
+        button_layout.addStretch(1)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        self.load_target(self.target_combo.currentText())
+    def load_target(self, file_path):
+        if not file_path:
+            self.rows = []
+            self.table.setRowCount(0)
+            self.summary_label.setText("Нет сборок с метриками")
+            return
+        with HistoryStore() as store:
+            entries = list(reversed(store.page(limit=-1, file_path=file_path)))
+        self.rows = metrics_trend(entries)
+        self.table.setRowCount(len(self.rows))
+        for row_index, row in enumerate(reversed(self.rows)):
+            self.table.setItem(row_index, 0, QTableWidgetItem(row["timestamp"]))
+            self.table.setItem(row_index, 1, QTableWidgetItem(HistoryTableModel.STATUS_NAMES.get(row["status"], row["status"])))
+            for column, field in enumerate(METRIC_FIELDS, start=2):
+                text = display_value(field, row[field])
+                change = row.get(f"{field}_change")
+                if text and change:
+                    text += f" ({change:+.0%})"
+                item = QTableWidgetItem(text)
+                if field in row["regressions"]:
+                    item.setBackground(QColor("#7f1d1d"))
+                self.table.setItem(row_index, column, item)
+        regressions = [row for row in self.rows if row["regressions"]]
+        summary = f"Сборок с метриками: {len(self.rows)}"
+        if regressions:
+            last = regressions[-1]
+            names = ", ".join(METRIC_TITLES[field] for field in last["regressions"])
+            summary += f". Последний скачок (> {REGRESSION_THRESHOLD:.0%}): {last['timestamp']} - {names}"
+        self.summary_label.setText(summary)
+    def export(self, file_format):
+        if not self.rows:
+            QMessageBox.warning(self, "Предупреждение", "Нет данных для экспорта")
+            return
+        file_name, _ = QFileDialog.getSaveFileName(self, "Экспорт статистики", f"build_stats.{file_format}",
+                                                   f"{file_format.upper()} Files (*.{file_format})")
+        if not file_name:
+            return
+        try:
+            (export_csv if file_format == "csv" else export_json)(self.rows, file_name)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {e}")
+class BundleAnalysisDialog(QDialog):
+    """Состав собранного файла по пакетам и подсказки по исключению модулей"""
+    def __init__(self, config, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Анализ размера сборки")
+        self.setMinimumSize(900, 650)
+        self.selected_modules = []
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel("Анализ сборки...")
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Пакет / файл", "Тип", "Размер, МБ", "Доля"])
+        self.tree.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.tree, 2)
+        layout.addWidget(QLabel("Можно попробовать исключить (проверьте работу программы после пересборки):"))
+        self.suggestions_table = QTableWidget(0, 4)
+        self.suggestions_table.setHorizontalHeaderLabels(["Модуль", "Экономия, МБ", "Причина", "Импортирован из"])
+        self.suggestions_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.suggestions_table.verticalHeader().setVisible(False)
+        self.suggestions_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.suggestions_table, 1)
+        button_layout = QHBoxLayout()
+        self.apply_button = QPushButton("Добавить в исключения")
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(self.apply_selection)
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.reject)
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.apply_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        self.analysis_thread = TaskThread(analyze_bundle, config, parent=self)
+        self.analysis_thread.result_ready.connect(self.show_report)
+        self.analysis_thread.error_occurred.connect(
+            lambda message: self.summary_label.setText(f"Не удалось проанализировать сборку: {message}"))
+        self.analysis_thread.start()
+    def show_report(self, report):
+        total = report.total
+        if not report.entries:
+            self.summary_label.setText("Файлы сборки не найдены. Сначала соберите скрипт.")
+            return
+        summary = f"Размер содержимого: {display_value('artifact_size', total)} МБ, файлов: {len(report.entries)}"
+        if report.missing:
+            summary += f". Отсутствующих модулей: {len(report.missing)}"
+        self.summary_label.setText(summary)
+        for group in report.groups():
+            group_item = QTreeWidgetItem([group["name"], "", display_value("artifact_size", group["size"]),
+                                          f"{group['size'] / total:.1%}" if total else ""])
+            for entry in group["entries"]:
+                QTreeWidgetItem(group_item, [entry["name"], KIND_TITLES.get(entry["kind"], entry["kind"]),
+                                             f"{entry['size'] / (1024 * 1024):.2f}",
+                                             f"{entry['size'] / total:.1%}" if total else ""])
+            self.tree.addTopLevelItem(group_item)
+        self.suggestions_table.setRowCount(len(report.suggestions))
+        for row, suggestion in enumerate(report.suggestions):
+            module_item = QTableWidgetItem(suggestion["module"])
+            module_item.setFlags(module_item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            module_item.setCheckState(Qt.CheckState.Unchecked)
+            self.suggestions_table.setItem(row, 0, module_item)
+            self.suggestions_table.setItem(row, 1, QTableWidgetItem(display_value("artifact_size", suggestion["size"])))
+            self.suggestions_table.setItem(row, 2, QTableWidgetItem(suggestion["reason"]))
+            self.suggestions_table.setItem(row, 3, QTableWidgetItem(", ".join(suggestion["imported_by"])))
+        self.apply_button.setEnabled(bool(report.suggestions))
+    def apply_selection(self):
+        self.selected_modules = [self.suggestions_table.item(row, 0).text()
+                                 for row in range(self.suggestions_table.rowCount())
+                                 if self.suggestions_table.item(row, 0).checkState() == Qt.CheckState.Checked]
+        self.accept()
+    def done(self, result):
+        if self.analysis_thread.isRunning():
+            self.analysis_thread.wait()
+        super().done(result)
+class StartupBenchmarkDialog(QDialog):
+    """Замер времени запуска собранной программы (медиана и p95)"""
+    def __init__(self, config, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Замер запуска")
+        self.setMinimumSize(700, 450)
+        self.config = config
+        self.benchmark_thread = None
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"Файл: {find_executable(config) or config.artifact_path}"))
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(QLabel("Запусков в серии:"))
+        self.runs_spin = QSpinBox()
+        self.runs_spin.setRange(1, 100)
+        self.runs_spin.setValue(STARTUP_RUNS)
+        options_layout.addWidget(self.runs_spin)
+        options_layout.addWidget(QLabel("Ожидание, с:"))
+        self.timeout_spin = QSpinBox()
+        self.timeout_spin.setRange(1, 600)
+        self.timeout_spin.setValue(STARTUP_TIMEOUT)
+        options_layout.addWidget(self.timeout_spin)
+        options_layout.addStretch(1)
+        layout.addLayout(options_layout)
+        self.cold_check = QCheckBox("Холодный запуск (сброс кэша файлов сборки, где это позволяет ОС)")
+        self.cold_check.setChecked(True)
+        layout.addWidget(self.cold_check)
+        self.until_output_check = QCheckBox("Останавливать программу после первого вывода (для программ, которые не завершаются сами)")
+        layout.addWidget(self.until_output_check)
+        self.progress_bar = QProgressBar()
+        layout.addWidget(self.progress_bar)
+        self.report = QPlainTextEdit()
+        self.report.setReadOnly(True)
+        layout.addWidget(self.report, 1)
+        button_layout = QHBoxLayout()
+        self.start_button = QPushButton("Начать замер")
+        self.start_button.clicked.connect(self.start_benchmark)
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.reject)
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.start_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+    def start_benchmark(self):
+        runs = self.runs_spin.value()
+        series = (2 if self.cold_check.isChecked() else 1) + (1 if self.config.cached_onefile else 0)
+        self.progress_bar.setRange(0, runs * series)
+        self.progress_bar.setValue(0)
+        self.report.clear()
+        self.start_button.setEnabled(False)
+        self.benchmark_thread = StartupBenchmarkThread(self.config, runs, self.timeout_spin.value(),
+                                                       self.cold_check.isChecked(),
+                                                       self.until_output_check.isChecked(), parent=self)
+        self.benchmark_thread.run_finished.connect(self.on_run_finished)
+        self.benchmark_thread.result_ready.connect(self.on_benchmark_finished)
+        self.benchmark_thread.error_occurred.connect(self.on_benchmark_error)
+        self.benchmark_thread.start()
+    def on_run_finished(self, series, index, sample):
+        self.progress_bar.setValue(self.progress_bar.value() + 1)
+        title = {"first": "первый", "cold": "холодный"}.get(series, "тёплый")
+        self.report.appendPlainText(f"{title} #{index + 1}: {sample['wall_time'] * 1000:.1f} мс")
+    def on_benchmark_finished(self, result):
+        self.progress_bar.setValue(self.progress_bar.maximum())
+        self.report.appendPlainText("")
+        self.report.appendPlainText("\n".join(startup_report_lines(result)))
+        self.report.appendPlainText("Результат сохранён в историю сборок.")
+        self.start_button.setEnabled(True)
+    def on_benchmark_error(self, message):
+        self.report.appendPlainText(f"Ошибка замера: {message}")
+        self.start_button.setEnabled(True)
+    def done(self, result):
+        if self.benchmark_thread is not None and self.benchmark_thread.isRunning():
+            self.benchmark_thread.wait()
+        super().done(result)
+class TrimDialog(QDialog):
+    """Агрессивная обрезка: исключение модулей, недостижимых из скрипта, с проверкой запуском"""
+    STATUS_TEXTS = {
+        "success": "Обрезанная сборка запускается без ошибок",
+        "unverified": "Обрезанная сборка создана без проверки запуском",
+        "build_failed": "PyInstaller завершился с ошибкой",
+        "smoke_failed": "Обрезанная сборка не запускается; добавьте нужные модули в разрешённые"
+    }
+    def __init__(self, config, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Агрессивная обрезка сборки")
+        self.setMinimumSize(800, 550)
+        self.config = config
+        self.trim_thread = None
+        self.selected_modules = []
+        layout = QVBoxLayout(self)
+        description = QLabel("Модули, до которых нельзя дойти от скрипта без необязательных импортов "
+                             "(в функциях, в try/except ImportError, под TYPE_CHECKING), исключаются. "
+                             "Пробная сборка создаётся в build/trim и проверяется запуском.")
+        description.setWordWrap(True)
+        layout.addWidget(description)
+        layout.addWidget(QLabel("Не исключать (через запятую, например модули, загружаемые динамически):"))
+        self.allowlist = QLineEdit()
+        layout.addWidget(self.allowlist)
+        options_layout = QHBoxLayout()
+        self.verify_check = QCheckBox("Проверять запуском")
+        self.verify_check.setChecked(True)
+        options_layout.addWidget(self.verify_check)
+        options_layout.addWidget(QLabel("Ожидание, с:"))
+        self.timeout_spin = QSpinBox()
+        self.timeout_spin.setRange(1, 600)
+        self.timeout_spin.setValue(SMOKE_TIMEOUT)
+        options_layout.addWidget(self.timeout_spin)
+        options_layout.addStretch(1)
+        layout.addLayout(options_layout)
+        self.log = QPlainTextEdit()
+        self.log.setReadOnly(True)
+        self.log.setMaximumBlockCount(BUILD_LOG_MAX_LINES)
+        layout.addWidget(self.log, 1)
+        self.result_label = QLabel()
+        self.result_label.setWordWrap(True)
+        layout.addWidget(self.result_label)
+        button_layout = QHBoxLayout()
+        self.start_button = QPushButton("Начать")
+        self.start_button.clicked.connect(self.start_trim)
+        self.apply_button = QPushButton("Добавить в исключения")
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(self.accept)
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.reject)
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.start_button)
+        button_layout.addWidget(self.apply_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+    def start_trim(self):
+        self.log.clear()
+        self.result_label.clear()
+        self.start_button.setEnabled(False)
+        self.apply_button.setEnabled(False)
+        allowlist = [module.strip() for module in self.allowlist.text().split(",") if module.strip()]
+        self.trim_thread = TrimThread(self.config, allowlist, self.verify_check.isChecked(),
+                                      self.timeout_spin.value(), parent=self)
+        self.trim_thread.output_received.connect(self.log.appendPlainText)
+        self.trim_thread.result_ready.connect(self.on_trim_finished)
+        self.trim_thread.error_occurred.connect(self.on_trim_error)
+        self.trim_thread.start()
+    def on_trim_finished(self, result):
+        self.start_button.setEnabled(True)
+        lines = [self.STATUS_TEXTS.get(result["status"], result["status"]),
+                 f"Исключается модулей: {len(result['excludes'])}"]
+        if result["size_before"] and result["size_after"]:
+            lines.append(f"Размер: {display_value('artifact_size', result['size_before'])} МБ → "
+                         f"{display_value('artifact_size', result['size_after'])} МБ")
+        if result["allowlist"]:
+            lines.append("Разрешены после проверки: " + ", ".join(result["allowlist"]))
+            self.allowlist.setText(", ".join(result["allowlist"]))
+        if result["smoke"] and not result["smoke"]["ok"]:
+            self.log.appendPlainText(result["smoke"]["output"])
+        self.result_label.setText("\n".join(lines))
+        if result["status"] in ("success", "unverified"):
+            self.selected_modules = result["excludes"]
+            self.apply_button.setEnabled(True)
+    def on_trim_error(self, message):
+        self.start_button.setEnabled(True)
+        self.result_label.setText(f"Ошибка: {message}")
+    def done(self, result):
+        if self.trim_thread is not None and self.trim_thread.isRunning():
+            self.trim_thread.cancel()
+            self.trim_thread.wait()
+        super().done(result)
+class VariantMatrixDialog(QDialog):
+    """Сборка сочетаний параметров и сравнение размера, времени сборки и запуска"""
+    COLUMNS = ["Вариант", "Статус", "Сборка, с", "Размер, МБ", "Запуск, мс", "p95, мс"]
+    STATUS_TEXTS = {"pending": "В очереди", "success": "Готово", "skipped": "Без изменений",
+                    "failed": "Ошибка", "cancelled": "Отменено"}
+    def __init__(self, config, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Сравнение вариантов сборки")
+        self.setMinimumSize(850, 600)
+        self.config = config
+        self.matrix_thread = None
+        self.results = []
+        self.selected_options = {}
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"Скрипт: {config.script}. Каждый вариант собирается в build/variants/<вариант>."))
+        self.option_checks = {}
+        unavailable = unavailable_options()
+        options_layout = QHBoxLayout()
+        for name in VARIANT_OPTIONS:
+            check = QCheckBox(OPTION_TITLES[name])
+            check.setChecked(name in DEFAULT_VARIANT_OPTIONS and name not in unavailable)
+            if name in unavailable:
+                check.setEnabled(False)
+                check.setToolTip(unavailable[name])
+            check.toggled.connect(self.update_variant_count)
+            self.option_checks[name] = check
+            options_layout.addWidget(check)
+        options_layout.addStretch(1)
+        layout.addLayout(options_layout)
+        settings_layout = QHBoxLayout()
+        settings_layout.addWidget(QLabel("Параллельно:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, os.cpu_count() or 1)
+        self.workers_spin.setValue(os.cpu_count() or 1)
+        settings_layout.addWidget(self.workers_spin)
+        settings_layout.addWidget(QLabel("Запусков для замера:"))
+        self.runs_spin = QSpinBox()
+        self.runs_spin.setRange(0, 100)
+        self.runs_spin.setValue(VARIANT_RUNS)
+        settings_layout.addWidget(self.runs_spin)
+        settings_layout.addWidget(QLabel("Ожидание, с:"))
+        self.timeout_spin = QSpinBox()
+        self.timeout_spin.setRange(1, 600)
+        self.timeout_spin.setValue(STARTUP_TIMEOUT)
+        settings_layout.addWidget(self.timeout_spin)
+        self.force_check = QCheckBox("Пересобрать все")
+        settings_layout.addWidget(self.force_check)
+        settings_layout.addStretch(1)
+        settings_layout.addWidget(QLabel("Критерий:"))
+        self.criterion_combo = QComboBox()
+        for key, title in CRITERIA.items():
+            self.criterion_combo.addItem(title, key)
+        self.criterion_combo.currentIndexChanged.connect(self.show_best)
+        settings_layout.addWidget(self.criterion_combo)
+        layout.addLayout(settings_layout)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.itemSelectionChanged.connect(
+            lambda: self.apply_button.setEnabled(self.selected_result() is not None))
+        layout.addWidget(self.table, 2)
+        self.log = QPlainTextEdit()
+        self.log.setReadOnly(True)
+        self.log.setMaximumBlockCount(BUILD_LOG_MAX_LINES)
+        layout.addWidget(self.log, 1)
+        self.result_label = QLabel()
+        layout.addWidget(self.result_label)
+        button_layout = QHBoxLayout()
+        self.variant_count = QLabel()
+        button_layout.addWidget(self.variant_count)
+        button_layout.addStretch(1)
+        self.start_button = QPushButton("Начать")
+        self.start_button.clicked.connect(self.start_matrix)
+        self.cancel_button = QPushButton("Отменить")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_matrix)
+        self.apply_button = QPushButton("Применить к мастеру")
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(self.apply_selected)
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.start_button)
+        button_layout.addWidget(self.cancel_button)
+        button_layout.addWidget(self.apply_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        self.update_variant_count()
+    def selected_names(self):
+        return [name for name, check in self.option_checks.items() if check.isChecked()]
+    def update_variant_count(self):
+        self.variant_count.setText(f"Вариантов: {len(variant_matrix(self.selected_names()))}")
+    def start_matrix(self):
+        names = self.selected_names()
+        if not names:
+            QMessageBox.warning(self, "Предупреждение", "Выберите хотя бы один изменяемый параметр")
+            return
+        self.results = []
+        self.log.clear()
+        self.result_label.clear()
+        matrix = variant_matrix(names)
+        self.table.setRowCount(0)
+        for options in matrix:
+            self.add_row({"label": "", "options": options, "status": "pending", "build_time": None, "size": None,
+                          "startup": None, "startup_p95": None})
+        self.start_button.setEnabled(False)
+        self.apply_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.matrix_thread = VariantMatrixThread(self.config, names, self.workers_spin.value(), self.runs_spin.value(),
+                                                 self.timeout_spin.value(), self.force_check.isChecked(), parent=self)
+        self.matrix_thread.output_received.connect(self.log.appendPlainText)
+        self.matrix_thread.variant_updated.connect(self.set_row)
+        self.matrix_thread.result_ready.connect(self.on_matrix_finished)
+        self.matrix_thread.error_occurred.connect(self.on_matrix_error)
+        self.matrix_thread.start()
+    def add_row(self, result):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        for column in range(len(self.COLUMNS)):
+            self.table.setItem(row, column, QTableWidgetItem(""))
+        self.set_row(row, result)
+    def set_row(self, row, result):
+        def value(field, scale, digits):
+            return "" if result[field] is None else f"{result[field] * scale:.{digits}f}"
+        texts = [result["label"] or ", ".join(f"{key}={value}" for key, value in result["options"].items()),
+                 self.STATUS_TEXTS.get(result["status"], result["status"]), value("build_time", 1, 1),
+                 value("size", 1 / (1024 * 1024), 1), value("startup", 1000, 1), value("startup_p95", 1000, 1)]
+        for column, text in enumerate(texts):
+            self.table.item(row, column).setText(text)
+    def on_matrix_finished(self, results):
+        self.results = results
+        self.start_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        for row, result in enumerate(results):
+            self.set_row(row, result)
+        self.show_best()
+    def on_matrix_error(self, message):
+        self.start_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.result_label.setText(f"Ошибка: {message}")
+    def show_best(self):
+        """Выделение лучшего варианта по выбранному критерию"""
+        ranked = rank_variants(self.results, self.criterion_combo.currentData())
+        for row in range(self.table.rowCount()):
+            font = self.table.item(row, 0).font()
+            font.setBold(bool(ranked) and self.results[row] is ranked[0])
+            for column in range(len(self.COLUMNS)):
+                self.table.item(row, column).setFont(font)
+        if not ranked:
+            if self.results:
+                self.result_label.setText("Ни один вариант не собран")
+            return
+        self.table.selectRow(self.results.index(ranked[0]))
+        self.result_label.setText(f"Лучший вариант ({self.criterion_combo.currentText().lower()}): "
+                                  f"{ranked[0]['label']}")
+    def selected_result(self):
+        rows = {index.row() for index in self.table.selectedIndexes()}
+        if len(rows) != 1 or not self.results:
+            return None
+        result = self.results[rows.pop()]
+        return result if result["size"] is not None else None
+    def apply_selected(self):
+        result = self.selected_result()
+        if result is not None:
+            self.selected_options = result["options"]
+            self.accept()
+    def cancel_matrix(self):
+        if self.matrix_thread is not None and self.matrix_thread.isRunning():
+            self.matrix_thread.cancel()
+    def done(self, result):
+        if self.matrix_thread is not None and self.matrix_thread.isRunning():
+            self.matrix_thread.cancel()
+            self.matrix_thread.wait()
+        super().done(result)
+class BatchBuildDialog(QDialog):
+    """Пакетная сборка нескольких скриптов с ограниченным числом параллельных сборок"""
+    COLUMNS = ["Файл", "Название", "Один файл", "Без консоли", "Иконка",
+               "Скрытые импорты", "Доп. файлы", "Исключения", "Статус", "Время", "Журнал"]
+    FILE, NAME, ONE_FILE, NO_CONSOLE, ICON, HIDDEN, FILES, EXCLUDE, STATUS, TIME, LOG = range(11)
+    def __init__(self, defaults=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Пакетная сборка")
+        self.setMinimumSize(1100, 500)
+        self.defaults = defaults or {}
+        self.manifest_path = ""
+        self.pending = []
+        self.running = {}
+        self.started_at = {}
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table, 1)
+        self.progress = QProgressBar()
+        self.progress.setValue(0)
+        layout.addWidget(self.progress)
+        button_layout = QHBoxLayout()
+        add_files_button = QPushButton("Добавить файлы")
+        add_files_button.clicked.connect(self.browse_files)
+        add_folder_button = QPushButton("Добавить папку")
+        add_folder_button.clicked.connect(self.browse_folder)
+        self.remove_button = QPushButton("Удалить")
+        self.remove_button.clicked.connect(self.remove_selected)
+        open_manifest_button = QPushButton("Открыть манифест")
+        open_manifest_button.clicked.connect(self.open_manifest_file)
+        save_manifest_button = QPushButton("Сохранить манифест")
+        save_manifest_button.clicked.connect(self.save_manifest_file)
+        self.shared_check = QCheckBox("Общие библиотеки (одна папка)")
+        self.shared_check.setToolTip("Один анализ зависимостей и одна папка с общими библиотеками "
+                                     "и отдельным запускаемым файлом для каждого скрипта")
+        button_layout.addWidget(add_files_button)
+        button_layout.addWidget(add_folder_button)
+        button_layout.addWidget(self.remove_button)
+        button_layout.addWidget(open_manifest_button)
+        button_layout.addWidget(save_manifest_button)
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.shared_check)
+        button_layout.addWidget(QLabel("Параллельно:"))
+        self.max_workers = QSpinBox()
+        self.max_workers.setRange(1, os.cpu_count() or 1)
+        self.max_workers.setValue(os.cpu_count() or 1)
+        button_layout.addWidget(self.max_workers)
+        self.start_button = QPushButton("Запустить")
+        self.start_button.clicked.connect(self.start_batch)
+        self.cancel_button = QPushButton("Отменить")
+        self.cancel_button.clicked.connect(self.cancel_batch)
+        self.cancel_button.setEnabled(False)
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.close)
+        button_layout.addWidget(self.start_button)
+        button_layout.addWidget(self.cancel_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+    def browse_files(self):
+        files, _ = QFileDialog.getOpenFileNames(self, "Выберите Python файлы", "", "Python Files (*.py)")
+        for file_name in files:
+            self.add_target(file_name)
+    def browse_folder(self):
+        directory = QFileDialog.getExistingDirectory(self, "Выберите папку со скриптами")
+        if directory:
+            for entry in sorted(os.listdir(directory)):
+                if entry.endswith(".py") and not entry.startswith("_"):
+                    self.add_target(os.path.join(directory, entry))
+    def add_target(self, file_name):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        file_item = QTableWidgetItem(file_name)
+        file_item.setFlags(file_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+        self.table.setItem(row, self.FILE, file_item)
+        self.table.setItem(row, self.NAME, QTableWidgetItem(os.path.splitext(os.path.basename(file_name))[0]))
+        for column, key in ((self.ONE_FILE, "one_file"), (self.NO_CONSOLE, "no_console")):
+            item = QTableWidgetItem()
+            item.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsUserCheckable)
+            checked = self.defaults.get(key, key == "one_file")
+            item.setCheckState(Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked)
+            self.table.setItem(row, column, item)
+        self.table.setItem(row, self.ICON, QTableWidgetItem(self.defaults.get("icon", "")))
+        self.table.setItem(row, self.HIDDEN, QTableWidgetItem(self.defaults.get("hidden_imports", "")))
+        self.table.setItem(row, self.FILES, QTableWidgetItem(""))
+        self.table.setItem(row, self.EXCLUDE, QTableWidgetItem(self.defaults.get("exclude_modules", "")))
+        for column in (self.STATUS, self.TIME, self.LOG):
+            item = QTableWidgetItem("")
+            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+            self.table.setItem(row, column, item)
+    def remove_selected(self):
+        rows = sorted({index.row() for index in self.table.selectedIndexes()}, reverse=True)
+        for row in rows:
+            self.table.removeRow(row)
+    def launch_options(self):
+        """Интерпретатор и уровень оптимизации из главного окна, общие для всех сборок"""
+        return {"python": self.defaults.get("python", ""), "optimize": self.defaults.get("optimize", 0)}
+    def target_config(self, row, used_names):
+        """Параметры сборки строки таблицы с отдельными distpath и рабочей папкой в общем кэше"""
+        script = self.table.item(row, self.FILE).text()
+        name = self.table.item(row, self.NAME).text().strip() or os.path.splitext(os.path.basename(script))[0]
+        script_dir = os.path.dirname(script)
+        key = os.path.join(script_dir, name)
+        if key in used_names:
+            name_dir = f"{name}_{row + 1}"
+        else:
+            name_dir = name
+        used_names.add(key)
+        batch_root = os.path.join(script_dir, "build", "batch", name_dir)
+        return managed_config(BuildConfig.from_fields(
+            script,
+            name=name,
+            one_file=self.table.item(row, self.ONE_FILE).checkState() == Qt.CheckState.Checked,
+            no_console=self.table.item(row, self.NO_CONSOLE).checkState() == Qt.CheckState.Checked,
+            icon=self.table.item(row, self.ICON).text(),
+            hidden_imports=self.table.item(row, self.HIDDEN).text(),
+            additional_files=self.table.item(row, self.FILES).text(),
+            exclude_modules=self.table.item(row, self.EXCLUDE).text(),
+            distpath=os.path.join(script_dir, "dist", name_dir),
+            specpath=batch_root, **self.launch_options()), variant=name_dir)
+    def open_manifest_file(self):
+        file_name, _ = QFileDialog.getOpenFileName(self, "Открыть манифест", "", "Манифест FitoPyBox (*.toml)")
+        if not file_name:
+            return
+        try:
+            manifest = load_manifest(file_name)
+        except (OSError, ValueError, RuntimeError) as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось прочитать манифест: {e}")
+            return
+        self.table.setRowCount(0)
+        for target in manifest.targets:
+            self.add_target(target.script)
+            row = self.table.rowCount() - 1
+            self.set_cell(row, self.NAME, target.output_name)
+            self.table.item(row, self.ONE_FILE).setCheckState(
+                Qt.CheckState.Checked if target.one_file else Qt.CheckState.Unchecked)
+            self.table.item(row, self.NO_CONSOLE).setCheckState(
+                Qt.CheckState.Checked if target.no_console else Qt.CheckState.Unchecked)
+            self.set_cell(row, self.ICON, target.icon)
+            self.set_cell(row, self.HIDDEN, ", ".join(target.hidden_imports))
+            self.set_cell(row, self.FILES, ";".join(target.additional_files))
+            self.set_cell(row, self.EXCLUDE, ", ".join(target.exclude_modules))
+        self.manifest_path = manifest.path
+        self.shared_check.setChecked(manifest.mode == SHARED_MODE)
+        self.setWindowTitle(f"Пакетная сборка — {manifest.name}")
+    def table_manifest(self, path=None):
+        """Манифест по строкам таблицы"""
+        targets = []
+        for row in range(self.table.rowCount()):
+            targets.append(BuildConfig.from_fields(
+                self.table.item(row, self.FILE).text(),
+                name=self.table.item(row, self.NAME).text(),
+                one_file=self.table.item(row, self.ONE_FILE).checkState() == Qt.CheckState.Checked,
+                no_console=self.table.item(row, self.NO_CONSOLE).checkState() == Qt.CheckState.Checked,
+                icon=self.table.item(row, self.ICON).text(),
+                hidden_imports=self.table.item(row, self.HIDDEN).text(),
+                additional_files=self.table.item(row, self.FILES).text(),
+                exclude_modules=self.table.item(row, self.EXCLUDE).text()))
+        path = path or self.manifest_path or os.path.join(os.path.dirname(targets[0].script), MANIFEST_FILE)
+        mode = SHARED_MODE if self.shared_check.isChecked() else SEPARATE_MODE
+        return Manifest(path, mode=mode, targets=targets)
+    def save_manifest_file(self):
+        if self.table.rowCount() == 0:
+            QMessageBox.warning(self, "Предупреждение", "Добавьте скрипты для сборки")
+            return
+        default_path = self.manifest_path or os.path.join(
+            os.path.dirname(self.table.item(0, self.FILE).text()), MANIFEST_FILE)
+        file_name, _ = QFileDialog.getSaveFileName(self, "Сохранить манифест", default_path,
+                                                   "Манифест FitoPyBox (*.toml)")
+        if not file_name:
+            return
+        try:
+            save_manifest(self.table_manifest(file_name))
+            self.manifest_path = os.path.abspath(file_name)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить манифест: {e}")
+    def set_cell(self, row, column, text):
+        self.table.item(row, column).setText(text)
+    def start_batch(self):
+        if self.table.rowCount() == 0:
+            QMessageBox.warning(self, "Предупреждение", "Добавьте скрипты для сборки")
+            return
+        if self.shared_check.isChecked():
+            self.start_shared_build()
+            return
+        used_names = set()
+        self.pending = []
+        for row in range(self.table.rowCount()):
+            self.pending.append((row, self.target_config(row, used_names)))
+            self.set_cell(row, self.STATUS, "В очереди")
+            self.set_cell(row, self.TIME, "")
+            self.set_cell(row, self.LOG, "")
+        self.progress.setRange(0, len(self.pending))
+        self.progress.setValue(0)
+        self.set_batch_running(True)
+        self.start_next_builds()
+    def start_shared_build(self):
+        """Все скрипты одной сборкой PyInstaller: общий анализ и одна папка с библиотеками"""
+        thread = SharedBuildThread(self.table_manifest(), self.launch_options(), self)
+        rows = range(self.table.rowCount())
+        thread.output_received.connect(lambda line: [self.set_cell(row, self.LOG, line) for row in rows])
+        thread.build_finished.connect(self.on_shared_finished)
+        self.progress.setRange(0, 1)
+        self.progress.setValue(0)
+        self.running[-1] = thread
+        self.started_at[-1] = time.monotonic()
+        for row in rows:
+            self.set_cell(row, self.STATUS, "Общая сборка...")
+            self.set_cell(row, self.TIME, "")
+        self.set_batch_running(True)
+        thread.start()
+    def on_shared_finished(self, returncode):
+        thread = self.running.pop(-1)
+        thread.wait()
+        thread.deleteLater()
+        elapsed = f"{time.monotonic() - self.started_at.pop(-1):.1f} с"
+        suite = thread.config
+        status, metrics = thread.result["status"], thread.result.get("metrics", {})
+        if status == "skipped":
+            text = "Без изменений"
+        elif status == "cancelled":
+            text = "Отменено"
+        elif status == "success":
+            text = f"Готово ({display_value('artifact_size', metrics['artifact_size'])} МБ на все цели)"
+        else:
+            text = f"Ошибка (код {returncode})"
+        for row in range(self.table.rowCount()):
+            self.set_cell(row, self.STATUS, text)
+            self.set_cell(row, self.TIME, elapsed)
+        self.progress.setValue(1)
+        self.set_batch_running(False)
+        if status == "success":
+            self.setWindowTitle(f"Пакетная сборка — общая папка {os.path.join(suite.output_dir, suite.name)}")
+    def set_batch_running(self, running):
+        self.start_button.setEnabled(not running)
+        self.remove_button.setEnabled(not running)
+        self.max_workers.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers if running
+                                   else QAbstractItemView.EditTrigger.AllEditTriggers)
+    def start_next_builds(self):
+        while self.pending and len(self.running) < self.max_workers.value():
+            row, config = self.pending.pop(0)
+            thread = BuildThread(None, config.script_dir, self, config=config)
+            thread.output_received.connect(lambda line, r=row: self.set_cell(r, self.LOG, line))
+            thread.build_finished.connect(lambda code, r=row: self.on_target_finished(r, code))
+            self.running[row] = thread
+            self.started_at[row] = time.monotonic()
+            self.set_cell(row, self.STATUS, "Сборка...")
+            thread.start()
+        if not self.pending and not self.running:
+            self.set_batch_running(False)
+            failed = sum(1 for row in range(self.table.rowCount())
+                         if not self.table.item(row, self.STATUS).text().startswith(("Готово", "Без изменений")))
+            if failed:
+                self.setWindowTitle(f"Пакетная сборка — ошибок: {failed}")
+            else:
+                self.setWindowTitle("Пакетная сборка — все сборки завершены")
+    def on_target_finished(self, row, returncode):
+        thread = self.running.pop(row)
+        thread.wait()
+        thread.deleteLater()
+        self.set_cell(row, self.TIME, f"{time.monotonic() - self.started_at.pop(row):.1f} с")
+        status, metrics = thread.result["status"], thread.result.get("metrics", {})
+        if status == "skipped":
+            self.set_cell(row, self.STATUS, "Без изменений")
+        elif status == "cancelled":
+            self.set_cell(row, self.STATUS, "Отменено")
+        elif status == "success":
+            size = display_value("artifact_size", metrics["artifact_size"])
+            self.set_cell(row, self.STATUS, f"Готово ({size} МБ)" if size else "Готово")
+        else:
+            self.set_cell(row, self.STATUS, f"Ошибка (код {returncode})")
+        self.progress.setValue(self.progress.value() + 1)
+        self.start_next_builds()
+    def cancel_batch(self):
+        for row, _ in self.pending:
+            self.set_cell(row, self.STATUS, "Отменено")
+            self.progress.setValue(self.progress.value() + 1)
+        self.pending = []
+        for thread in self.running.values():
+            thread.cancel()
+    def closeEvent(self, event):
+        if self.running:
+            self.cancel_batch()
+            for thread in list(self.running.values()):
+                thread.wait()
+        super().closeEvent(event)
@@ -0,0 +1,4 @@
+"""Общая логика сборки FitoPyBox, доступная без PyQt6"""
+from .config import BuildConfig
+from .runner import kill_process_tree, run_build
+__all__ = ["BuildConfig", "kill_process_tree", "run_build"]
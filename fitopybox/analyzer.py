@@ -0,0 +1,254 @@
+"""Анализ размера сборки по файлам PyInstaller и подсказки по исключению модулей"""
+import html
+import marshal
+import os
+import re
+import struct
+from .artifacts import read_toc, toc_entries
+from .deps import scan_project
+from .envindex import load_index
+KIND_TITLES = {
+    "PYMODULE": "Модуль Python",
+    "EXTENSION": "Расширение",
+    "BINARY": "Библиотека",
+    "DATA": "Данные",
+    "PYSOURCE": "Скрипт"
+}
+STDLIB_GROUP = "(стандартная библиотека)"
+SHARED_GROUP = "(общие библиотеки)"
+PROJECT_GROUP = "(файлы проекта)"
+BOOTSTRAP_GROUP = "(загрузчик PyInstaller)"
+TK_DATA_DIRS = {"_tcl_data", "_tk_data", "tcl", "tk", "tcl8", "tcl8.6", "tk8.6"}
+OPTIONAL_HEAVY_PACKAGES = {
+    "tkinter": "графический интерфейс Tk вместе с данными Tcl/Tk",
+    "matplotlib": "построение графиков",
+    "IPython": "интерактивная оболочка",
+    "jedi": "автодополнение для IPython",
+    "notebook": "Jupyter Notebook",
+    "pytest": "тестовый фреймворк",
+    "setuptools": "инструменты упаковки",
+    "pip": "установщик пакетов",
+    "sphinx": "генератор документации",
+    "docutils": "обработка reStructuredText",
+    "PyQt5": "привязки Qt 5",
+    "PySide2": "привязки Qt 5",
+    "PySide6": "привязки Qt 6",
+    "lib2to3": "конвертер Python 2 в 3",
+    "pydoc_data": "данные справки pydoc"
+}
+SAFE_SUBMODULE_EXCLUDES = ["numpy.f2py", "numpy.distutils", "numpy.random._examples", "scipy.io.matlab.tests"]
+TEST_PACKAGE = re.compile(r"^(.+)\.(tests?|testing|conftest)$")
+SPLIT_PACKAGES = {"scipy"}
+MIN_SUGGESTION_SIZE = 256 * 1024
+def read_pyz_toc(path):
+    """Модули PYZ-архива и их размер в архиве (после сжатия)"""
+    with open(path, "rb") as f:
+        if f.read(4) != b"PYZ\0":
+            raise ValueError("PYZ magic pattern mismatch")
+        f.read(4)
+        toc_offset, = struct.unpack("!i", f.read(4))
+        f.seek(toc_offset)
+        toc = marshal.load(f)
+    sizes = {}
+    for name, (typecode, offset, length) in (toc.items() if isinstance(toc, dict) else toc):
+        sizes[name] = length
+    return sizes
+def parse_xref(path):
+    """Граф модулей PyInstaller из xref-файла: тип модуля, кого он импортирует и кем импортирован"""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            content = f.read()
+    except OSError:
+        return {}
+    graph = {}
+    for block in content.split('<div class="node">')[1:]:
+        name_match = re.search(r'<a name="([^"]+)"></a>', block)
+        if not name_match:
+            continue
+        type_match = re.search(r'<span class="moduletype">(.*?)</span>', block, re.S)
+        module_type = type_match.group(1).strip() if type_match else ""
+        path_match = (re.search(r'<a target="code" href="([^"]+)"', block)
+                      or re.search(r"<tt>([^<]+)</tt>", module_type))
+        path = html.unescape(path_match.group(1)) if path_match else ""
+        if module_type.startswith("<tt>"):
+            module_type = "ExtensionModule"
+        elif "builtin" in module_type:
+            module_type = "BuiltinModule"
+        node = {"type": module_type, "path": path, "imports": [], "imported_by": []}
+        for section in block.split('<div class="import">')[1:]:
+            targets = [html.unescape(target) for target in re.findall(r'<a href="#([^"]+)">', section)]
+            if section.lstrip().startswith("imported by:"):
+                node["imported_by"] = targets
+            else:
+                node["imports"] = targets
+        graph[html.unescape(name_match.group(1))] = node
+    return graph
+def parse_warnings(path):
+    """Отсутствующие модули из warn-файла: имя и кем импортирован"""
+    missing = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                match = re.match(r"missing module named '?([^' ]+)'? - imported by (.*)$", line.strip())
+                if match:
+                    missing.append((match.group(1), match.group(2)))
+    except OSError:
+        pass
+    return missing
+def entry_group(name, kind, index):
+    """Пакет, к которому относится файл сборки"""
+    if kind in ("PYMODULE", "PYSOURCE") and (name == "struct" or name.startswith(("pyimod", "pyiboot", "pyi_rth_"))):
+        return BOOTSTRAP_GROUP
+    if kind == "PYMODULE":
+        top = name.split(".")[0]
+        return STDLIB_GROUP if index.is_stdlib(top) else top
+    if kind == "PYSOURCE":
+        return PROJECT_GROUP
+    parts = name.replace("\\", "/").split("/")
+    if parts[0] in ("lib-dynload", "base_library.zip"):
+        return STDLIB_GROUP
+    if parts[0] in TK_DATA_DIRS or parts[0].startswith(("_tcl", "_tk", "libtk", "libtcl", "tcl", "tk8")):
+        return "tkinter"
+    if len(parts) == 1:
+        if kind == "EXTENSION":
+            top = parts[0].split(".")[0]
+            return STDLIB_GROUP if index.is_stdlib(top) else top
+        return SHARED_GROUP if kind == "BINARY" else PROJECT_GROUP
+    top = re.sub(r"\.(libs|dylibs)$", "", parts[0])
+    if top != parts[0] and not index.is_installed(top):
+        modules = index.modules_for(top)
+        if modules:
+            return modules[0]
+    return top
+def module_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
+class BundleReport:
+    """Состав сборки по пакетам и подсказки по уменьшению размера"""
+    def __init__(self, entries, missing, graph):
+        self.entries = entries
+        self.missing = missing
+        self.graph = graph
+        self.suggestions = []
+    @property
+    def total(self):
+        return sum(entry["size"] for entry in self.entries)
+    def groups(self):
+        """Пакеты от самых больших к маленьким с их файлами"""
+        groups = {}
+        for entry in self.entries:
+            group = groups.setdefault(entry["group"], {"name": entry["group"], "size": 0, "entries": []})
+            group["size"] += entry["size"]
+            group["entries"].append(entry)
+        for group in groups.values():
+            group["entries"].sort(key=lambda entry: entry["size"], reverse=True)
+        return sorted(groups.values(), key=lambda group: group["size"], reverse=True)
+    def size_of_prefix(self, module):
+        """Суммарный размер модуля/пакета и всех его подмодулей"""
+        prefix = module + "."
+        total = 0
+        for entry in self.entries:
+            name = entry["module"]
+            if name and (name == module or name.startswith(prefix)):
+                total += entry["size"]
+        return total
+    def importers(self, module):
+        node = self.graph.get(module)
+        return node["imported_by"] if node else []
+    def to_dict(self):
+        return {"total": self.total,
+                "groups": [{"name": group["name"], "size": group["size"], "files": len(group["entries"])}
+                           for group in self.groups()],
+                "suggestions": self.suggestions,
+                "missing": len(self.missing)}
+def entry_module_name(name, kind):
+    """Имя модуля для записей, которые относятся к модулю (для расширений - по пути)"""
+    if kind == "PYMODULE":
+        return name
+    if kind == "EXTENSION":
+        path = name.replace("\\", "/")
+        if path.startswith("lib-dynload/"):
+            path = path[len("lib-dynload/"):]
+        return path.split(".")[0].replace("/", ".")
+    return ""
+def analyze_bundle(config, index=None):
+    """Состав сборки по TOC-файлам, PYZ-архиву, xref и warn-файлам из рабочей папки"""
+    index = index or load_index()
+    work_dir = config.work_dir
+    entries = []
+    toc_name = "PKG-00.toc" if config.one_file and not config.cached_onefile else "COLLECT-00.toc"
+    package_toc = read_toc(os.path.join(work_dir, toc_name))
+    for dest, source, kind in toc_entries(package_toc):
+        if kind in ("OPTION", "PYZ", "SYMLINK", "DEPENDENCY"):
+            continue
+        entries.append({"name": dest, "kind": kind, "size": module_size(source), "source": source})
+    pyz_path = os.path.join(work_dir, "PYZ-00.pyz")
+    try:
+        pyz_sizes = read_pyz_toc(pyz_path)
+    except (OSError, ValueError, EOFError, struct.error):
+        pyz_sizes = {}
+        for name, source, kind in toc_entries(read_toc(os.path.join(work_dir, "PYZ-00.toc"))):
+            pyz_sizes[name] = module_size(source)
+    for name, size in pyz_sizes.items():
+        entries.append({"name": name, "kind": "PYMODULE", "size": size, "source": ""})
+    for entry in entries:
+        entry["group"] = entry_group(entry["name"], entry["kind"], index)
+        entry["module"] = entry_module_name(entry["name"], entry["kind"])
+    missing = parse_warnings(os.path.join(work_dir, f"warn-{config.output_name}.txt"))
+    graph = parse_xref(os.path.join(work_dir, f"xref-{config.output_name}.html"))
+    report = BundleReport(entries, missing, graph)
+    report.suggestions = suggest_exclusions(report, config, index)
+    return report
+def suggest_exclusions(report, config, index):
+    """Вероятно ненужные тяжёлые модули с оценкой экономии"""
+    try:
+        scan = scan_project(config.script)
+        project_imports = set()
+        for imports in scan.files.values():
+            project_imports.update(name for name, level in imports if not level and name)
+    except (OSError, ValueError):
+        project_imports = set()
+    project_tops = {name.split(".")[0] for name in project_imports}
+    def imported_by_project(module):
+        return any(name == module or name.startswith(module + ".") for name in project_imports)
+    suggestions = {}
+    def add(module, reason, size):
+        if module in config.exclude_modules or size < MIN_SUGGESTION_SIZE:
+            return
+        if module not in suggestions or suggestions[module]["size"] < size:
+            suggestions[module] = {"module": module, "reason": reason, "size": size,
+                                   "imported_by": report.importers(module)[:5]}
+    groups = {group["name"]: group for group in report.groups()}
+    for package, description in OPTIONAL_HEAVY_PACKAGES.items():
+        if package in project_tops:
+            continue
+        size = report.size_of_prefix(package)
+        if package == "tkinter":
+            size += report.size_of_prefix("_tkinter") + groups.get("tkinter", {"size": 0})["size"]
+        add(package, f"{description}; проект не импортирует {package} напрямую", size)
+    modules = {entry["module"] for entry in report.entries if entry["module"]}
+    for module in modules:
+        match = TEST_PACKAGE.match(module)
+        if match and not imported_by_project(module):
+            add(module, "тесты пакета не нужны во время работы программы", report.size_of_prefix(module))
+    for module in SAFE_SUBMODULE_EXCLUDES:
+        if module in modules and not imported_by_project(module):
+            add(module, "инструменты разработки, не используемые при выполнении", report.size_of_prefix(module))
+    for package in SPLIT_PACKAGES:
+        if package not in project_tops:
+            continue
+        submodules = {module.split(".")[1] for module in modules
+                      if module.startswith(package + ".") and not module.split(".")[1].startswith("_")}
+        for submodule in submodules:
+            name = f"{package}.{submodule}"
+            if not imported_by_project(name):
+                add(name, f"подмодуль {package} не импортируется проектом; проверьте сборку запуском",
+                    report.size_of_prefix(name))
+    result = sorted(suggestions.values(), key=lambda item: item["size"], reverse=True)
+    covered = []
+    for suggestion in result:
+        if not any(suggestion["module"].startswith(parent + ".") for parent in covered):
+            covered.append(suggestion["module"])
+    return [suggestion for suggestion in result if suggestion["module"] in covered]
@@ -0,0 +1,58 @@
+"""Чтение результатов сборки PyInstaller: исполняемый файл, папка и TOC-файлы"""
+import ast
+import os
+def read_toc(path):
+    """Содержимое TOC-файла PyInstaller (Python-литерал) или None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return ast.literal_eval(f.read())
+    except (OSError, ValueError, SyntaxError):
+        return None
+def toc_entries(toc):
+    """Записи (имя, исходный путь, тип) из прочитанного TOC-файла"""
+    if toc is None:
+        return []
+    for item in toc if isinstance(toc, (tuple, list)) else []:
+        if isinstance(item, list) and all(isinstance(entry, tuple) and len(entry) == 3 for entry in item):
+            return item
+    return []
+def path_size(path):
+    """Размер файла или суммарный размер файлов папки в байтах"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total
+def bundle_root(config):
+    """Итог сборки: исполняемый файл для onefile или папка для onedir"""
+    if config.one_file:
+        return config.artifact_path
+    return os.path.dirname(config.artifact_path)
+def bundled_file_count(config):
+    """Число файлов в сборке: записи архива PKG для onefile, файлы папки для onedir
+    (и для одного файла с кэшем распаковки, который упаковывает папку onedir)"""
+    if config.cached_onefile:
+        root = config.bundle_dir
+        return sum(len(files) for _, _, files in os.walk(root)) if os.path.isdir(root) else None
+    if config.one_file:
+        entries = toc_entries(read_toc(os.path.join(config.work_dir, "PKG-00.toc")))
+        return sum(1 for entry in entries if entry[2] != "OPTION") or None
+    root = bundle_root(config)
+    if not os.path.isdir(root):
+        return None
+    return sum(len(files) for _, _, files in os.walk(root))
+def find_executable(config):
+    """Собранный исполняемый файл на этой платформе или None; для onedir - файл внутри папки сборки"""
+    executable = os.path.basename(config.artifact_path)
+    candidates = [config.artifact_path,
+                  os.path.join(config.output_dir, executable),
+                  os.path.join(config.output_dir, config.output_name, executable)]
+    for path in candidates:
+        if os.path.isfile(path) and (os.name == "nt" or os.access(path, os.X_OK)):
+            return path
+    return None
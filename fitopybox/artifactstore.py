@@ -0,0 +1,365 @@
+"""Хранилище результатов сборок: файлы по хэшу содержимого, общие для всех сборок, с ограничением размера"""
+import hashlib
+import json
+import os
+import shutil
+import stat
+import subprocess
+import threading
+import time
+from .artifacts import bundle_root
+from .fingerprint import file_digest
+from .paths import cache_dir
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+STORE_DIR = "artifacts"
+OBJECTS_DIR = "objects"
+BUILDS_DIR = "builds"
+CHECKOUTS_DIR = "checkouts"
+STORE_STATE_FILE = "store.json"
+STORE_LOCK_FILE = "store.lock"
+STORE_VERSION = 1
+DEFAULT_STORE_LIMIT = 5 * 1024 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 90
+ACTIVE_WINDOW = 60 * 60
+FICLONE = 0x40049409
+COMPLETE_MARKER = ".complete"
+def store_limit():
+    """Предельный размер хранилища в байтах; переопределяется FITOPYBOX_ARTIFACT_STORE_LIMIT_MB"""
+    try:
+        return int(os.environ["FITOPYBOX_ARTIFACT_STORE_LIMIT_MB"]) * 1024 * 1024
+    except (KeyError, ValueError):
+        return DEFAULT_STORE_LIMIT
+def max_age():
+    """Срок хранения неиспользуемых сборок в секундах; переопределяется FITOPYBOX_ARTIFACT_MAX_AGE_DAYS"""
+    try:
+        days = float(os.environ["FITOPYBOX_ARTIFACT_MAX_AGE_DAYS"])
+    except (KeyError, ValueError):
+        days = DEFAULT_MAX_AGE_DAYS
+    return days * 24 * 60 * 60
+def object_path(key):
+    return os.path.join(cache_dir(STORE_DIR, OBJECTS_DIR), key[:2], key)
+def manifest_path(build_id):
+    return os.path.join(cache_dir(STORE_DIR, BUILDS_DIR), build_id + ".json")
+def clone_file(source, destination):
+    """Копия файла: ссылка с копированием при записи (reflink), если файловая система это умеет, иначе обычная копия"""
+    if fcntl is not None:
+        try:
+            with open(source, "rb") as source_file, open(destination, "wb") as destination_file:
+                fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source, destination)
+def temp_name(path):
+    """Временное имя рядом с path, своё у каждого процесса и потока"""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+def remove_path(path):
+    """Удаление файла или папки, в том числе файлов только для чтения (объекты хранилища)"""
+    def make_writable(function, failed_path, _):
+        os.chmod(failed_path, stat.S_IWRITE | stat.S_IREAD)
+        function(failed_path)
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, onerror=make_writable)
+    elif os.path.lexists(path):
+        try:
+            os.remove(path)
+        except PermissionError:
+            os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+            os.remove(path)
+state_lock = threading.Lock()
+class StateLock:
+    """Блокировка store.json между потоками (параллельные сборки пакетного режима) и процессами:
+    счётчик размера хранилища читается и записывается целиком, без неё одновременные изменения теряются"""
+    def __enter__(self):
+        state_lock.acquire()
+        try:
+            self.file = open(os.path.join(cache_dir(STORE_DIR), STORE_LOCK_FILE), "a+b")
+        except OSError:
+            state_lock.release()
+            raise
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            self.file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        return self
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl is None and msvcrt is not None:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+            self.file.close()
+        finally:
+            state_lock.release()
+def read_state():
+    try:
+        with open(os.path.join(cache_dir(STORE_DIR), STORE_STATE_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"size": 0}
+def write_state(state):
+    path = os.path.join(cache_dir(STORE_DIR), STORE_STATE_FILE)
+    temp_path = temp_name(path)
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+def update_size(delta):
+    """Изменение счётчика размера хранилища на delta байт под блокировкой StateLock"""
+    with StateLock():
+        state = read_state()
+        state["size"] = max(0, state.get("size", 0) + delta)
+        write_state(state)
+def add_file(path):
+    """Файл в хранилище; ключ - хэш содержимого и признак исполняемого файла. Объекты только для чтения:
+    на них ссылаются распакованные сборки. Возвращает ключ и число новых байт (0, если файл уже был)."""
+    executable = bool(os.stat(path).st_mode & stat.S_IXUSR)
+    key = file_digest(path) + ("x" if executable else "")
+    target = object_path(key)
+    if os.path.exists(target):
+        try:
+            os.utime(target)
+        except OSError:
+            pass
+        return key, 0
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp_path = temp_name(target)
+    clone_file(path, temp_path)
+    os.chmod(temp_path, 0o555 if executable else 0o444)
+    size = os.path.getsize(temp_path)
+    try:
+        # Ссылка не заменяет объект, который параллельная сборка успела сохранить раньше,
+        # поэтому его размер не прибавляется к счётчику второй раз
+        os.link(temp_path, target)
+    except FileExistsError:
+        size = 0
+    except OSError:
+        os.replace(temp_path, target)
+    remove_path(temp_path)
+    return key, size
+def store_build(config, script=""):
+    """Сохранение результата сборки; одинаковые файлы разных сборок хранятся один раз.
+    Возвращает идентификатор сборки в хранилище и число новых байт или None, если результата нет."""
+    root = bundle_root(config)
+    if not os.path.exists(root):
+        return None
+    files = {}
+    added = 0
+    if os.path.isfile(root):
+        key, size = add_file(root)
+        files[os.path.basename(root)] = {"key": key, "size": os.path.getsize(root)}
+        added += size
+    else:
+        parent = os.path.dirname(root)
+        for directory, dirs, names in os.walk(root):
+            dirs.sort()
+            for name in sorted(names) + [name for name in dirs if os.path.islink(os.path.join(directory, name))]:
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, parent).replace(os.sep, "/")
+                if os.path.islink(path):
+                    files[relative] = {"link": os.readlink(path)}
+                    continue
+                key, size = add_file(path)
+                files[relative] = {"key": key, "size": os.path.getsize(path)}
+                added += size
+    name = os.path.basename(root)
+    executable = os.path.relpath(config.artifact_path, os.path.dirname(root)).replace(os.sep, "/")
+    build_id = hashlib.sha256(json.dumps([name, executable, files], sort_keys=True).encode("utf-8")).hexdigest()[:20]
+    path = manifest_path(build_id)
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        manifest = {"version": STORE_VERSION, "id": build_id, "name": name, "executable": executable,
+                    "kind": "file" if os.path.isfile(root) else "dir", "files": files, "script": script,
+                    "output": root, "created": time.time(),
+                    "size": sum(entry.get("size", 0) for entry in files.values())}
+        temp_path = temp_name(path)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    if added:
+        update_size(added)
+    return build_id, added
+def store_artifact(config):
+    """Сохранение результата успешной сборки с ограничением размера хранилища; идентификатор или None"""
+    try:
+        stored = store_build(config, config.script)
+        if stored is None:
+            return None
+        evict_artifacts(keep=[stored[0]])
+        return stored[0]
+    except OSError as e:
+        print(f"Ошибка сохранения результата в хранилище: {e}")
+        return None
+def load_manifest(build_id):
+    """Описание сохранённой сборки; KeyError, если она удалена из хранилища"""
+    try:
+        with open(manifest_path(build_id), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        raise KeyError(build_id) from None
+    manifest["last_used"] = os.path.getmtime(manifest_path(build_id))
+    return manifest
+def touch(build_id):
+    try:
+        os.utime(manifest_path(build_id))
+    except OSError:
+        pass
+def build_entries():
+    """Идентификаторы сохранённых сборок и время последнего использования, от давних к недавним"""
+    entries = []
+    for entry in os.scandir(cache_dir(STORE_DIR, BUILDS_DIR)):
+        if entry.name.endswith(".json"):
+            entries.append((entry.stat().st_mtime, entry.name[:-len(".json")]))
+    return [(build_id, used) for used, build_id in sorted(entries)]
+def materialize(manifest, target, link):
+    """Файлы сборки в папке target: жёсткие ссылки на объекты (link) или независимые копии"""
+    for relative, entry in sorted(manifest["files"].items()):
+        path = os.path.join(target, *relative.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if "link" in entry:
+            os.symlink(entry["link"], path)
+            continue
+        source = object_path(entry["key"])
+        if link:
+            try:
+                os.link(source, path)
+                continue
+            except OSError:
+                pass
+        clone_file(source, path)
+        os.chmod(path, 0o755 if entry["key"].endswith("x") else 0o644)
+def checkout(build_id):
+    """Папка с распакованной сборкой для запуска; создаётся один раз из жёстких ссылок на объекты"""
+    manifest = load_manifest(build_id)
+    directory = os.path.join(cache_dir(STORE_DIR, CHECKOUTS_DIR), build_id)
+    if not os.path.exists(os.path.join(directory, COMPLETE_MARKER)):
+        temp_dir = temp_name(directory)
+        remove_path(temp_dir)
+        materialize(manifest, temp_dir, link=True)
+        open(os.path.join(temp_dir, COMPLETE_MARKER), "w").close()
+        remove_path(directory)
+        try:
+            os.replace(temp_dir, directory)
+        except OSError:
+            remove_path(temp_dir)
+    touch(build_id)
+    return directory, manifest
+def executable_path(build_id):
+    directory, manifest = checkout(build_id)
+    return os.path.join(directory, *manifest["executable"].split("/"))
+def run_artifact(build_id, args=(), wait=True):
+    """Запуск сохранённой сборки без пересборки; код завершения (wait) или запущенный процесс"""
+    path = executable_path(build_id)
+    if wait:
+        return subprocess.call([path, *args], cwd=os.path.dirname(path))
+    return subprocess.Popen([path, *args], cwd=os.path.dirname(path))
+def restore_artifact(build_id, target_dir=""):
+    """Копия сохранённой сборки в target_dir (по умолчанию - исходная папка результата) вместо текущей;
+    копии независимы от хранилища, поэтому следующая сборка поверх них не портит объекты"""
+    manifest = load_manifest(build_id)
+    target_dir = target_dir or os.path.dirname(manifest["output"])
+    destination = os.path.join(target_dir, manifest["name"])
+    remove_path(destination)
+    os.makedirs(target_dir, exist_ok=True)
+    materialize(manifest, target_dir, link=False)
+    touch(build_id)
+    return destination
+def evict_artifacts(limit=None, age=None, keep=()):
+    """Удаление сборок, не использованных дольше age, затем давно использованных, пока хранилище больше limit.
+    Сборки из keep и использованные в последний час не удаляются. Объекты, которые остались без ссылок,
+    но использовались в последний час, тоже не удаляются: на них может ссылаться сборка, которая сохраняется
+    сейчас и ещё не записала описание (их удалит collect_garbage). Описания сборок читаются, только если
+    что-то нужно удалить. Счётчик размера уменьшается на размер удалённых объектов, а не перезаписывается:
+    сборки, которые сохраняются параллельно, не теряют своё увеличение. Возвращает идентификаторы удалённых сборок."""
+    limit = store_limit() if limit is None else limit
+    age = max_age() if age is None else age
+    entries = build_entries()
+    now = time.time()
+    size = read_state().get("size", 0)
+    if not entries or (size <= limit and now - entries[0][1] <= age):
+        return []
+    manifests = {}
+    references = {}
+    sizes = {}
+    for build_id, _ in entries:
+        try:
+            manifests[build_id] = load_manifest(build_id)
+        except KeyError:
+            continue
+        for entry in manifests[build_id]["files"].values():
+            if "key" in entry:
+                references[entry["key"]] = references.get(entry["key"], 0) + 1
+                sizes[entry["key"]] = entry["size"]
+    size = sum(sizes.values())
+    removed = []
+    unreferenced = []
+    freed = 0
+    for build_id, used in entries:
+        if build_id in keep or build_id not in manifests or now - used < ACTIVE_WINDOW:
+            continue
+        if now - used <= age and size <= limit:
+            break
+        remove_path(manifest_path(build_id))
+        remove_path(os.path.join(cache_dir(STORE_DIR, CHECKOUTS_DIR), build_id))
+        removed.append(build_id)
+        for entry in manifests[build_id]["files"].values():
+            if "key" in entry:
+                references[entry["key"]] -= 1
+                if references[entry["key"]] == 0:
+                    unreferenced.append(entry["key"])
+                    size -= entry["size"]
+    for key in unreferenced:
+        try:
+            active = now - os.stat(object_path(key)).st_mtime < ACTIVE_WINDOW
+        except OSError:
+            continue
+        if active:
+            continue
+        remove_path(object_path(key))
+        freed += sizes[key]
+    if freed:
+        update_size(-freed)
+    return removed
+def collect_garbage():
+    """Удаление объектов, на которые не ссылается ни одна сборка (например, после прерванного сохранения),
+    и пересчёт размера хранилища (под блокировкой StateLock); возвращает освобождённый объём в байтах"""
+    referenced = set()
+    for build_id, _ in build_entries():
+        try:
+            referenced.update(entry["key"] for entry in load_manifest(build_id)["files"].values() if "key" in entry)
+        except KeyError:
+            continue
+    freed = 0
+    size = 0
+    now = time.time()
+    with StateLock():
+        for directory, _, names in os.walk(cache_dir(STORE_DIR, OBJECTS_DIR)):
+            for name in names:
+                path = os.path.join(directory, name)
+                file_stat = os.stat(path)
+                if name in referenced or now - file_stat.st_mtime < ACTIVE_WINDOW:
+                    size += file_stat.st_size
+                    continue
+                remove_path(path)
+                freed += file_stat.st_size
+        write_state({"size": size})
+    return freed
+def store_size():
+    return read_state().get("size", 0)
+def clear_artifacts():
+    """Удаление всего хранилища; возвращает освобождённый объём в байтах"""
+    freed = store_size()
+    remove_path(cache_dir(STORE_DIR))
+    return freed
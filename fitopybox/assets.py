@@ -0,0 +1,230 @@
+"""Ресурсы сборки: упаковка доп. файлов в один индексированный архив и модуль доступа к ним из программы"""
+import hashlib
+import json
+import os
+import shutil
+import struct
+from .config import EXTERNAL_ASSETS, PACKED_ASSETS, ASSET_ARCHIVE
+from .fingerprint import file_digest, iter_input_files
+ASSET_STATE_FILE = "fitopybox_assets.json"
+ASSET_STATE_VERSION = 1
+ASSET_MAGIC = b"FPAK"
+ASSET_FORMAT_VERSION = 1
+ASSET_HEADER = struct.Struct("<4sIQ")
+HELPER_MODULE = "fitopybox_assets"
+HELPER_SOURCE = '''"""Доступ к ресурсам программы, собранной FitoPyBox (файл создан автоматически).
+
+Имена ресурсов - пути относительно папки скрипта через "/", например read_bytes("images/logo.png").
+Работает одинаково при запуске из исходников, в сборке с файлами и в сборке с архивом ресурсов:
+архив открывается через mmap, и файлы не распаковываются во временную папку."""
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+ARCHIVE = "{archive}"
+HEADER = struct.Struct("<4sIQ")
+_archive = None
+def _search_dirs():
+    if getattr(sys, "frozen", False):
+        # Программа из кэша распаковки: внешние ресурсы лежат рядом с запущенным файлом-загрузчиком
+        home = os.path.dirname(os.environ.get("FITOPYBOX_LAUNCHER") or sys.executable)
+        return [home, getattr(sys, "_MEIPASS", os.path.dirname(sys.executable))]
+    return [os.path.dirname(os.path.abspath(__file__))]
+def _root():
+    return _search_dirs()[-1]
+class _Archive:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, index_offset = HEADER.unpack_from(self.data, 0)
+        if magic != b"FPAK":
+            raise ValueError(f"Неверный формат архива ресурсов: {{path}}")
+        self.files = json.loads(self.data[index_offset:].decode("utf-8"))["files"]
+    def read(self, name):
+        offset, size, _ = self.files[name]
+        return self.data[offset:offset + size]
+def _get_archive():
+    global _archive
+    if _archive is None:
+        _archive = False
+        for directory in _search_dirs():
+            path = os.path.join(directory, ARCHIVE)
+            if os.path.isfile(path):
+                _archive = _Archive(path)
+                break
+    return _archive
+def exists(name):
+    archive = _get_archive()
+    if archive:
+        return name in archive.files
+    return os.path.exists(os.path.join(_root(), name))
+def read_bytes(name):
+    archive = _get_archive()
+    if archive:
+        try:
+            return archive.read(name)
+        except KeyError:
+            raise FileNotFoundError(name) from None
+    with open(os.path.join(_root(), name), "rb") as f:
+        return f.read()
+def read_text(name, encoding="utf-8"):
+    return read_bytes(name).decode(encoding)
+def open_binary(name):
+    return io.BytesIO(read_bytes(name))
+def listdir(prefix=""):
+    """Имена ресурсов, начинающиеся с prefix"""
+    archive = _get_archive()
+    if archive:
+        return sorted(name for name in archive.files if name.startswith(prefix))
+    root = _root()
+    names = []
+    for directory, _, files in os.walk(root):
+        for file in files:
+            name = os.path.relpath(os.path.join(directory, file), root).replace(os.sep, "/")
+            if name.startswith(prefix):
+                names.append(name)
+    return sorted(names)
+def path(name):
+    """Путь к ресурсу в файловой системе (для библиотек, которым нужен файл).
+    Ресурс из архива один раз копируется в кэш по хэшу содержимого и затем используется повторно."""
+    archive = _get_archive()
+    if not archive:
+        return os.path.join(_root(), name)
+    try:
+        content_hash = archive.files[name][2]
+    except KeyError:
+        raise FileNotFoundError(name) from None
+    target = os.path.join(tempfile.gettempdir(), "fitopybox_assets", content_hash[:16], os.path.basename(name))
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f"{{target}}.{{os.getpid()}}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(archive.read(name))
+        os.replace(temp_path, target)
+    return target
+'''
+def asset_files(config):
+    """Файлы ресурсов сборки: путь к файлу и имя в архиве (путь относительно папки скрипта через "/")"""
+    files = {}
+    for source, destination in config.data_mappings():
+        source_path = os.path.normpath(os.path.join(config.script_dir, source))
+        prefix = "" if destination == "." else destination + "/"
+        if os.path.isdir(source_path):
+            for path in iter_input_files(source_path):
+                files[prefix + os.path.relpath(path, source_path).replace(os.sep, "/")] = path
+        elif os.path.isfile(source_path):
+            files[prefix + os.path.basename(source_path)] = source_path
+    return sorted(files.items())
+def read_index(path):
+    """Оглавление архива ресурсов: имя -> [смещение, размер, хэш]"""
+    with open(path, "rb") as f:
+        magic, _, index_offset = ASSET_HEADER.unpack(f.read(ASSET_HEADER.size))
+        if magic != ASSET_MAGIC:
+            raise ValueError(f"Неверный формат архива ресурсов: {path}")
+        f.seek(index_offset)
+        return json.loads(f.read().decode("utf-8"))["files"]
+def write_archive(path, entries):
+    """Запись архива: заголовок, содержимое файлов (одинаковые файлы хранятся один раз) и оглавление в конце"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    stored = {}
+    index = {}
+    with open(temp_path, "wb") as f:
+        f.write(ASSET_HEADER.pack(ASSET_MAGIC, ASSET_FORMAT_VERSION, 0))
+        for name, source, content_hash in entries:
+            if content_hash not in stored:
+                offset = f.tell()
+                with open(source, "rb") as source_file:
+                    shutil.copyfileobj(source_file, f, 1024 * 1024)
+                stored[content_hash] = [offset, f.tell() - offset]
+            index[name] = stored[content_hash] + [content_hash]
+        index_offset = f.tell()
+        f.write(json.dumps({"files": index}, ensure_ascii=False).encode("utf-8"))
+        f.seek(0)
+        f.write(ASSET_HEADER.pack(ASSET_MAGIC, ASSET_FORMAT_VERSION, index_offset))
+    os.replace(temp_path, path)
+class AssetStager:
+    """Подготовка архива ресурсов в рабочей папке сборки. Хэш считается только для файлов с новыми
+    mtime или размером, а архив перезаписывается, только если изменилось содержимое ресурсов."""
+    def __init__(self, config):
+        self.config = config
+        self.state_path = os.path.join(config.work_dir, ASSET_STATE_FILE)
+        self.state = {"digest": "", "files": {}}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == ASSET_STATE_VERSION:
+                self.state = data
+        except (OSError, ValueError):
+            pass
+        self.hashed = 0
+    def content_hash(self, path):
+        stat = os.stat(path)
+        cached = self.state["files"].get(path)
+        if cached and cached["mtime"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            return cached["hash"]
+        self.hashed += 1
+        content_hash = file_digest(path)
+        self.state["files"][path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": content_hash}
+        return content_hash
+    def stage(self):
+        """Архив ресурсов; возвращает сводку: число файлов, размер, пересчитанные хэши, был ли архив записан"""
+        entries = [(name, path, self.content_hash(path)) for name, path in asset_files(self.config)]
+        self.state["files"] = {path: self.state["files"][path] for _, path, _ in entries}
+        digest = hashlib.sha256(json.dumps([[name, content_hash] for name, _, content_hash in entries])
+                                .encode("utf-8")).hexdigest()
+        archive = self.config.asset_archive
+        written = digest != self.state["digest"] or not os.path.isfile(archive)
+        if written:
+            write_archive(archive, entries)
+        self.state.update(version=ASSET_STATE_VERSION, digest=digest)
+        self.save()
+        return {"archive": archive, "files": len(entries), "size": os.path.getsize(archive),
+                "hashed": self.hashed, "written": written}
+    def save(self):
+        temp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            print(f"Ошибка сохранения сведений о ресурсах: {e}")
+def stage_assets(config):
+    """Подготовка архива ресурсов перед сборкой (для режимов packed и external)"""
+    if config.asset_mode not in (PACKED_ASSETS, EXTERNAL_ASSETS) or not config.additional_files:
+        return None
+    return AssetStager(config).stage()
+def external_archive_path(config):
+    return os.path.join(os.path.dirname(config.artifact_path), ASSET_ARCHIVE)
+def publish_assets(config, on_line=print):
+    """Архив ресурсов рядом с исполняемым файлом (режим external); копируется, только если изменился.
+    Возвращает путь к архиву, None, если копировать нечего, и False при ошибке копирования (вывод - в on_line)"""
+    if config.asset_mode != EXTERNAL_ASSETS or not os.path.isfile(config.asset_archive):
+        return None
+    target = external_archive_path(config)
+    try:
+        source_stat = os.stat(config.asset_archive)
+        try:
+            target_stat = os.stat(target)
+            if (target_stat.st_size, target_stat.st_mtime_ns) == (source_stat.st_size, source_stat.st_mtime_ns):
+                return target
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(config.asset_archive, target)
+    except OSError as e:
+        on_line(f"Ошибка копирования архива ресурсов: {e}")
+        return False
+    return target
+def helper_source():
+    return HELPER_SOURCE.format(archive=ASSET_ARCHIVE)
+def write_helper(directory):
+    """Модуль доступа к ресурсам рядом со скриптом; PyInstaller включает его в сборку как обычный импорт"""
+    path = os.path.join(directory, HELPER_MODULE + ".py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(helper_source())
+    return path
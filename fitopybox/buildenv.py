@@ -0,0 +1,244 @@
+"""Изолированные окружения сборки: минимальный venv из requirements.txt с кэшем по интерпретатору и выбранным пакетам"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from .artifacts import path_size
+from .deps import find_requirements_file
+from .paths import cache_dir
+from .runner import start_build_process, stream_output
+from .toolchain import probe_interpreter, pyinstaller_requirement, toolchain_entry, venv_interpreter
+ENV_CACHE_DIR = "envs"
+ENV_STORE_DIR = "store"
+ENV_INFO = "fitopybox_env.json"
+ENV_CACHE_VERSION = 2
+ENV_CACHE_LIMIT = 10
+INCLUDED_REQUIREMENTS = re.compile(r"^\s*(?:-r|--requirement|-c|--constraint)\s*=?\s*(\S+)", re.MULTILINE)
+def base_python(python=""):
+    """Интерпретатор, из которого создаётся окружение (по умолчанию текущий)"""
+    if python:
+        return python
+    if getattr(sys, "frozen", False):
+        raise RuntimeError("Для изолированного окружения выберите интерпретатор Python")
+    return sys.executable
+def requirement_files(requirements_file, seen=None):
+    """Файл требований и файлы, подключённые через -r и -c (все они влияют на состав окружения)"""
+    seen = seen if seen is not None else []
+    requirements_file = os.path.abspath(requirements_file)
+    if requirements_file in seen or not os.path.isfile(requirements_file):
+        return seen
+    seen.append(requirements_file)
+    with open(requirements_file, "r", encoding="utf-8") as f:
+        content = f.read()
+    for included in INCLUDED_REQUIREMENTS.findall(content):
+        requirement_files(os.path.join(os.path.dirname(requirements_file), included), seen)
+    return seen
+def request_key(python, requirements_file):
+    """Ключ запроса окружения: содержимое требований, интерпретатор и его версия, требование PyInstaller"""
+    toolchain = toolchain_entry(python)
+    digest = hashlib.sha256()
+    for part in (str(ENV_CACHE_VERSION), toolchain["executable"], toolchain["python"], pyinstaller_requirement()):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    for path in requirement_files(requirements_file) if requirements_file else []:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+def environment_key(python, wheels):
+    """Ключ окружения: интерпретатор и его версия и колёса, которые выбрал pip (имена колёс содержат версии).
+    Требование без точной версии (pyinstaller>=6.3) не определяет состав окружения, поэтому окружение
+    называется по версиям, которые действительно будут установлены."""
+    toolchain = toolchain_entry(python)
+    digest = hashlib.sha256()
+    for part in [str(ENV_CACHE_VERSION), toolchain["executable"], toolchain["python"]] + sorted(
+            os.path.basename(wheel) for wheel in wheels):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+def wheel_version(wheels, project):
+    """Версия проекта из имени его колеса (name-version-...whl) или "", если колеса нет"""
+    for wheel in wheels:
+        name, version = os.path.basename(wheel).split("-")[:2]
+        if name.lower() == project:
+            return version
+    return ""
+def read_info(env_dir):
+    try:
+        with open(os.path.join(env_dir, ENV_INFO), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+def write_info(env_dir, info):
+    temp_path = os.path.join(env_dir, f"{ENV_INFO}.{os.getpid()}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=4)
+    os.replace(temp_path, os.path.join(env_dir, ENV_INFO))
+def is_ready(env_dir):
+    return read_info(env_dir).get("version") == ENV_CACHE_VERSION and os.path.isfile(venv_interpreter(env_dir))
+def use_environment(env_dir, request):
+    """Отметка об использовании окружения; запрос запоминается, чтобы в следующий раз обойтись без pip"""
+    info = read_info(env_dir)
+    if request not in info.setdefault("requests", []):
+        info["requests"].append(request)
+    info["last_used"] = time.time()
+    try:
+        write_info(env_dir, info)
+    except OSError:
+        pass
+    return venv_interpreter(env_dir)
+def cached_environment(python, requirements_file):
+    """Интерпретатор готового окружения, уже созданного для такого же запроса, или None"""
+    request = request_key(python, requirements_file)
+    for info in reversed(environment_entries()):
+        if request in info.get("requests", []) and is_ready(info["path"]):
+            return use_environment(info["path"], request)
+    return None
+def run_tool(command, cwd, on_line):
+    process = start_build_process(command, cwd)
+    returncode, _ = stream_output(process, on_line)
+    if returncode != 0:
+        raise RuntimeError(f"Команда {' '.join(command[1:4])} завершилась с кодом {returncode}")
+def pip_command(python, *args):
+    return [python, "-m", "pip", *args, "--disable-pip-version-check"]
+def resolve_wheels(python, requirements_file, on_line):
+    """Колёса всех пакетов окружения в общем хранилище. Сначала состав определяется только по
+    хранилищу (без сети); недостающие колёса скачиваются или собираются один раз для всех окружений."""
+    wheels_dir = cache_dir(ENV_STORE_DIR, "wheels")
+    requirements = [pyinstaller_requirement()] + (["-r", requirements_file] if requirements_file else [])
+    cwd = os.path.dirname(requirements_file) if requirements_file else cache_dir()
+    report_path = os.path.join(cache_dir(ENV_STORE_DIR), f"report.{os.getpid()}.json")
+    resolve = pip_command(python, "install", "--dry-run", "--ignore-installed", "--no-index", "--find-links",
+                          wheels_dir, "--report", report_path, "--quiet", *requirements)
+    try:
+        run_tool(resolve, cwd, lambda line: None)
+    except RuntimeError:
+        on_line("Загрузка недостающих пакетов в общее хранилище...")
+        run_tool(pip_command(python, "wheel", "--wheel-dir", wheels_dir, "--find-links", wheels_dir,
+                             "--prefer-binary", *requirements), cwd, on_line)
+        run_tool(resolve, cwd, on_line)
+    try:
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    finally:
+        os.remove(report_path)
+    return [url2pathname(urlparse(item["download_info"]["url"]).path) for item in report["install"]]
+def unpack_wheel(python, wheel, on_line):
+    """Установленный пакет в хранилище (один раз на колесо); окружения получают на него жёсткие ссылки"""
+    package_dir = os.path.join(cache_dir(ENV_STORE_DIR, "packages"), os.path.basename(wheel)[:-len(".whl")])
+    if os.path.isdir(package_dir):
+        return package_dir
+    temp_dir = f"{package_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    run_tool(pip_command(python, "install", "--no-deps", "--no-index", "--no-compile", "--quiet",
+                         "--target", temp_dir, wheel), cache_dir(), on_line)
+    # Скрипты запуска ссылаются на базовый интерпретатор и для сборки не нужны
+    shutil.rmtree(os.path.join(temp_dir, "bin"), ignore_errors=True)
+    try:
+        os.replace(temp_dir, package_dir)
+    except OSError:
+        # Пакет уже распакован параллельной сборкой
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return package_dir
+def link_tree(source, target):
+    """Жёсткие ссылки на файлы пакета (копирование, если ссылки не поддерживаются); число ссылок и копий"""
+    linked = copied = 0
+    for directory, _, files in os.walk(source):
+        target_dir = os.path.join(target, os.path.relpath(directory, source))
+        os.makedirs(target_dir, exist_ok=True)
+        for name in files:
+            destination = os.path.join(target_dir, name)
+            if os.path.exists(destination):
+                continue
+            try:
+                os.link(os.path.join(directory, name), destination)
+                linked += 1
+            except OSError:
+                shutil.copy2(os.path.join(directory, name), destination)
+                copied += 1
+    return linked, copied
+def create_environment(python="", requirements_file=None, on_line=print):
+    """Интерпретатор окружения только с PyInstaller и пакетами из requirements.txt.
+    Готовое окружение берётся из кэша; новое собирается из общего хранилища без повторной установки пакетов.
+    Если pip выбрал те же пакеты, что и для другого запроса, используется уже созданное окружение."""
+    python = base_python(python)
+    cached = cached_environment(python, requirements_file)
+    if cached:
+        return cached
+    started = time.time()
+    request = request_key(python, requirements_file)
+    wheels = resolve_wheels(python, requirements_file, on_line)
+    key = environment_key(python, wheels)
+    version = wheel_version(wheels, "pyinstaller")
+    env_dir = os.path.join(cache_dir(ENV_CACHE_DIR), key)
+    if is_ready(env_dir):
+        on_line(f"Окружение {key} с PyInstaller {version} уже создано")
+        return use_environment(env_dir, request)
+    temp_dir = f"{env_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    on_line(f"Создание окружения {key} ({requirements_file or 'только PyInstaller'}, PyInstaller {version})")
+    try:
+        run_tool([python, "-m", "venv", "--without-pip", temp_dir], cache_dir(), on_line)
+        toolchain = probe_interpreter(venv_interpreter(temp_dir))
+        purelib = os.path.join(temp_dir, os.path.relpath(toolchain["purelib"], toolchain["prefix"]))
+        linked = copied = 0
+        for wheel in wheels:
+            counts = link_tree(unpack_wheel(python, wheel, on_line), purelib)
+            linked += counts[0]
+            copied += counts[1]
+        write_info(temp_dir, {"version": ENV_CACHE_VERSION, "python": python, "requirements": requirements_file,
+                              "pyinstaller": version, "requests": [request],
+                              "packages": sorted(os.path.basename(wheel) for wheel in wheels),
+                              "created": time.time(), "last_used": time.time()})
+        try:
+            os.replace(temp_dir, env_dir)
+        except OSError:
+            # Такое же окружение уже создано параллельно
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            use_environment(env_dir, request)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    on_line(f"Окружение готово за {time.time() - started:.1f} с: пакетов {len(wheels)}, "
+            f"жёстких ссылок {linked}, копий {copied}")
+    evict_environments(keep=[env_dir])
+    return venv_interpreter(env_dir)
+def isolated_python(python, script, on_line=print):
+    """Интерпретатор изолированного окружения для скрипта (requirements.txt рядом со скриптом, если есть)"""
+    return create_environment(python, find_requirements_file(os.path.abspath(script)), on_line)
+def environment_entries():
+    """Окружения из кэша от давно использованных к недавним"""
+    entries = []
+    for entry in os.scandir(cache_dir(ENV_CACHE_DIR)):
+        if entry.is_dir() and not entry.name.endswith(".tmp"):
+            info = read_info(entry.path)
+            info.setdefault("last_used", entry.stat().st_mtime)
+            info["path"] = entry.path
+            entries.append(info)
+    return sorted(entries, key=lambda info: info["last_used"])
+def evict_environments(limit=ENV_CACHE_LIMIT, keep=()):
+    """Удаление давно использованных окружений сверх limit. Файлы пакетов остаются в хранилище,
+    поэтому повторное создание удалённого окружения обходится без загрузки и установки."""
+    keep = {os.path.normcase(os.path.abspath(path)) for path in keep}
+    entries = environment_entries()
+    removed = []
+    for info in entries[:max(0, len(entries) - limit)]:
+        if os.path.normcase(info["path"]) not in keep:
+            shutil.rmtree(info["path"], ignore_errors=True)
+            removed.append(info["path"])
+    return removed
+def clear_environments(store=False):
+    """Удаление всех окружений (и хранилища пакетов, если store); возвращает освобождённый объём в байтах"""
+    paths = [info["path"] for info in environment_entries()]
+    if store:
+        paths.append(cache_dir(ENV_STORE_DIR))
+    freed = 0
+    for path in paths:
+        freed += path_size(path)
+        shutil.rmtree(path, ignore_errors=True)
+    return freed
@@ -0,0 +1,607 @@
+"""Консольный запуск сборки без графического интерфейса (PyQt6 не импортируется)"""
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import replace
+from .analyzer import analyze_bundle
+from .artifactstore import (build_entries, clear_artifacts, collect_garbage, evict_artifacts, restore_artifact,
+                            run_artifact, store_limit, store_size)
+from .artifactstore import load_manifest as load_artifact
+from .assets import HELPER_MODULE, read_index, stage_assets, write_helper
+from .buildenv import clear_environments, environment_entries, isolated_python
+from .config import ASSET_MODES, FILES_ASSETS, PACKED_ASSETS, BuildConfig, format_command
+from .history import HistoryStore, add_history_entry
+from .manifest import MANIFEST_FILE, SEPARATE_MODE, SHARED_MODE, load_manifest, prepare_shared, spec_source
+from .metrics import display_value, export_csv, export_json, metrics_trend, write_csv, write_json
+from .pipeline import check_up_to_date, finish_build
+from .profiling import BuildProfiler
+from .runner import run_build
+from .service import SERVICE_WORKERS, ServiceClient, read_service_info, serve
+from .startup import STARTUP_RUNS, STARTUP_TIMEOUT, benchmark_startup, record_startup
+from .startup import report_lines as startup_report_lines
+from .toolchain import discover_toolchains, path_pyinstaller, toolchain_label
+from .trim import SMOKE_TIMEOUT, estimate_savings, plan_trim, run_trim
+from .variants import (CRITERIA, DEFAULT_VARIANT_OPTIONS, VARIANT_OPTIONS, VARIANT_RUNS, rank_variants, run_matrix,
+                       unavailable_options)
+from .variants import report_lines as variant_report_lines
+from .watch import WATCH_DEBOUNCE, WATCH_POLL_INTERVAL, run_watch
+from .workcache import managed_config
+def launch_options():
+    """Интерпретатор для PyInstaller: общие параметры всех подкоманд, которые запускают сборку"""
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument("--optimize", type=int, choices=[0, 1, 2], default=0,
+                         help="уровень оптимизации байт-кода (как python -O / -OO)")
+    options.add_argument("--python", default="", metavar="PATH",
+                         help="интерпретатор, в котором запускается PyInstaller (по умолчанию pyinstaller из PATH)")
+    options.add_argument("--isolated", action="store_true",
+                         help="собрать в отдельном окружении только с PyInstaller и пакетами из requirements.txt")
+    return options
+def build_options():
+    """Параметры сборки, общие для build, trim, variants и watch (подключаются через parents)"""
+    options = argparse.ArgumentParser(add_help=False, parents=[launch_options()])
+    options.add_argument("--name", default="", help="название исполняемого файла")
+    options.add_argument("--onedir", action="store_true", help="собрать папку вместо одного файла")
+    options.add_argument("--extract-cache", action="store_true",
+                         help="один файл, который распаковывается один раз в постоянный кэш")
+    options.add_argument("--extract-dir", default="", metavar="DIR",
+                         help="папка кэша распаковки на компьютере пользователя (можно ~ и переменные окружения)")
+    options.add_argument("--noconsole", action="store_true", help="запуск без консоли")
+    options.add_argument("--icon", default="", help="путь к иконке (.ico, .png, .svg, .jpg, .bmp)")
+    options.add_argument("--hidden-import", dest="hidden_imports", action="append", default=[],
+                         metavar="MODULE", help="скрытый импорт (можно указать несколько раз)")
+    options.add_argument("--add-data", dest="additional_files", action="append", default=[],
+                         metavar="PATH", help="дополнительный файл или папка (можно указать несколько раз)")
+    options.add_argument("--exclude-module", dest="exclude_modules", action="append", default=[],
+                         metavar="MODULE", help="исключить модуль из сборки (можно указать несколько раз)")
+    options.add_argument("--noupx", dest="no_upx", action="store_true", help="не сжимать файлы UPX")
+    options.add_argument("--strip", action="store_true", help="удалить отладочные символы из библиотек")
+    options.add_argument("--noarchive", dest="no_archive", action="store_true",
+                         help="модули Python файлами, без архива PYZ")
+    options.add_argument("--assets", dest="asset_mode", choices=ASSET_MODES, default=FILES_ASSETS,
+                         help="доп. файлы: files - файлами с сохранением папок, packed - одним архивом в сборке, "
+                              "external - архивом рядом с исполняемым файлом")
+    return options
+def create_parser():
+    parser = argparse.ArgumentParser(prog="fitopybox",
+                                     description="Сборка Python-скриптов в исполняемые файлы через PyInstaller")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    options = build_options()
+    build = subparsers.add_parser("build", parents=[options], help="собрать скрипт")
+    build.add_argument("script", help="Python файл для конвертации")
+    build.add_argument("--workpath", default="", help="папка для временных файлов PyInstaller")
+    build.add_argument("--distpath", default="", help="папка для результата")
+    build.add_argument("--specpath", default="", help="папка для .spec файла")
+    build.add_argument("--no-work-cache", action="store_true",
+                       help="временные файлы в build/ рядом со скриптом вместо общего кэша")
+    build.add_argument("--dry-run", action="store_true", help="только показать команду")
+    build.add_argument("--trace", default="", help="сохранить профиль этапов в формате Chrome trace")
+    build.add_argument("--force", action="store_true", help="собрать даже без изменений")
+    build.add_argument("--no-history", action="store_true", help="не записывать сборку в историю")
+    build.add_argument("--service", action="store_true", help="собрать через запущенную службу сборки")
+    build.add_argument("--client", default="", help="имя клиента для очереди службы (по умолчанию хост и PID)")
+    project = subparsers.add_parser("project", parents=[launch_options()],
+                                    help="собрать все цели из манифеста проекта")
+    project.add_argument("manifest", nargs="?", default=MANIFEST_FILE, help="файл манифеста (fitopybox.toml)")
+    project.add_argument("--mode", choices=[SHARED_MODE, SEPARATE_MODE], default="",
+                         help="shared - одна папка с общими библиотеками, separate - отдельные сборки")
+    project.add_argument("--dry-run", action="store_true", help="только показать команды (и spec-файл)")
+    project.add_argument("--trace", default="", help="сохранить профиль этапов в формате Chrome trace")
+    project.add_argument("--force", action="store_true", help="собрать даже без изменений")
+    project.add_argument("--no-history", action="store_true", help="не записывать сборки в историю")
+    stats = subparsers.add_parser("stats", help="динамика метрик сборок")
+    stats.add_argument("--file", default="", help="только сборки этого скрипта")
+    stats.add_argument("--format", choices=["csv", "json"], default="csv", help="формат вывода")
+    stats.add_argument("--output", default="", help="файл для сохранения (по умолчанию - вывод на экран)")
+    analyze = subparsers.add_parser("analyze", help="состав собранного файла и подсказки по уменьшению размера")
+    analyze.add_argument("script", help="собранный Python файл")
+    analyze.add_argument("--name", default="", help="название исполняемого файла")
+    analyze.add_argument("--onedir", action="store_true", help="сборка в папку вместо одного файла")
+    analyze.add_argument("--workpath", default="", help="папка для временных файлов PyInstaller")
+    analyze.add_argument("--distpath", default="", help="папка для результата")
+    analyze.add_argument("--exclude-module", dest="exclude_modules", action="append", default=[],
+                         metavar="MODULE", help="уже исключённый модуль")
+    analyze.add_argument("--top", type=int, default=15, help="сколько крупнейших пакетов показать")
+    analyze.add_argument("--json", action="store_true", help="вывод в формате JSON")
+    bench = subparsers.add_parser("bench", help="замер времени запуска собранной программы")
+    bench.add_argument("script", help="собранный Python файл")
+    bench.add_argument("--name", default="", help="название исполняемого файла")
+    bench.add_argument("--onedir", action="store_true", help="сборка в папку вместо одного файла")
+    bench.add_argument("--extract-cache", action="store_true",
+                       help="один файл с кэшем распаковки: дополнительно замерить первые запуски с распаковкой")
+    bench.add_argument("--distpath", default="", help="папка с результатом сборки")
+    bench.add_argument("--runs", type=int, default=STARTUP_RUNS, help="запусков в каждой серии")
+    bench.add_argument("--timeout", type=float, default=STARTUP_TIMEOUT, help="предельное время одного запуска, с")
+    bench.add_argument("--no-cold", action="store_true", help="без серии холодных запусков")
+    bench.add_argument("--until-output", action="store_true",
+                       help="останавливать программу после первого вывода")
+    bench.add_argument("--json", action="store_true", help="вывод в формате JSON")
+    bench.add_argument("--no-history", action="store_true", help="не записывать замер в историю")
+    trim = subparsers.add_parser("trim", parents=[options], help="пробная сборка с исключением недостижимых модулей")
+    trim.add_argument("script", help="собранный Python файл")
+    trim.add_argument("--allow", action="append", default=[], metavar="MODULE",
+                      help="не исключать модуль и его подмодули (можно указать несколько раз)")
+    trim.add_argument("--plan", action="store_true", help="только показать список исключений без сборки")
+    trim.add_argument("--no-verify", action="store_true", help="не проверять сборку запуском")
+    trim.add_argument("--timeout", type=float, default=SMOKE_TIMEOUT, help="ожидание при проверке запуском, с")
+    variants = subparsers.add_parser("variants", parents=[options],
+                                     help="собрать сочетания параметров и сравнить размер и запуск")
+    variants.add_argument("script", help="Python файл для конвертации")
+    variants.add_argument("--vary", action="append", default=[], choices=list(VARIANT_OPTIONS),
+                          help=f"изменяемый параметр (можно указать несколько раз; "
+                               f"по умолчанию {', '.join(DEFAULT_VARIANT_OPTIONS)})")
+    variants.add_argument("--workers", type=int, default=0, help="параллельных сборок (по умолчанию - по числу ядер)")
+    variants.add_argument("--runs", type=int, default=VARIANT_RUNS, help="запусков для замера каждого варианта")
+    variants.add_argument("--timeout", type=float, default=STARTUP_TIMEOUT, help="предельное время одного запуска, с")
+    variants.add_argument("--until-output", action="store_true",
+                          help="останавливать программу после первого вывода")
+    variants.add_argument("--rank", choices=list(CRITERIA), default="balanced", help="критерий выбора лучшего варианта")
+    variants.add_argument("--force", action="store_true", help="собрать варианты даже без изменений")
+    variants.add_argument("--json", action="store_true", help="вывод в формате JSON")
+    watch = subparsers.add_parser("watch", parents=[options], help="пересобирать скрипт при изменении исходников")
+    watch.add_argument("script", help="Python файл для конвертации")
+    watch.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE,
+                       help="пауза после последнего изменения перед пересборкой, с")
+    watch.add_argument("--interval", type=float, default=WATCH_POLL_INTERVAL, help="период проверки файлов, с")
+    assets = subparsers.add_parser("assets", help="подготовить архив ресурсов и модуль доступа к ним")
+    assets.add_argument("script", help="Python файл для конвертации")
+    assets.add_argument("--name", default="", help="название исполняемого файла")
+    assets.add_argument("--add-data", dest="additional_files", action="append", default=[],
+                        metavar="PATH", help="дополнительный файл или папка (можно указать несколько раз)")
+    assets.add_argument("--helper", action="store_true",
+                        help=f"создать модуль {HELPER_MODULE}.py рядом со скриптом")
+    assets.add_argument("--list", action="store_true", help="показать содержимое архива")
+    toolchains = subparsers.add_parser("toolchains", help="найденные интерпретаторы Python и версии PyInstaller")
+    toolchains.add_argument("--project", default="", help="папка проекта (для поиска .venv, venv, env)")
+    toolchains.add_argument("--refresh", action="store_true", help="проверить интерпретаторы заново, без кэша")
+    toolchains.add_argument("--json", action="store_true", help="вывод в формате JSON")
+    artifacts = subparsers.add_parser("artifacts", help="сохранённые результаты сборок: список, восстановление, запуск")
+    artifacts.add_argument("action", choices=["list", "restore", "run", "gc", "clear"])
+    artifacts.add_argument("ref", nargs="?", default="",
+                           help="номер записи истории или идентификатор сборки в хранилище")
+    artifacts.add_argument("args", nargs="*", help="аргументы запускаемой программы для run (после --)")
+    artifacts.add_argument("--to", default="", help="папка для восстановления (по умолчанию - исходная папка)")
+    artifacts.add_argument("--limit-mb", type=int, default=None, help="предельный размер хранилища для gc, МБ")
+    artifacts.add_argument("--max-age-days", type=float, default=None,
+                           help="удалить в gc сборки, не использованные дольше этого срока")
+    envs = subparsers.add_parser("envs", help="изолированные окружения сборки из кэша")
+    envs.add_argument("--clear", action="store_true", help="удалить все окружения")
+    envs.add_argument("--store", action="store_true", help="вместе с --clear удалить и хранилище пакетов")
+    serve = subparsers.add_parser("serve", help="запустить службу сборки с заранее запущенными процессами PyInstaller")
+    serve.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="число одновременных сборок")
+    serve.add_argument("--port", type=int, default=0, help="порт на 127.0.0.1 (по умолчанию любой свободный)")
+    serve.add_argument("--python", default="", metavar="PATH",
+                       help="интерпретатор с PyInstaller для сборок без --python (по умолчанию текущий)")
+    service = subparsers.add_parser("service", help="состояние или остановка службы сборки")
+    service.add_argument("action", choices=["status", "stop"])
+    return parser
+def config_from_args(args):
+    """Параметры сборки из аргументов подкоманды (отсутствующие аргументы - значения по умолчанию)"""
+    fields = {key: value for key, value in vars(args).items()
+              if key in BuildConfig.__dataclass_fields__ and key != "script"}
+    config = BuildConfig(script=os.path.abspath(args.script), one_file=not getattr(args, "onedir", False),
+                         no_console=getattr(args, "noconsole", False), **fields)
+    if getattr(args, "no_work_cache", False):
+        return config
+    return managed_config(config)
+def resolve_isolated(args, script=""):
+    """--isolated: интерпретатор изолированного окружения (из кэша или созданного сейчас) вместо выбранного;
+    requirements.txt ищется рядом с script (по умолчанию - со скриптом сборки)"""
+    if not getattr(args, "isolated", False):
+        return True
+    try:
+        args.python = isolated_python(args.python, script or args.script)
+    except (OSError, RuntimeError) as e:
+        print(f"Не удалось подготовить окружение: {e}", file=sys.stderr)
+        return False
+    return True
+def run_pyinstaller(config, fingerprint, command, args, cwd=None):
+    """Запуск PyInstaller с профилированием и записью результата; возвращает код завершения"""
+    profiler = BuildProfiler()
+    def on_line(line):
+        profiler.feed(line)
+        print(line)
+    try:
+        returncode, usage = run_build(command, cwd=cwd or config.script_dir, on_line=on_line)
+    except FileNotFoundError:
+        print("PyInstaller не найден. Установите его: pip install pyinstaller", file=sys.stderr)
+        return 127
+    except KeyboardInterrupt:
+        print("Сборка отменена", file=sys.stderr)
+        return 130
+    finish_build(config, fingerprint, returncode, usage, history=not args.no_history, profiler=profiler,
+                 command=None if command == config.to_command() else format_command(command))
+    print("\n".join(profiler.report_lines()))
+    if args.trace:
+        profiler.export_trace(args.trace)
+    if returncode == 0:
+        print("Файл успешно создан!")
+    else:
+        print(f"Ошибка при создании .exe. Код завершения: {returncode}", file=sys.stderr)
+    return returncode
+def build_command(args):
+    if args.service:
+        info = read_service_info()
+        if not info:
+            print("Служба сборки не запущена: python -m fitopybox serve", file=sys.stderr)
+            return 2
+        args.python = args.python or info["python"]
+    if not resolve_isolated(args):
+        return 2
+    config = config_from_args(args)
+    if not os.path.isfile(config.script):
+        print(f"Файл не найден: {config.script}", file=sys.stderr)
+        return 2
+    print(config.preview())
+    if args.dry_run:
+        return 0
+    if args.service:
+        return service_build(config, args, info)
+    fingerprint, up_to_date = check_up_to_date(config, args.force, history=not args.no_history)
+    if up_to_date:
+        print(f"Сборка пропущена: изменений нет ({config.artifact_path})")
+        return 0
+    return run_pyinstaller(config, fingerprint, config.to_command(), args)
+def service_build(config, args, info):
+    """Сборка через службу: журнал и результат приходят от службы, история пишется на её стороне"""
+    client = ServiceClient(info, args.client)
+    def on_event(event):
+        if event["type"] == "queued":
+            print(f"Задание в очереди службы (позиция {event['position']})")
+        elif event["type"] == "started":
+            print("Сборка начата процессом службы")
+    try:
+        result = client.build(config, args.force, not args.no_history, on_line=print, on_event=on_event)
+    except OSError as e:
+        print(f"Не удалось подключиться к службе сборки: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        client.cancel()
+        print("Сборка отменена", file=sys.stderr)
+        return 130
+    if result["type"] == "error" or result.get("error"):
+        print(f"Ошибка службы сборки: {result['error']}", file=sys.stderr)
+        return 1
+    if result["status"] == "skipped":
+        print(f"Сборка пропущена: изменений нет ({config.artifact_path})")
+        return 0
+    if result["status"] == "cancelled":
+        print("Сборка отменена", file=sys.stderr)
+        return 130
+    print("\n".join(result["report"]))
+    if result["returncode"] == 0:
+        print("Файл успешно создан!")
+    else:
+        print(f"Ошибка при создании .exe. Код завершения: {result['returncode']}", file=sys.stderr)
+    return result["returncode"]
+def project_command(args):
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Ошибка чтения манифеста: {e}", file=sys.stderr)
+        return 2
+    if not resolve_isolated(args, manifest.path):
+        return 2
+    options = {"python": args.python, "optimize": args.optimize}
+    mode = args.mode or manifest.mode
+    if mode == SHARED_MODE:
+        try:
+            suite, command, fingerprint, up_to_date = prepare_shared(manifest, args.force, **options)
+        except (OSError, ValueError) as e:
+            print(f"Ошибка подготовки общей сборки: {e}", file=sys.stderr)
+            return 2
+        print(format_command(command))
+        if args.dry_run:
+            print(spec_source(manifest))
+            return 0
+        if up_to_date:
+            if not args.no_history:
+                add_history_entry(format_command(command), suite.script, status="skipped")
+            print(f"Сборка пропущена: изменений нет ({os.path.join(suite.output_dir, manifest.name)})")
+            return 0
+        return run_pyinstaller(suite, fingerprint, command, args, cwd=manifest.root)
+    returncode = 0
+    for config in manifest.target_configs(**options):
+        print(config.preview())
+        if args.dry_run:
+            continue
+        fingerprint, up_to_date = check_up_to_date(config, args.force, history=not args.no_history)
+        if up_to_date:
+            print(f"Сборка пропущена: изменений нет ({config.artifact_path})")
+            continue
+        returncode = run_pyinstaller(config, fingerprint, config.to_command(), args) or returncode
+        if returncode in (127, 130):
+            break
+    return returncode
+def stats_command(args):
+    file_path = os.path.abspath(args.file) if args.file else ""
+    with HistoryStore() as store:
+        entries = list(reversed(store.page(limit=-1, file_path=file_path)))
+    rows = []
+    for target in sorted({entry["file"] for entry in entries}):
+        rows.extend(metrics_trend([entry for entry in entries if entry["file"] == target]))
+    if args.output:
+        (export_csv if args.format == "csv" else export_json)(rows, args.output)
+    else:
+        (write_csv if args.format == "csv" else write_json)(rows, sys.stdout)
+    return 0
+def analyze_command(args):
+    config = config_from_args(args)
+    if not os.path.isdir(config.work_dir):
+        print(f"Нет рабочей папки сборки: {config.work_dir}. Сначала соберите скрипт.", file=sys.stderr)
+        return 2
+    report = analyze_bundle(config)
+    if args.json:
+        json.dump(report.to_dict(), sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+    total = report.total
+    print(f"Размер содержимого: {display_value('artifact_size', total)} МБ, файлов: {len(report.entries)}")
+    for group in report.groups()[:args.top]:
+        share = group["size"] / total * 100 if total else 0
+        print(f"  {group['name']:<36} {display_value('artifact_size', group['size']):>8} МБ {share:6.1f}%")
+    if report.missing:
+        print(f"Отсутствующих модулей (warn-файл): {len(report.missing)}")
+    if report.suggestions:
+        print("Можно попробовать исключить:")
+        for suggestion in report.suggestions:
+            print(f"  --exclude-module {suggestion['module']:<28} "
+                  f"-{display_value('artifact_size', suggestion['size'])} МБ  {suggestion['reason']}")
+    return 0
+def bench_command(args):
+    config = config_from_args(args)
+    try:
+        result = benchmark_startup(config, runs=args.runs, timeout=args.timeout, cold=not args.no_cold,
+                                   until_output=args.until_output)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not args.no_history:
+        record_startup(config, result)
+    if args.json:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print("\n".join(startup_report_lines(result)))
+    return 0
+def trim_command(args):
+    if not resolve_isolated(args):
+        return 2
+    config = config_from_args(args)
+    try:
+        if args.plan:
+            plan = plan_trim(config, args.allow)
+            plan.savings = estimate_savings(config, plan)
+            print(f"Достижимо модулей: {len(plan.reachable)}, недостижимо: {len(plan.unreachable)}")
+            if plan.savings is not None:
+                print(f"Оценка экономии: {display_value('artifact_size', plan.savings)} МБ")
+            print(" ".join(f"--exclude-module {module}" for module in plan.excludes))
+            return 0
+        result = run_trim(config, args.allow, verify=not args.no_verify, timeout=args.timeout)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("Обрезка отменена", file=sys.stderr)
+        return 130
+    if result["size_before"] and result["size_after"]:
+        print(f"Размер: {display_value('artifact_size', result['size_before'])} МБ -> "
+              f"{display_value('artifact_size', result['size_after'])} МБ")
+    if result["allowlist"]:
+        print("Разрешены после проверки: " + ", ".join(result["allowlist"]))
+    if result["status"] not in ("success", "unverified"):
+        if result["smoke"]:
+            print(result["smoke"]["output"], file=sys.stderr)
+        print(f"Обрезка не удалась: {result['status']}", file=sys.stderr)
+        return 1
+    print(" ".join(f"--exclude-module {module}" for module in result["excludes"]))
+    return 0
+def variants_command(args):
+    if not resolve_isolated(args):
+        return 2
+    config = config_from_args(args)
+    if not os.path.isfile(config.script):
+        print(f"Файл не найден: {config.script}", file=sys.stderr)
+        return 2
+    names = list(dict.fromkeys(args.vary or DEFAULT_VARIANT_OPTIONS))
+    for name, reason in unavailable_options().items():
+        if name in names:
+            print(f"Параметр {name} пропущен: {reason}", file=sys.stderr)
+            names.remove(name)
+    try:
+        results = run_matrix(config, names, workers=args.workers or None, runs=args.runs, timeout=args.timeout,
+                             until_output=args.until_output, force=args.force,
+                             on_line=lambda label, line: print(f"[{label}] {line}"))
+    except FileNotFoundError:
+        print("PyInstaller не найден. Установите его: pip install pyinstaller", file=sys.stderr)
+        return 127
+    except KeyboardInterrupt:
+        print("Сравнение вариантов отменено", file=sys.stderr)
+        return 130
+    ranked = rank_variants(results, args.rank)
+    if args.json:
+        json.dump({"variants": results, "best": ranked[0]["label"] if ranked else None},
+                  sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print("\n".join(variant_report_lines(results, args.rank)))
+    return 0 if ranked else 1
+def assets_command(args):
+    config = replace(config_from_args(args), asset_mode=PACKED_ASSETS)
+    if not os.path.isfile(config.script):
+        print(f"Файл не найден: {config.script}", file=sys.stderr)
+        return 2
+    if args.helper:
+        print(f"Создан модуль доступа к ресурсам: {write_helper(config.script_dir)}")
+    if not config.additional_files:
+        return 0
+    for source, destination in config.data_mappings():
+        print(f"{source} -> {destination}")
+    summary = stage_assets(config)
+    state = "записан" if summary["written"] else "не изменился"
+    print(f"Архив {summary['archive']} {state}: файлов {summary['files']}, "
+          f"{display_value('artifact_size', summary['size'])} МБ, пересчитано хэшей: {summary['hashed']}")
+    if args.list:
+        for name, (_, size, _) in sorted(read_index(summary["archive"]).items()):
+            print(f"  {name} ({size} байт)")
+    return 0
+def watch_command(args):
+    if not resolve_isolated(args):
+        return 2
+    config = config_from_args(args)
+    if not os.path.isfile(config.script):
+        print(f"Файл не найден: {config.script}", file=sys.stderr)
+        return 2
+    print(config.preview())
+    def on_change(paths):
+        print(f"Изменено файлов: {len(paths)} ({', '.join(os.path.basename(path) for path in paths[:5])}), пересборка...")
+    def on_result(status, metrics, started):
+        finished = time.strftime("%H:%M:%S")
+        if status == "success":
+            print(f"[{finished}] Сборка успешна за {metrics['wall_time']:.1f} с")
+        elif status == "skipped":
+            print(f"[{finished}] Сборка пропущена: изменений нет")
+        elif status == "cancelled":
+            print(f"[{finished}] Сборка отменена из-за новых изменений")
+        else:
+            print(f"[{finished}] Ошибка сборки", file=sys.stderr)
+    print("Наблюдение за изменениями (Ctrl+C - выход)")
+    try:
+        run_watch(config, on_result=on_result, on_change=on_change, debounce=args.debounce, interval=args.interval)
+    except KeyboardInterrupt:
+        print("Наблюдение остановлено")
+    return 0
+def toolchains_command(args):
+    toolchains = discover_toolchains(os.path.abspath(args.project) if args.project else "", args.refresh)
+    if args.json:
+        json.dump({"path": path_pyinstaller(), "toolchains": toolchains}, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+    print(f"pyinstaller из PATH: {path_pyinstaller() or 'не найден'}")
+    for toolchain in toolchains:
+        print(toolchain_label(toolchain))
+    return 0
+def resolve_artifact(ref):
+    """Идентификатор сборки в хранилище по номеру записи истории или по самому идентификатору"""
+    if ref.isdigit() and len(ref) < 12:
+        with HistoryStore() as store:
+            entry = store.get(int(ref))
+        if entry is None:
+            raise KeyError(f"запись истории {ref} не найдена")
+        if not entry.get("artifact_id"):
+            raise KeyError(f"у записи истории {ref} нет сохранённого результата")
+        return entry["artifact_id"]
+    return ref
+def artifacts_command(args):
+    if args.action == "list":
+        for build_id, used in reversed(build_entries()):
+            try:
+                manifest = load_artifact(build_id)
+            except KeyError:
+                continue
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(used))
+            print(f"{build_id}  {used}  {display_value('artifact_size', manifest['size']):>8} МБ  "
+                  f"{manifest['output']}")
+        print(f"Размер хранилища: {display_value('artifact_size', store_size())} МБ "
+              f"из {display_value('artifact_size', store_limit())} МБ")
+        return 0
+    if args.action == "gc":
+        age = args.max_age_days * 24 * 60 * 60 if args.max_age_days is not None else None
+        limit = args.limit_mb * 1024 * 1024 if args.limit_mb is not None else None
+        removed = evict_artifacts(limit, age)
+        freed = collect_garbage()
+        print(f"Удалено сборок: {len(removed)}, неиспользуемых файлов: {display_value('artifact_size', freed)} МБ; "
+              f"размер хранилища {display_value('artifact_size', store_size())} МБ")
+        return 0
+    if args.action == "clear":
+        freed = clear_artifacts()
+        print(f"Хранилище очищено, освобождено {display_value('artifact_size', freed)} МБ")
+        return 0
+    if not args.ref:
+        print("Укажите номер записи истории или идентификатор сборки", file=sys.stderr)
+        return 2
+    try:
+        build_id = resolve_artifact(args.ref)
+        if args.action == "restore":
+            print(f"Сборка восстановлена: {restore_artifact(build_id, os.path.abspath(args.to) if args.to else '')}")
+            return 0
+        return run_artifact(build_id, args.args)
+    except KeyError as e:
+        print(f"Сборка не найдена в хранилище: {e.args[0]}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+def envs_command(args):
+    if args.clear:
+        freed = clear_environments(args.store)
+        print(f"Окружения удалены, освобождено {freed / 1024 / 1024:.1f} МБ")
+        return 0
+    entries = environment_entries()
+    if not entries:
+        print("Изолированных окружений нет")
+    for info in reversed(entries):
+        used = time.strftime("%Y-%m-%d %H:%M", time.localtime(info["last_used"]))
+        print(f"{os.path.basename(info['path'])}  {used}  {info.get('requirements') or 'только PyInstaller'}")
+        print(f"  {info.get('python', '')}: {', '.join(info.get('packages', []))}")
+    return 0
+def serve_command(args):
+    def on_ready(info):
+        print(f"Служба сборки запущена на {info['host']}:{info['port']} ({info['workers']} сборки, {info['python']})")
+        print("Остановка: Ctrl+C или python -m fitopybox service stop")
+    try:
+        serve(args.workers, os.path.abspath(args.python) if args.python else "", args.port, on_ready)
+    except KeyboardInterrupt:
+        pass
+    print("Служба сборки остановлена")
+    return 0
+def service_command(args):
+    try:
+        client = ServiceClient()
+        if args.action == "stop":
+            client.stop()
+            print("Служба сборки остановлена")
+            return 0
+        status = client.status()
+    except OSError as e:
+        print(f"Служба сборки недоступна: {e}", file=sys.stderr)
+        return 1
+    print(f"Служба сборки: {client.info['host']}:{client.info['port']}, PID {client.info['pid']}, "
+          f"{status['workers']} сборки, {status['python']}")
+    for title, jobs in (("Выполняются", status["running"]), ("В очереди", status["queued"])):
+        print(f"{title}: {len(jobs)}")
+        for job in jobs:
+            print(f"  {job['client']}: {job['script']}")
+    return 0
+def main(argv=None):
+    args = create_parser().parse_args(argv)
+    if args.command == "build":
+        return build_command(args)
+    if args.command == "project":
+        return project_command(args)
+    if args.command == "stats":
+        return stats_command(args)
+    if args.command == "analyze":
+        return analyze_command(args)
+    if args.command == "bench":
+        return bench_command(args)
+    if args.command == "trim":
+        return trim_command(args)
+    if args.command == "variants":
+        return variants_command(args)
+    if args.command == "assets":
+        return assets_command(args)
+    if args.command == "watch":
+        return watch_command(args)
+    if args.command == "toolchains":
+        return toolchains_command(args)
+    if args.command == "artifacts":
+        return artifacts_command(args)
+    if args.command == "envs":
+        return envs_command(args)
+    if args.command == "serve":
+        return serve_command(args)
+    if args.command == "service":
+        return service_command(args)
+    return 2
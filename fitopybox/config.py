@@ -0,0 +1,166 @@
+"""Параметры сборки PyInstaller без зависимости от Qt"""
+import os
+import shlex
+import subprocess
+import sys
+from dataclasses import dataclass, field, asdict
+FILES_ASSETS = "files"
+PACKED_ASSETS = "packed"
+EXTERNAL_ASSETS = "external"
+ASSET_MODES = [FILES_ASSETS, PACKED_ASSETS, EXTERNAL_ASSETS]
+ASSET_ARCHIVE = "assets.fpak"
+def split_list(text, separator):
+    """Разбор строки со списком значений через разделитель"""
+    return [item.strip() for item in text.split(separator) if item.strip()]
+@dataclass
+class BuildConfig:
+    """Все параметры одной сборки: скрипт, режимы и дополнительные файлы"""
+    script: str
+    name: str = ""
+    one_file: bool = True
+    no_console: bool = False
+    icon: str = ""
+    hidden_imports: list = field(default_factory=list)
+    additional_files: list = field(default_factory=list)
+    exclude_modules: list = field(default_factory=list)
+    no_upx: bool = False
+    strip: bool = False
+    no_archive: bool = False
+    optimize: int = 0
+    python: str = ""
+    asset_mode: str = FILES_ASSETS
+    extract_cache: bool = False
+    extract_dir: str = ""
+    workpath: str = ""
+    distpath: str = ""
+    specpath: str = ""
+    @classmethod
+    def from_fields(cls, script, name="", one_file=True, no_console=False, icon="",
+                    hidden_imports="", additional_files="", exclude_modules="", **options):
+        """Создание параметров из текстовых полей мастера"""
+        return cls(script=script.strip(), name=name.strip(), one_file=one_file,
+                   no_console=no_console, icon=icon.strip(),
+                   hidden_imports=split_list(hidden_imports, ","),
+                   additional_files=split_list(additional_files, ";"),
+                   exclude_modules=split_list(exclude_modules, ","), **options)
+    @classmethod
+    def from_dict(cls, data):
+        known = {key: value for key, value in data.items() if key in cls.__dataclass_fields__}
+        return cls(**known)
+    def to_dict(self):
+        return asdict(self)
+    @property
+    def script_dir(self):
+        return os.path.dirname(os.path.abspath(self.script)) if self.script else ""
+    @property
+    def output_name(self):
+        return self.name or os.path.splitext(os.path.basename(self.script))[0]
+    @property
+    def output_dir(self):
+        return self.distpath or os.path.join(self.script_dir, "dist")
+    @property
+    def work_dir(self):
+        """Папка временных файлов PyInstaller для этой сборки (workpath/<имя>)"""
+        return os.path.join(self.workpath or os.path.join(self.script_dir, "build"), self.output_name)
+    @property
+    def cached_onefile(self):
+        """Один файл, который распаковывается один раз в постоянный кэш (модуль extractcache)"""
+        return self.one_file and self.extract_cache
+    @property
+    def bundle_dir(self):
+        """Папка onedir, которую PyInstaller собирает для режима с кэшем распаковки"""
+        return os.path.join(self.work_dir, "bundle", self.output_name)
+    @property
+    def icon_file(self):
+        """Иконка для PyInstaller: ICO как есть, другие изображения - подготовленный ICO из кэша иконок"""
+        if not self.icon or self.icon.lower().endswith(".ico"):
+            return self.icon
+        from .icons import cached_icon_path
+        cached = cached_icon_path(os.path.join(self.script_dir, self.icon))
+        return cached if cached and os.path.isfile(cached) else self.icon
+    @property
+    def asset_archive(self):
+        """Архив ресурсов режимов packed и external (собирается в рабочей папке)"""
+        return os.path.join(self.work_dir, ASSET_ARCHIVE)
+    def data_mappings(self):
+        """Пары (источник, папка назначения) доп. файлов. Файлы и папки внутри проекта сохраняют
+        относительный путь (images/icons/a.png остаётся images/icons/a.png), внешние кладутся в корень."""
+        mappings = []
+        for file in self.additional_files:
+            source = os.path.normpath(os.path.join(self.script_dir, file))
+            try:
+                relative = os.path.relpath(source, self.script_dir)
+            except ValueError:
+                relative = os.pardir
+            if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+                relative = os.path.basename(source)
+            destination = relative if os.path.isdir(source) else os.path.dirname(relative)
+            mappings.append((file, destination.replace(os.sep, "/") or "."))
+        return mappings
+    @property
+    def artifact_path(self):
+        """Путь к исполняемому файлу, который создаст PyInstaller"""
+        executable = self.output_name + (".exe" if os.name == "nt" else "")
+        if self.one_file:
+            return os.path.join(self.output_dir, executable)
+        return os.path.join(self.output_dir, self.output_name, executable)
+    def launcher(self):
+        """Запуск PyInstaller: python - интерпретатор (по умолчанию pyinstaller из PATH).
+        Уровень оптимизации байт-кода задаётся флагом -O этого интерпретатора; без выбранного интерпретатора
+        берётся тот, в котором установлен pyinstaller из PATH, чтобы сборки с -O и без него шли одним PyInstaller."""
+        if not self.python and self.optimize:
+            from .toolchain import path_interpreter
+            python = path_interpreter() or sys.executable
+        else:
+            python = self.python
+        if python:
+            return [python] + (["-" + "O" * self.optimize] if self.optimize else []) + ["-m", "PyInstaller"]
+        return ["pyinstaller"]
+    def to_command(self):
+        """Список аргументов PyInstaller; пути с пробелами не разбиваются"""
+        return self.launcher() + self.pyinstaller_args()
+    def pyinstaller_args(self):
+        """Аргументы PyInstaller без команды запуска (для запуска внутри уже работающего процесса)"""
+        args = []
+        if self.one_file and not self.extract_cache:
+            args.append("--onefile")
+        if self.no_console:
+            args.append("--noconsole")
+        if self.icon:
+            args.extend(["--icon", self.icon_file])
+        for imp in self.hidden_imports:
+            args.extend(["--hidden-import", imp])
+        if self.asset_mode == PACKED_ASSETS and self.additional_files:
+            args.append(f"--add-data={self.asset_archive}{os.pathsep}.")
+        elif self.asset_mode == FILES_ASSETS:
+            for source, destination in self.data_mappings():
+                args.append(f"--add-data={source}{os.pathsep}{destination}")
+        for module in self.exclude_modules:
+            args.extend(["--exclude-module", module])
+        if self.no_upx:
+            args.append("--noupx")
+        if self.strip:
+            args.append("--strip")
+        if self.no_archive:
+            args.append("--debug=noarchive")
+        if self.name:
+            args.extend(["--name", self.name])
+        if self.workpath:
+            args.extend(["--workpath", self.workpath])
+        if self.cached_onefile:
+            # Папка onedir собирается заново при каждой сборке и упаковывается в итоговый файл
+            args.extend(["--distpath", os.path.dirname(self.bundle_dir), "--noconfirm"])
+        elif self.distpath:
+            args.extend(["--distpath", self.distpath])
+        if self.specpath:
+            args.extend(["--specpath", self.specpath])
+        if self.script:
+            args.append(self.script)
+        return args
+    def preview(self):
+        """Команда в виде строки для показа пользователю"""
+        return format_command(self.to_command())
+def format_command(command):
+    if os.name == "nt":
+        return subprocess.list2cmdline(command)
+    return shlex.join(command)
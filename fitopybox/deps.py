@@ -0,0 +1,289 @@
+"""Поиск зависимостей Python-скриптов"""
+import ast
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from .envindex import load_index
+from .paths import cache_dir
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+PARALLEL_SCAN_THRESHOLD = 64
+SCAN_CACHE_VERSION = 1
+REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)")
+# -r x, -rx, --requirement x, --requirement=x и те же формы -c/--constraint
+INCLUDE_OPTION = re.compile(r"^(?:-(?P<short>[rc])|--(?P<long>requirement|constraint)(?=[\s=]|$))[\s=]*(?P<path>.*)$")
+def find_requirements_file(python_file):
+    """Поиск файла requirements.txt в директории Python файла"""
+    directory = os.path.dirname(python_file)
+    requirements_file = os.path.join(directory, "requirements.txt")
+    if os.path.exists(requirements_file):
+        return requirements_file
+    return None
+def find_pyproject_file(python_file):
+    """Поиск pyproject.toml в директории Python файла и выше"""
+    directory = os.path.dirname(os.path.abspath(python_file))
+    while True:
+        pyproject_file = os.path.join(directory, "pyproject.toml")
+        if os.path.exists(pyproject_file):
+            return pyproject_file
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+def requirement_name(requirement):
+    """Имя дистрибутива из строки требования PEP 508 (спецификаторы, extras, маркеры, URL)"""
+    match = REQUIREMENT_NAME.match(requirement)
+    return match.group(1) if match else None
+def parse_requirements_file(requirements_file, seen=None):
+    """Имена дистрибутивов из requirements.txt, включая файлы из -r/--requirement"""
+    seen = seen if seen is not None else set()
+    requirements_file = os.path.abspath(requirements_file)
+    if requirements_file in seen:
+        return []
+    seen.add(requirements_file)
+    with open(requirements_file, "r", encoding="utf-8") as f:
+        content = re.sub(r"\\\r?\n", "", f.read())
+    names = []
+    for line in content.splitlines():
+        line = re.sub(r"(^|\s)#.*$", "", line).strip()
+        if not line:
+            continue
+        option = INCLUDE_OPTION.match(line)
+        if option:
+            included = option.group("path").strip()
+            if included and (option.group("short") or option.group("long")).startswith("r"):
+                names.extend(parse_requirements_file(os.path.join(os.path.dirname(requirements_file), included), seen))
+            continue
+        if line.startswith(("-e", "--editable")):
+            egg = re.search(r"#egg=([A-Za-z0-9._-]+)", line)
+            if egg:
+                names.append(egg.group(1))
+            continue
+        if line.startswith("-"):
+            continue
+        name = requirement_name(line)
+        if name:
+            names.append(name)
+    return names
+def parse_pyproject_dependencies(pyproject_file):
+    """Зависимости из [project] dependencies и [tool.poetry.dependencies]"""
+    if tomllib is None:
+        return []
+    with open(pyproject_file, "rb") as f:
+        data = tomllib.load(f)
+    names = []
+    for requirement in data.get("project", {}).get("dependencies", []):
+        name = requirement_name(requirement)
+        if name:
+            names.append(name)
+    poetry = data.get("tool", {}).get("poetry", {}).get("dependencies", {})
+    names.extend(name for name in poetry if name.lower() != "python")
+    return names
+def declared_requirements(python_file):
+    """Дистрибутивы, объявленные в requirements.txt и pyproject.toml проекта"""
+    names = []
+    req_file = find_requirements_file(python_file)
+    if req_file:
+        names.extend(parse_requirements_file(req_file))
+    pyproject_file = find_pyproject_file(python_file)
+    if pyproject_file:
+        names.extend(parse_pyproject_dependencies(pyproject_file))
+    return names
+def scan_file(python_file):
+    """Разбор одного файла: хэш содержимого и импорты (выполняется и в дочерних процессах)"""
+    with open(python_file, "rb") as f:
+        source = f.read()
+    content_hash = hashlib.sha256(source).hexdigest()
+    try:
+        tree = ast.parse(source, filename=python_file)
+    except (SyntaxError, ValueError):
+        return content_hash, []
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append([alias.name, 0])
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+            imports.append([module, node.level])
+            for alias in node.names:
+                if alias.name != "*":
+                    imports.append([f"{module}.{alias.name}" if module else alias.name, node.level])
+    return content_hash, imports
+class ScanCache:
+    """Кэш результатов разбора файлов проекта, проверяемый по mtime/размеру и хэшу"""
+    def __init__(self, root, kind="scan"):
+        self.root = root
+        key = hashlib.sha1(os.path.normcase(root).encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(cache_dir(kind), f"{key}.json")
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == SCAN_CACHE_VERSION:
+                self.entries = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+    def lookup(self, path):
+        """Импорты файла из кэша или None, если файл нужно разобрать заново"""
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry["imports"]
+        with open(path, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        if content_hash != entry["hash"]:
+            return None
+        entry["mtime"] = stat.st_mtime_ns
+        entry["size"] = stat.st_size
+        self.dirty = True
+        return entry["imports"]
+    def store(self, path, content_hash, imports):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        self.entries[path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size,
+                              "hash": content_hash, "imports": imports}
+        self.dirty = True
+    def save(self):
+        if not self.dirty:
+            return
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": SCAN_CACHE_VERSION, "files": self.entries}, f)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Ошибка сохранения кэша зависимостей: {e}")
+class ScanResult:
+    """Граф импортов проекта: локальные модули и внешние импорты"""
+    def __init__(self, script):
+        self.script = script
+        self.files = {}
+        self.external = set()
+    @property
+    def local_modules(self):
+        return sorted(path for path in self.files if path != self.script)
+def resolve_local_module(name, level, importer, root):
+    """Путь к локальному модулю проекта или None для внешних модулей"""
+    if level:
+        base = os.path.dirname(importer)
+        for _ in range(level - 1):
+            base = os.path.dirname(base)
+    else:
+        base = root
+    parts = [part for part in name.split(".") if part]
+    candidate = os.path.join(base, *parts) if parts else base
+    for path in (candidate + ".py", os.path.join(candidate, "__init__.py")):
+        if os.path.isfile(path):
+            return os.path.normpath(path)
+    return None
+def parse_files(paths, workers=None, scanner=scan_file):
+    """Разбор файлов; при большом количестве - параллельно в нескольких процессах"""
+    if len(paths) < PARALLEL_SCAN_THRESHOLD or workers == 1:
+        results = []
+        for path in paths:
+            try:
+                results.append(scanner(path))
+            except OSError:
+                results.append(None)
+        return results
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(scanner, path) for path in paths]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except OSError:
+                results.append(None)
+        return results
+def scan_project(script, workers=None, use_cache=True):
+    """Обход графа локальных импортов начиная со скрипта с кэшированием по файлам. Разбираются только
+    достижимые файлы; волна обхода с большим числом промахов кэша разбирается в нескольких процессах."""
+    script = os.path.normpath(os.path.abspath(script))
+    root = os.path.dirname(script)
+    cache = ScanCache(root) if use_cache else None
+    result = ScanResult(script)
+    resolved = {}
+    wave = [script]
+    seen = {script}
+    while wave:
+        misses = []
+        for path in wave:
+            imports = cache.lookup(path) if cache else None
+            if imports is None:
+                misses.append(path)
+            else:
+                result.files[path] = imports
+        for path, parsed in zip(misses, parse_files(misses, workers)):
+            if parsed is None:
+                continue
+            content_hash, imports = parsed
+            result.files[path] = imports
+            if cache:
+                cache.store(path, content_hash, imports)
+        next_wave = []
+        for path in wave:
+            for name, level in result.files.get(path, []):
+                key = (name, level, os.path.dirname(path) if level else root)
+                if key not in resolved:
+                    resolved[key] = resolve_local_module(name, level, path, root)
+                local_path = resolved[key]
+                if local_path:
+                    if local_path not in seen:
+                        seen.add(local_path)
+                        next_wave.append(local_path)
+                elif not level and name:
+                    result.external.add(name.split(".")[0])
+        wave = next_wave
+    if cache:
+        cache.save()
+    result.external -= local_top_level_names(root)
+    return result
+def local_top_level_names(root):
+    """Имена модулей и папок проекта (в том числе пакетов без __init__.py)"""
+    names = set()
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return names
+    for entry in entries:
+        if entry.is_dir():
+            names.add(entry.name)
+        elif entry.name.endswith(".py"):
+            names.add(entry.name[:-3])
+    return names
+def find_local_modules(script):
+    """Локальные модули проекта, достижимые из скрипта через импорты"""
+    return scan_project(script).local_modules
+def extract_imports(python_file, index=None):
+    """Сторонние модули скрипта и его зависимостей, которым нужен --hidden-import"""
+    imports = set()
+    try:
+        index = index or load_index()
+        result = scan_project(python_file)
+        imports.update(module for module in result.external
+                       if not module.startswith('_') and not index.is_stdlib(module))
+        for requirement in declared_requirements(python_file):
+            modules = index.modules_for(requirement)
+            if not modules:
+                print(f"Пакет из требований не установлен: {requirement}")
+            imports.update(module for module in modules if not module.startswith('_'))
+    except Exception as e:
+        print(f"Ошибка при извлечении импортов: {e}")
+    return sorted(imports)
@@ -0,0 +1,119 @@
+"""Индекс стандартной библиотеки и установленных пакетов текущего окружения"""
+import hashlib
+import json
+import os
+import re
+import sys
+import sysconfig
+from importlib import metadata
+from .paths import cache_dir
+INDEX_VERSION = 1
+def normalize_name(name):
+    """Нормализация имени дистрибутива по PEP 503"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+def site_directories():
+    """Каталоги sys.path, в которые устанавливаются пакеты"""
+    return sorted({os.path.normcase(os.path.abspath(path)) for path in sys.path
+                   if path and os.path.basename(path) in ("site-packages", "dist-packages")
+                   and os.path.isdir(path)})
+def environment_key():
+    """Ключ окружения: меняется при смене интерпретатора или установке/удалении пакетов"""
+    digest = hashlib.sha256()
+    digest.update(sys.executable.encode("utf-8"))
+    digest.update(sys.version.encode("utf-8"))
+    for path in site_directories():
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = 0
+        digest.update(f"{path}:{mtime}".encode("utf-8"))
+    return digest.hexdigest()
+def stdlib_module_names():
+    names = set(sys.builtin_module_names)
+    if hasattr(sys, "stdlib_module_names"):
+        names.update(sys.stdlib_module_names)
+        return names
+    stdlib_dir = sysconfig.get_paths()["stdlib"]
+    for entry in os.listdir(stdlib_dir):
+        if entry == "site-packages":
+            continue
+        name = entry.split(".")[0]
+        if entry.endswith((".py", ".pyd", ".so")) or os.path.isfile(os.path.join(stdlib_dir, entry, "__init__.py")):
+            names.add(name)
+    dynload_dir = os.path.join(stdlib_dir, "lib-dynload")
+    if os.path.isdir(dynload_dir):
+        names.update(entry.split(".")[0] for entry in os.listdir(dynload_dir))
+    return names
+def distribution_modules(dist):
+    """Импортируемые имена верхнего уровня дистрибутива по top_level.txt или RECORD"""
+    top_level = dist.read_text("top_level.txt")
+    if top_level:
+        return {name.strip().replace("/", ".").split(".")[0] for name in top_level.splitlines() if name.strip()}
+    names = set()
+    for file in dist.files or []:
+        parts = file.parts
+        if not parts or parts[0] in ("..", "__pycache__") or parts[0].endswith((".dist-info", ".egg-info", ".data")):
+            continue
+        if len(parts) > 1:
+            names.add(parts[0])
+        elif parts[0].endswith(".py"):
+            names.add(parts[0][:-3])
+        elif parts[0].endswith((".so", ".pyd")):
+            names.add(parts[0].split(".")[0])
+    return {name for name in names if name.isidentifier()}
+def build_index():
+    dists_to_modules = {}
+    for dist in metadata.distributions():
+        name = dist.metadata["Name"]
+        if not name:
+            continue
+        modules = distribution_modules(dist)
+        dists_to_modules.setdefault(normalize_name(name), set()).update(modules)
+    modules_to_dists = {}
+    for dist_name, modules in dists_to_modules.items():
+        for module in modules:
+            modules_to_dists.setdefault(module, []).append(dist_name)
+    return {
+        "version": INDEX_VERSION,
+        "key": environment_key(),
+        "stdlib": sorted(stdlib_module_names()),
+        "dists_to_modules": {name: sorted(modules) for name, modules in dists_to_modules.items()},
+        "modules_to_dists": {name: sorted(dists) for name, dists in modules_to_dists.items()}
+    }
+class EnvironmentIndex:
+    """Соответствие дистрибутивов и имён модулей; хранится на диске до изменения окружения"""
+    def __init__(self, data):
+        self.key = data["key"]
+        self.stdlib = set(data["stdlib"])
+        self.dists_to_modules = data["dists_to_modules"]
+        self.modules_to_dists = data["modules_to_dists"]
+    def is_stdlib(self, module):
+        return module.split(".")[0] in self.stdlib
+    def is_installed(self, module):
+        return module.split(".")[0] in self.modules_to_dists
+    def distributions_for(self, module):
+        return self.modules_to_dists.get(module.split(".")[0], [])
+    def modules_for(self, distribution):
+        return self.dists_to_modules.get(normalize_name(distribution), [])
+def load_index(rebuild=False):
+    """Индекс окружения из кэша или построенный заново при изменении окружения"""
+    key = environment_key()
+    interpreter = hashlib.sha1(sys.executable.encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(cache_dir("index"), f"{interpreter}.json")
+    if not rebuild:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("key") == key:
+                return EnvironmentIndex(data)
+        except (OSError, ValueError):
+            pass
+    data = build_index()
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Ошибка сохранения индекса окружения: {e}")
+    return EnvironmentIndex(data)
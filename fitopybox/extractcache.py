@@ -0,0 +1,988 @@
+"""Один файл с постоянным кэшем распаковки: программа распаковывается один раз на версию и дальше
+запускается из кэша. PyInstaller собирает папку onedir, а итоговый файл - стартер на C, загрузчик (onefile
+PyInstaller, общий для всех программ с теми же интерпретатором, иконкой и консолью) и дописанный в
+конец zip-архив этой папки. Версия - хэш содержимого архива.
+
+Стартер запускает распакованную версию сразу, без распаковки среды Python; загрузчик работает только
+при первом запуске версии и при очистке кэша. Стартер компилируется компилятором C сборочной машины;
+если компилятора нет, в начале файла остаётся загрузчик, который распаковывает свою среду при каждом запуске."""
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+from .fingerprint import file_digest, toolchain_info
+from .paths import cache_dir
+from .runner import run_build
+LAUNCHER_DIR = "launchers"
+LAUNCHER_NAME = "fitopybox_launcher"
+LAUNCHER_VERSION = 1
+PAYLOAD_FORMAT = 1
+STUB_NAME = "fitopybox_stub"
+STUB_VERSION = 1
+# Поля стартера в комментарии архива - после описания в JSON, через нулевые байты
+STUB_MAGIC = b"\nFPSTUB1\0"
+# Фиксированное время файлов в архиве: одинаковое содержимое даёт одинаковый файл
+PAYLOAD_DATE = (2000, 1, 1, 0, 0, 0)
+# Загрузчику нужны только zipfile и json; остальное не включается, чтобы его собственная распаковка была быстрой
+LAUNCHER_EXCLUDES = ["hashlib", "ssl", "bz2", "lzma", "decimal", "csv", "email", "http", "xml", "unittest",
+                     "pydoc", "tkinter", "sqlite3", "multiprocessing", "asyncio"]
+LAUNCHER_SOURCE = r'''"""Загрузчик программы с постоянным кэшем распаковки (создан FitoPyBox).
+
+Папка программы хранится в zip-архиве в конце этого файла, параметры - в комментарии архива.
+При первом запуске версии архив распаковывается в <кэш>/<имя>/<хэш>, дальше программа
+запускается оттуда. Кэш: FITOPYBOX_APP_CACHE или папка, заданная при сборке, иначе кэш пользователя.
+Если загрузчик запущен стартером, архив - в файле FITOPYBOX_ARCHIVE, а сам загрузчик сохранён в папке программы.
+"""
+import json
+import os
+import shutil
+import stat
+import sys
+import time
+import zipfile
+MARKER = ".fitopybox_extracted"
+LOCK_FILE = ".lock"
+LAUNCHER_PREFIX = ".launcher-"
+# Версии, которые не запускались дольше STALE_AGE, удаляются; проверка - не чаще раза в CLEANUP_INTERVAL
+STALE_AGE = 7 * 24 * 60 * 60
+CLEANUP_INTERVAL = 24 * 60 * 60
+# Незавершённая распаковка старше TEMP_AGE осталась от прерванного запуска
+TEMP_AGE = 60 * 60
+def cache_root(configured):
+    root = os.environ.get("FITOPYBOX_APP_CACHE") or os.path.expandvars(os.path.expanduser(configured))
+    if root:
+        return root
+    if os.name == "nt":
+        return os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), "FitoPyBox", "apps")
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Caches", "FitoPyBox", "apps")
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "fitopybox", "apps")
+class Lock:
+    """Межпроцессная блокировка: одновременные первые запуски ждут, пока один из них распакует версию"""
+    def __init__(self, path):
+        self.file = open(path, "a+b")
+    def __enter__(self):
+        if os.name == "nt":
+            import msvcrt
+            self.file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+    def __exit__(self, *exc_info):
+        if os.name == "nt":
+            import msvcrt
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+def member_path(root, info):
+    return os.path.join(root, *info.filename.rstrip("/").split("/"))
+def is_complete(target, archive, key):
+    """Версия распакована целиком: метка с ключом версии и все файлы архива на месте с нужным размером"""
+    try:
+        with open(os.path.join(target, MARKER), "r", encoding="utf-8") as f:
+            if f.read() != key:
+                return False
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            path_stat = os.lstat(member_path(target, info))
+            if not stat.S_ISLNK(info.external_attr >> 16) and path_stat.st_size != info.file_size:
+                return False
+    except OSError:
+        return False
+    return True
+def extract(archive, target, key):
+    """Распаковка во временную папку и перенос на место одной операцией. Контрольные суммы файлов
+    проверяет zipfile при чтении; метка версии пишется последней."""
+    temp_dir = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    for info in archive.infolist():
+        path = member_path(temp_dir, info)
+        if info.is_dir():
+            os.makedirs(path, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        mode = info.external_attr >> 16
+        if stat.S_ISLNK(mode) and hasattr(os, "symlink"):
+            os.symlink(archive.read(info).decode("utf-8"), path)
+            continue
+        with archive.open(info) as source, open(path, "wb") as destination:
+            shutil.copyfileobj(source, destination, 1024 * 1024)
+        if mode & 0o777:
+            os.chmod(path, mode & 0o777)
+    with open(os.path.join(temp_dir, MARKER), "w", encoding="utf-8") as f:
+        f.write(key)
+    if os.path.isdir(target):
+        # Повреждённая версия: переименование освобождает место, даже если удалить её сразу нельзя
+        broken = f"{target}.{os.getpid()}.old"
+        os.replace(target, broken)
+        shutil.rmtree(broken, ignore_errors=True)
+    os.replace(temp_dir, target)
+def cleanup(app_dir, current):
+    """Удаление давно не запускавшихся версий, загрузчиков прошлых сборок и остатков прерванных распаковок.
+    Папка сначала переименовывается: в Windows это не удастся, пока версия запущена, и она останется
+    до следующей проверки."""
+    now = time.time()
+    for entry in os.scandir(app_dir):
+        if entry.name.startswith(LAUNCHER_PREFIX) and entry.is_file(follow_symlinks=False):
+            if os.path.normcase(entry.path) != os.path.normcase(sys.executable) \
+                    and now - entry.stat().st_mtime > STALE_AGE:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+            continue
+        if entry.name == current or not entry.is_dir(follow_symlinks=False):
+            continue
+        leftover = "." in entry.name
+        try:
+            used = entry.stat().st_mtime if leftover else os.path.getmtime(os.path.join(entry.path, MARKER))
+        except OSError:
+            used = entry.stat().st_mtime
+        if now - used < (TEMP_AGE if leftover else STALE_AGE):
+            continue
+        removed = entry.path if leftover else f"{entry.path}.{os.getpid()}.old"
+        try:
+            os.replace(entry.path, removed)
+        except OSError:
+            continue
+        shutil.rmtree(removed, ignore_errors=True)
+    os.utime(os.path.join(app_dir, LOCK_FILE))
+def prepare(archive, info):
+    """Папка распакованной версии; распаковка и очистка - под блокировкой папки программы"""
+    app_dir = os.path.join(cache_root(info.get("root", "")), info["name"])
+    target = os.path.join(app_dir, info["key"])
+    lock_path = os.path.join(app_dir, LOCK_FILE)
+    complete = is_complete(target, archive, info["key"])
+    try:
+        cleanup_due = time.time() - os.path.getmtime(lock_path) > CLEANUP_INTERVAL
+    except OSError:
+        cleanup_due = True
+    if complete and not cleanup_due:
+        os.utime(os.path.join(target, MARKER))
+        return target
+    os.makedirs(app_dir, exist_ok=True)
+    with Lock(lock_path):
+        if not is_complete(target, archive, info["key"]):
+            extract(archive, target, info["key"])
+        os.utime(os.path.join(target, MARKER))
+        cleanup(app_dir, info["key"])
+    return target
+def launch(executable, args, archive_path):
+    """Запуск программы из кэша с окружением, каким оно было до запуска загрузчика"""
+    env = {key: value for key, value in os.environ.items() if not key.startswith(("_MEI", "_PYI"))}
+    for name in ("LD_LIBRARY_PATH", "DYLD_LIBRARY_PATH", "LIBPATH"):
+        original = env.pop(name + "_ORIG", None)
+        if original is not None:
+            env[name] = original
+        else:
+            env.pop(name, None)
+    env["FITOPYBOX_LAUNCHER"] = archive_path
+    if os.name == "nt":
+        import subprocess
+        sys.exit(subprocess.call([executable] + args, env=env))
+    os.execve(executable, [executable] + args, env)
+def main():
+    archive_path = os.environ.pop("FITOPYBOX_ARCHIVE", "") or sys.executable
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            info = json.loads(archive.comment.split(b"\n")[0].decode("utf-8"))
+            target = prepare(archive, info)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        if sys.stderr:
+            print(f"Не удалось подготовить программу к запуску: {e}", file=sys.stderr)
+        sys.exit(1)
+    launch(os.path.join(target, *info["executable"].split("/")), sys.argv[1:], archive_path)
+if __name__ == "__main__":
+    main()
+'''
+STUB_SOURCE = r'''/* Стартер программы с постоянным кэшем распаковки (создан FitoPyBox).
+
+Параметры программы - в комментарии zip-архива в конце этого файла, после описания в JSON.
+Если версия уже распакована в кэш целиком и очистка кэша не нужна, программа сразу запускается
+из кэша: ни архив, ни среда Python при этом не распаковываются. Иначе загрузчик из этого файла
+сохраняется в папку программы в кэше и запускается: он распаковывает версию и удаляет старые.
+*/
+#define _FILE_OFFSET_BITS 64
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <sys/types.h>
+#include <sys/stat.h>
+#ifdef _WIN32
+#include <windows.h>
+#include <sys/utime.h>
+#define SEP '\\'
+#define SUFFIX ".exe"
+#else
+#include <unistd.h>
+#include <utime.h>
+#define SEP '/'
+#define SUFFIX ""
+#endif
+#ifdef __APPLE__
+#include <mach-o/dyld.h>
+#endif
+#define MAGIC "\nFPSTUB1"
+#define MARKER ".fitopybox_extracted"
+#define LOCK_FILE ".lock"
+#define LAUNCHER_PREFIX ".launcher-"
+#define CLEANUP_INTERVAL (24 * 60 * 60)
+#define PATH_SIZE 4096
+#define EOCD_SIZE 22
+#define MAX_COMMENT 65535
+enum {NAME, KEY, EXECUTABLE, ROOT, LAUNCHER_KEY, LAUNCHER_OFFSET, LAUNCHER_SIZE, FIELDS};
+static char self_path[PATH_SIZE];
+static char comment[MAX_COMMENT + 1];
+static const char *fields[FIELDS];
+static long long eocd_offset;
+static unsigned long directory_size, directory_entries;
+static int zip64;
+static unsigned read16(const unsigned char *p)
+{
+    return p[0] | p[1] << 8;
+}
+static unsigned long read32(const unsigned char *p)
+{
+    return (unsigned long)read16(p) | (unsigned long)read16(p + 2) << 16;
+}
+static void fail(const char *message, const char *detail)
+{
+    fprintf(stderr, "%s: %s\n", message, detail);
+    exit(1);
+}
+#ifdef _WIN32
+static wchar_t *widen(const char *text)
+{
+    int size = MultiByteToWideChar(CP_UTF8, 0, text, -1, NULL, 0);
+    wchar_t *result = malloc(size * sizeof(wchar_t));
+    MultiByteToWideChar(CP_UTF8, 0, text, -1, result, size);
+    return result;
+}
+static char *narrow(const wchar_t *text)
+{
+    int size = WideCharToMultiByte(CP_UTF8, 0, text, -1, NULL, 0, NULL, NULL);
+    char *result = malloc(size);
+    WideCharToMultiByte(CP_UTF8, 0, text, -1, result, size, NULL, NULL);
+    return result;
+}
+static const char *get_env(const char *name)
+{
+    wchar_t *wide_name = widen(name);
+    const wchar_t *value = _wgetenv(wide_name);
+    free(wide_name);
+    return value && *value ? narrow(value) : NULL;
+}
+static FILE *open_file(const char *path, const wchar_t *mode)
+{
+    wchar_t *wide_path = widen(path);
+    FILE *file = _wfopen(wide_path, mode);
+    free(wide_path);
+    return file;
+}
+#define READ_MODE L"rb"
+#define WRITE_MODE L"wb"
+static int file_info(const char *path, long long *size, long long *mtime)
+{
+    struct _stat64 info;
+    wchar_t *wide_path = widen(path);
+    int result = _wstat64(wide_path, &info);
+    free(wide_path);
+    if (result == 0 && size) *size = info.st_size;
+    if (result == 0 && mtime) *mtime = info.st_mtime;
+    return result;
+}
+static void touch(const char *path)
+{
+    wchar_t *wide_path = widen(path);
+    _wutime(wide_path, NULL);
+    free(wide_path);
+}
+static void make_dir(const char *path)
+{
+    wchar_t *wide_path = widen(path);
+    CreateDirectoryW(wide_path, NULL);
+    free(wide_path);
+}
+static int replace_file(const char *source, const char *target)
+{
+    wchar_t *wide_source = widen(source), *wide_target = widen(target);
+    int result = MoveFileExW(wide_source, wide_target, MOVEFILE_REPLACE_EXISTING) ? 0 : -1;
+    free(wide_source);
+    free(wide_target);
+    return result;
+}
+static int find_self(const char *argv0)
+{
+    wchar_t path[PATH_SIZE];
+    DWORD length = GetModuleFileNameW(NULL, path, PATH_SIZE);
+    char *result;
+    (void)argv0;
+    if (length == 0 || length >= PATH_SIZE) return -1;
+    result = narrow(path);
+    if (strlen(result) >= PATH_SIZE) return -1;
+    strcpy(self_path, result);
+    return 0;
+}
+static void set_env(const char *name, const char *value)
+{
+    wchar_t *wide_name = widen(name), *wide_value = widen(value);
+    SetEnvironmentVariableW(wide_name, wide_value);
+    _wputenv_s(wide_name, wide_value);
+    free(wide_name);
+    free(wide_value);
+}
+static const wchar_t *command_arguments(void)
+{
+    /* Аргументы командной строки после имени программы, без изменений */
+    const wchar_t *line = GetCommandLineW();
+    if (*line == L'"') {
+        line++;
+        while (*line && *line != L'"') line++;
+        if (*line) line++;
+    } else {
+        while (*line && *line != L' ' && *line != L'\t') line++;
+    }
+    return line;
+}
+static int run(const char *program, char **argv)
+{
+    /* Программа запускается дочерним процессом; стартер ждёт её и завершается с её кодом */
+    wchar_t *wide_program = widen(program);
+    const wchar_t *arguments = command_arguments();
+    wchar_t *command = malloc((wcslen(wide_program) + wcslen(arguments) + 3) * sizeof(wchar_t));
+    STARTUPINFOW startup;
+    PROCESS_INFORMATION process;
+    DWORD code = 1;
+    (void)argv;
+    wcscpy(command, L"\"");
+    wcscat(command, wide_program);
+    wcscat(command, L"\"");
+    wcscat(command, arguments);
+    memset(&startup, 0, sizeof(startup));
+    startup.cb = sizeof(startup);
+    SetConsoleCtrlHandler(NULL, TRUE);
+    if (!CreateProcessW(wide_program, command, NULL, NULL, TRUE, 0, NULL, NULL, &startup, &process)) {
+        fail("Не удалось запустить программу", program);
+    }
+    WaitForSingleObject(process.hProcess, INFINITE);
+    GetExitCodeProcess(process.hProcess, &code);
+    return (int)code;
+}
+static unsigned long process_id(void)
+{
+    return GetCurrentProcessId();
+}
+#else
+static const char *get_env(const char *name)
+{
+    const char *value = getenv(name);
+    return value && *value ? value : NULL;
+}
+static FILE *open_file(const char *path, const char *mode)
+{
+    return fopen(path, mode);
+}
+#define READ_MODE "rb"
+#define WRITE_MODE "wb"
+static int file_info(const char *path, long long *size, long long *mtime)
+{
+    struct stat info;
+    int result = lstat(path, &info);
+    if (result == 0 && size) *size = info.st_size;
+    if (result == 0 && mtime) *mtime = info.st_mtime;
+    return result;
+}
+static void touch(const char *path)
+{
+    utime(path, NULL);
+}
+static void make_dir(const char *path)
+{
+    mkdir(path, 0777);
+}
+static int replace_file(const char *source, const char *target)
+{
+    chmod(source, 0755);
+    return rename(source, target);
+}
+static int find_self(const char *argv0)
+{
+#ifdef __APPLE__
+    char path[PATH_SIZE];
+    uint32_t size = sizeof(path);
+    if (_NSGetExecutablePath(path, &size) == 0 && realpath(path, self_path)) return 0;
+#else
+    ssize_t length = readlink("/proc/self/exe", self_path, PATH_SIZE - 1);
+    if (length > 0) {
+        self_path[length] = 0;
+        return 0;
+    }
+#endif
+    return argv0 && strchr(argv0, '/') && realpath(argv0, self_path) ? 0 : -1;
+}
+static void set_env(const char *name, const char *value)
+{
+    setenv(name, value, 1);
+}
+static int run(const char *program, char **argv)
+{
+    /* Программа замещает стартер в том же процессе */
+    argv[0] = (char *)program;
+    execv(program, argv);
+    fail("Не удалось запустить программу", program);
+    return 1;
+}
+static unsigned long process_id(void)
+{
+    return (unsigned long)getpid();
+}
+#endif
+static int seek(FILE *file, long long offset, int origin)
+{
+#ifdef _WIN32
+    return _fseeki64(file, offset, origin);
+#else
+    return fseeko(file, (off_t)offset, origin);
+#endif
+}
+static long long tell(FILE *file)
+{
+#ifdef _WIN32
+    return _ftelli64(file);
+#else
+    return (long long)ftello(file);
+#endif
+}
+static void join(char *result, const char *directory, const char *name)
+{
+    /* Путь к файлу в папке; "/" в имени из архива заменяется разделителем системы */
+    size_t length = strlen(directory);
+    char *p;
+    if (length + strlen(name) + 2 > PATH_SIZE) fail("Слишком длинный путь", name);
+    strcpy(result, directory);
+    if (length && result[length - 1] != SEP && result[length - 1] != '/') result[length++] = SEP;
+    strcpy(result + length, name);
+    for (p = result + length; *p; p++) {
+        if (*p == '/') *p = SEP;
+    }
+}
+static void make_dirs(const char *path)
+{
+    char partial[PATH_SIZE];
+    size_t i;
+    for (i = 1; path[i]; i++) {
+        if (path[i] == SEP || path[i] == '/') {
+            memcpy(partial, path, i);
+            partial[i] = 0;
+            make_dir(partial);
+        }
+    }
+    make_dir(path);
+}
+static int read_params(FILE *file)
+{
+    /* Конец центрального каталога zip и поля стартера из комментария архива */
+    static unsigned char tail[MAX_COMMENT + EOCD_SIZE];
+    long long size, start;
+    size_t length, i, comment_length;
+    const char *field;
+    int index;
+    if (seek(file, 0, SEEK_END) != 0 || (size = tell(file)) < EOCD_SIZE) return -1;
+    length = size < (long long)sizeof(tail) ? (size_t)size : sizeof(tail);
+    start = size - (long long)length;
+    if (seek(file, start, SEEK_SET) != 0 || fread(tail, 1, length, file) != length) return -1;
+    for (i = length - EOCD_SIZE + 1; i-- > 0;) {
+        if (memcmp(tail + i, "PK\5\6", 4) == 0 && read16(tail + i + 20) == length - i - EOCD_SIZE) break;
+        if (i == 0) return -1;
+    }
+    eocd_offset = start + (long long)i;
+    directory_entries = read16(tail + i + 10);
+    directory_size = read32(tail + i + 12);
+    zip64 = directory_entries == 0xFFFF || directory_size == 0xFFFFFFFFUL || read32(tail + i + 16) == 0xFFFFFFFFUL;
+    comment_length = length - i - EOCD_SIZE;
+    memcpy(comment, tail + i + EOCD_SIZE, comment_length);
+    comment[comment_length] = 0;
+    for (i = 0; i + sizeof(MAGIC) <= comment_length; i++) {
+        if (memcmp(comment + i, MAGIC, sizeof(MAGIC)) == 0) break;
+    }
+    if (i + sizeof(MAGIC) > comment_length) return -1;
+    field = comment + i + sizeof(MAGIC);
+    for (index = 0; index < FIELDS; index++) {
+        if (field >= comment + comment_length) return -1;
+        fields[index] = field;
+        field += strlen(field) + 1;
+    }
+    return 0;
+}
+static void home_dir(char *result)
+{
+#ifdef _WIN32
+    const char *home = get_env("USERPROFILE");
+#else
+    const char *home = get_env("HOME");
+#endif
+    if (!home) fail("Не найдена папка пользователя", "HOME");
+    if (strlen(home) >= PATH_SIZE) fail("Слишком длинный путь", home);
+    strcpy(result, home);
+}
+static void expand(const char *text, char *result)
+{
+    /* Как os.path.expanduser и os.path.expandvars: ~ в начале, $NAME, ${NAME}, в Windows и %NAME% */
+    char name[PATH_SIZE];
+    size_t length = 0, name_length;
+    const char *value, *end;
+    result[0] = 0;
+    if (text[0] == '~' && (text[1] == 0 || text[1] == '/' || text[1] == SEP)) {
+        home_dir(result);
+        length = strlen(result);
+        text++;
+    }
+    while (*text) {
+        value = NULL;
+        end = text + 1;
+        if (text[0] == '$' && text[1] == '{' && (end = strchr(text + 2, '}')) != NULL) {
+            name_length = (size_t)(end - text - 2);
+            memcpy(name, text + 2, name_length < PATH_SIZE ? name_length : 0);
+            end++;
+        } else if (text[0] == '$') {
+            for (end = text + 1; *end == '_' || (*end >= '0' && *end <= '9') || (*end >= 'a' && *end <= 'z') ||
+                                 (*end >= 'A' && *end <= 'Z'); end++) {
+            }
+            name_length = (size_t)(end - text - 1);
+            memcpy(name, text + 1, name_length < PATH_SIZE ? name_length : 0);
+#ifdef _WIN32
+        } else if (text[0] == '%' && (end = strchr(text + 1, '%')) != NULL) {
+            name_length = (size_t)(end - text - 1);
+            memcpy(name, text + 1, name_length < PATH_SIZE ? name_length : 0);
+            end++;
+#endif
+        } else {
+            end = text + 1;
+            name_length = 0;
+        }
+        if (name_length >= PATH_SIZE) fail("Слишком длинный путь", text);
+        if (name_length) {
+            name[name_length] = 0;
+            value = get_env(name);
+        }
+        if (!value) {
+            /* Неизвестная переменная остаётся как есть */
+            value = text;
+            name_length = (size_t)(end - text);
+        } else {
+            name_length = strlen(value);
+        }
+        if (length + name_length >= PATH_SIZE) fail("Слишком длинный путь", text);
+        memcpy(result + length, value, name_length);
+        length += name_length;
+        result[length] = 0;
+        text = end;
+    }
+}
+static void cache_root(char *result)
+{
+    /* Как cache_root в загрузчике: FITOPYBOX_APP_CACHE, папка из сборки или кэш пользователя */
+    char base[PATH_SIZE];
+    const char *root = get_env("FITOPYBOX_APP_CACHE");
+    if (root) {
+        if (strlen(root) >= PATH_SIZE) fail("Слишком длинный путь", root);
+        strcpy(result, root);
+        return;
+    }
+    expand(fields[ROOT], result);
+    if (result[0]) return;
+#ifdef _WIN32
+    root = get_env("LOCALAPPDATA");
+    if (root) {
+        join(base, root, "FitoPyBox");
+    } else {
+        home_dir(result);
+        join(base, result, "FitoPyBox");
+    }
+    join(result, base, "apps");
+#elif defined(__APPLE__)
+    home_dir(result);
+    join(base, result, "Library/Caches/FitoPyBox");
+    join(result, base, "apps");
+#else
+    root = get_env("XDG_CACHE_HOME");
+    if (root) {
+        join(base, root, "fitopybox");
+    } else {
+        home_dir(result);
+        join(base, result, ".cache/fitopybox");
+    }
+    join(result, base, "apps");
+#endif
+}
+static int is_complete(FILE *file, const char *target)
+{
+    /* Как is_complete в загрузчике: метка с ключом версии и все файлы архива на месте с нужным размером */
+    char path[PATH_SIZE], name[PATH_SIZE], marker[64];
+    unsigned char *directory;
+    unsigned long index, name_length, position = 0;
+    long long size;
+    FILE *marker_file;
+    size_t length;
+    int complete = 1;
+    join(path, target, MARKER);
+    marker_file = open_file(path, READ_MODE);
+    if (!marker_file) return 0;
+    length = fread(marker, 1, sizeof(marker) - 1, marker_file);
+    fclose(marker_file);
+    marker[length] = 0;
+    if (strcmp(marker, fields[KEY]) != 0 || zip64) return 0;
+    directory = malloc(directory_size ? directory_size : 1);
+    if (!directory || seek(file, eocd_offset - (long long)directory_size, SEEK_SET) != 0 ||
+        fread(directory, 1, directory_size, file) != directory_size) {
+        free(directory);
+        return 0;
+    }
+    for (index = 0; complete && index < directory_entries; index++) {
+        if (position + 46 > directory_size || memcmp(directory + position, "PK\1\2", 4) != 0) {
+            complete = 0;
+            break;
+        }
+        name_length = read16(directory + position + 28);
+        if (position + 46 + name_length > directory_size || name_length >= PATH_SIZE) {
+            complete = 0;
+            break;
+        }
+        memcpy(name, directory + position + 46, name_length);
+        name[name_length] = 0;
+        if (name_length && name[name_length - 1] != '/') {
+            join(path, target, name);
+            if (file_info(path, &size, NULL) != 0) {
+                complete = 0;
+            } else if (((read32(directory + position + 38) >> 16) & 0170000) != 0120000 &&
+                       size != (long long)read32(directory + position + 24)) {
+                complete = 0;
+            }
+        }
+        position += 46 + name_length + read16(directory + position + 30) + read16(directory + position + 32);
+    }
+    free(directory);
+    return complete;
+}
+static int cleanup_due(const char *app_dir)
+{
+    char path[PATH_SIZE];
+    long long mtime;
+    join(path, app_dir, LOCK_FILE);
+    return file_info(path, NULL, &mtime) != 0 || (long long)time(NULL) - mtime > CLEANUP_INTERVAL;
+}
+static void save_launcher(FILE *file, const char *path)
+{
+    /* Загрузчик из этого файла во временный файл рядом и перенос на место одной операцией */
+    char temp_path[PATH_SIZE], buffer[65536];
+    long long remaining = atoll(fields[LAUNCHER_SIZE]);
+    size_t chunk;
+    FILE *output;
+    if (strlen(path) + 32 >= PATH_SIZE) fail("Слишком длинный путь", path);
+    sprintf(temp_path, "%s.%lu.tmp", path, process_id());
+    output = open_file(temp_path, WRITE_MODE);
+    if (!output) fail("Не удалось сохранить загрузчик", temp_path);
+    if (seek(file, atoll(fields[LAUNCHER_OFFSET]), SEEK_SET) != 0) fail("Не удалось прочитать загрузчик", self_path);
+    while (remaining > 0) {
+        chunk = fread(buffer, 1, remaining < (long long)sizeof(buffer) ? (size_t)remaining : sizeof(buffer), file);
+        if (chunk == 0 || fwrite(buffer, 1, chunk, output) != chunk) {
+            fclose(output);
+            remove(temp_path);
+            fail("Не удалось сохранить загрузчик", temp_path);
+        }
+        remaining -= (long long)chunk;
+    }
+    if (fclose(output) != 0 || replace_file(temp_path, path) != 0) {
+        remove(temp_path);
+        fail("Не удалось сохранить загрузчик", path);
+    }
+}
+static int start(char **argv)
+{
+    char root[PATH_SIZE], app_dir[PATH_SIZE], target[PATH_SIZE], path[PATH_SIZE], name[PATH_SIZE];
+    long long size;
+    FILE *file;
+    if (find_self(argv ? argv[0] : NULL) != 0) fail("Не удалось определить путь к программе", argv ? argv[0] : "");
+    file = open_file(self_path, READ_MODE);
+    if (!file || read_params(file) != 0) fail("Не удалось прочитать параметры программы", self_path);
+    cache_root(root);
+    join(app_dir, root, fields[NAME]);
+    join(target, app_dir, fields[KEY]);
+    set_env("FITOPYBOX_LAUNCHER", self_path);
+    if (!cleanup_due(app_dir) && is_complete(file, target)) {
+        fclose(file);
+        join(path, target, MARKER);
+        touch(path);
+        join(path, target, fields[EXECUTABLE]);
+        return run(path, argv);
+    }
+    /* Первый запуск версии, повреждённая версия или пора очистить кэш: дальше работает загрузчик */
+    if (strlen(fields[LAUNCHER_KEY]) + strlen(LAUNCHER_PREFIX SUFFIX) >= PATH_SIZE) fail("Слишком длинный путь", "");
+    sprintf(name, "%s%s%s", LAUNCHER_PREFIX, fields[LAUNCHER_KEY], SUFFIX);
+    join(path, app_dir, name);
+    if (file_info(path, &size, NULL) != 0 || size != atoll(fields[LAUNCHER_SIZE])) {
+        make_dirs(app_dir);
+        save_launcher(file, path);
+    }
+    fclose(file);
+    set_env("FITOPYBOX_ARCHIVE", self_path);
+    return run(path, argv);
+}
+#ifdef _WIN32
+int wmain(int argc, wchar_t **argv)
+{
+    (void)argc;
+    (void)argv;
+    SetConsoleOutputCP(CP_UTF8);
+    return start(NULL);
+}
+#else
+int main(int argc, char **argv)
+{
+    (void)argc;
+    return start(argv);
+}
+#endif
+'''
+def launcher_key(config):
+    """Ключ загрузчика: его исходный код и состав, интерпретатор и PyInstaller, режим консоли и иконка"""
+    digest = hashlib.sha256()
+    parts = [str(LAUNCHER_VERSION), LAUNCHER_SOURCE, " ".join(LAUNCHER_EXCLUDES),
+             json.dumps(toolchain_info(config.python), sort_keys=True), str(config.no_console)]
+    if config.icon:
+        icon = os.path.join(config.script_dir, config.icon_file)
+        parts.append(file_digest(icon) if os.path.isfile(icon) else icon)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+def executable_suffix():
+    return ".exe" if os.name == "nt" else ""
+def launcher_path(config):
+    return os.path.join(cache_dir(LAUNCHER_DIR), launcher_key(config) + executable_suffix())
+def cached_launcher(config):
+    """Готовый загрузчик из кэша или None"""
+    path = launcher_path(config)
+    return path if os.path.isfile(path) else None
+def launcher_build(config):
+    """Команда PyInstaller для загрузчика и папка, в которой она запускается"""
+    staging = cache_dir(LAUNCHER_DIR, f"build.{os.getpid()}")
+    script = os.path.join(staging, LAUNCHER_NAME + ".py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write(LAUNCHER_SOURCE)
+    command = config.launcher() + ["--onefile", "--noconfirm", "--name", LAUNCHER_NAME,
+                                   "--distpath", os.path.join(staging, "dist"),
+                                   "--workpath", os.path.join(staging, "build"), "--specpath", staging]
+    for module in LAUNCHER_EXCLUDES:
+        command.extend(["--exclude-module", module])
+    if config.no_console:
+        command.append("--noconsole")
+    if config.icon:
+        command.extend(["--icon", os.path.join(config.script_dir, config.icon_file)])
+    command.append(script)
+    return command, staging
+def install_launcher(config, staging):
+    """Перенос собранного загрузчика в кэш; временная папка сборки удаляется"""
+    built = os.path.join(staging, "dist", LAUNCHER_NAME + executable_suffix())
+    try:
+        if not os.path.isfile(built):
+            raise RuntimeError(f"Загрузчик не создан: {built}")
+        os.replace(built, launcher_path(config))
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return launcher_path(config)
+def build_launcher(config, on_line=print):
+    """Загрузчик из кэша или собранный сейчас (один раз для интерпретатора, иконки и режима консоли)"""
+    cached = cached_launcher(config)
+    if cached:
+        return cached
+    command, staging = launcher_build(config)
+    on_line("Сборка загрузчика для режима с кэшем распаковки...")
+    try:
+        returncode, _ = run_build(command, cwd=staging, on_line=on_line)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if returncode != 0:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise RuntimeError(f"Сборка загрузчика завершилась с кодом {returncode}")
+    return install_launcher(config, staging)
+def find_compiler():
+    """Компилятор C для стартера: переменная CC, иначе cc, gcc или clang (в Windows - gcc из MinGW
+    или cl из среды Visual Studio); None, если компилятора нет"""
+    names = [os.environ.get("CC", "")] + (["gcc", "cl"] if os.name == "nt" else ["cc", "gcc", "clang"])
+    for name in names:
+        path = shutil.which(name) if name else None
+        if path:
+            return path
+    return None
+def is_msvc(compiler):
+    return os.path.splitext(os.path.basename(compiler))[0].lower() == "cl"
+def stub_key(config, compiler=None):
+    """Ключ стартера: его исходный код, компилятор, режим консоли и иконка; "", если компилятора нет"""
+    compiler = compiler or find_compiler()
+    if compiler is None:
+        return ""
+    digest = hashlib.sha256()
+    parts = [str(STUB_VERSION), STUB_SOURCE, compiler, str(os.path.getmtime(compiler)), str(config.no_console)]
+    if config.icon and os.name == "nt":
+        icon = os.path.join(config.script_dir, config.icon_file)
+        parts.append(file_digest(icon) if os.path.isfile(icon) else icon)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+def stub_path(config, compiler):
+    return os.path.join(cache_dir(LAUNCHER_DIR), f"stub-{stub_key(config, compiler)}{executable_suffix()}")
+def stub_build(config, compiler):
+    """Команды компиляции стартера и папка, в которой они запускаются. None, если в Windows иконку
+    нечем встроить: файл без иконки хуже, чем загрузчик PyInstaller в начале файла."""
+    staging = cache_dir(LAUNCHER_DIR, f"stub.{os.getpid()}")
+    source = os.path.join(staging, STUB_NAME + ".c")
+    with open(source, "w", encoding="utf-8") as f:
+        f.write(STUB_SOURCE)
+    output = os.path.join(staging, STUB_NAME + executable_suffix())
+    msvc = is_msvc(compiler)
+    steps = []
+    if msvc:
+        command = [compiler, "/nologo", "/O2", "/utf-8", source, f"/Fe{output}"]
+    else:
+        command = [compiler, "-O2", "-o", output, source]
+    if os.name == "nt":
+        if config.icon:
+            resource_compiler = shutil.which("rc" if msvc else "windres")
+            if resource_compiler is None:
+                shutil.rmtree(staging, ignore_errors=True)
+                return None
+            script = os.path.join(staging, STUB_NAME + ".rc")
+            icon = os.path.join(config.script_dir, config.icon_file).replace("\\", "\\\\")
+            with open(script, "w", encoding="utf-8") as f:
+                f.write(f'1 ICON "{icon}"\n')
+            resource = os.path.join(staging, STUB_NAME + (".res" if msvc else "_res.o"))
+            if msvc:
+                steps.append([resource_compiler, "/nologo", "/fo", resource, script])
+            else:
+                steps.append([resource_compiler, script, "-O", "coff", "-o", resource])
+            command.append(resource)
+        if msvc:
+            command.append("/link")
+            if config.no_console:
+                command.extend(["/SUBSYSTEM:WINDOWS", "/ENTRY:wmainCRTStartup"])
+        else:
+            command.append("-municode")
+            if config.no_console:
+                command.append("-mwindows")
+    steps.append(command)
+    return steps, staging
+def build_stub(config, on_line=print):
+    """Стартер из кэша или скомпилированный сейчас; None, если его не удалось получить: тогда в начале
+    файла остаётся загрузчик PyInstaller, и сборка не прерывается"""
+    compiler = find_compiler()
+    if compiler is None:
+        on_line("Компилятор C не найден: без стартера загрузчик распаковывает свою среду Python при каждом запуске")
+        return None
+    path = stub_path(config, compiler)
+    if os.path.isfile(path):
+        return path
+    build = stub_build(config, compiler)
+    if build is None:
+        on_line("Не найден компилятор ресурсов для иконки стартера: файл запускается через загрузчик PyInstaller")
+        return None
+    steps, staging = build
+    on_line(f"Компиляция стартера для режима с кэшем распаковки ({compiler})...")
+    try:
+        for command in steps:
+            returncode, _ = run_build(command, cwd=staging, on_line=on_line)
+            if returncode != 0:
+                on_line(f"Компиляция стартера завершилась с кодом {returncode}: файл запускается через загрузчик")
+                return None
+        os.replace(os.path.join(staging, STUB_NAME + executable_suffix()), path)
+    except OSError as e:
+        on_line(f"Ошибка компиляции стартера: {e}")
+        return None
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return path
+def bundle_entries(root):
+    """Файлы и символические ссылки папки в стабильном порядке"""
+    for directory, dirs, files in os.walk(root):
+        dirs.sort()
+        links = [name for name in dirs if os.path.islink(os.path.join(directory, name))]
+        for name in sorted(files + links):
+            yield os.path.join(directory, name)
+def pack_bundle(config, launcher, stub=None):
+    """Итоговый файл: стартер (если есть), загрузчик и zip-архив папки onedir.
+    Ключ версии - хэш имён, прав и содержимого файлов."""
+    bundle = config.bundle_dir
+    executable = os.path.join(bundle, os.path.basename(config.artifact_path))
+    if not os.path.isfile(executable):
+        raise RuntimeError(f"Папка программы не найдена: {bundle}")
+    os.makedirs(config.output_dir, exist_ok=True)
+    temp_path = f"{config.artifact_path}.{os.getpid()}.tmp"
+    launcher_offset = 0
+    with open(temp_path, "wb") as output:
+        for path in ([stub] if stub else []) + [launcher]:
+            launcher_offset = output.tell()
+            with open(path, "rb") as source:
+                shutil.copyfileobj(source, output, 1024 * 1024)
+    digest = hashlib.sha256()
+    files = 0
+    try:
+        with zipfile.ZipFile(temp_path, "a", compression=zipfile.ZIP_DEFLATED) as archive:
+            for path in bundle_entries(bundle):
+                name = os.path.relpath(path, bundle).replace(os.sep, "/")
+                path_stat = os.lstat(path)
+                info = zipfile.ZipInfo(name, date_time=PAYLOAD_DATE)
+                info.external_attr = (path_stat.st_mode & 0xFFFF) << 16
+                info.compress_type = zipfile.ZIP_DEFLATED
+                digest.update(f"{name}\0{path_stat.st_mode}\0".encode("utf-8"))
+                if os.path.islink(path):
+                    target = os.readlink(path).encode("utf-8")
+                    digest.update(target)
+                    archive.writestr(info, target)
+                    continue
+                with open(path, "rb") as source, archive.open(info, "w") as destination:
+                    for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                        digest.update(chunk)
+                        destination.write(chunk)
+                files += 1
+            key = digest.hexdigest()[:16]
+            info = {"format": PAYLOAD_FORMAT, "name": config.output_name, "key": key,
+                    "executable": os.path.basename(executable), "root": config.extract_dir}
+            comment = json.dumps(info).encode("utf-8")
+            if stub:
+                fields = [info["name"], key, info["executable"], info["root"], launcher_key(config),
+                          str(launcher_offset), str(os.path.getsize(launcher))]
+                comment += STUB_MAGIC + b"".join(field.encode("utf-8") + b"\0" for field in fields)
+            archive.comment = comment
+        os.chmod(temp_path, 0o755)
+        os.replace(temp_path, config.artifact_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return {"key": key, "files": files, "size": os.path.getsize(config.artifact_path), "stub": bool(stub)}
+def pack_cached_onefile(config, on_line=print):
+    """Упаковка собранной папки onedir в один файл с кэшем распаковки; возвращает сводку"""
+    summary = pack_bundle(config, build_launcher(config, on_line), build_stub(config, on_line))
+    on_line(f"Один файл с кэшем распаковки: версия {summary['key']}, файлов {summary['files']}"
+            f"{', со стартером' if summary['stub'] else ', без стартера'}")
+    return summary
+def read_payload_info(executable):
+    """Параметры архива программы в файле с кэшем распаковки или None для обычного файла"""
+    try:
+        with zipfile.ZipFile(executable) as archive:
+            info = json.loads(archive.comment.split(b"\n")[0].decode("utf-8"))
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
+    return info if isinstance(info, dict) and info.get("format") == PAYLOAD_FORMAT else None
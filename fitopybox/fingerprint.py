@@ -0,0 +1,104 @@
+"""Отпечаток входных данных сборки для пропуска сборок без изменений"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+from importlib import metadata
+from .deps import find_local_modules
+FINGERPRINT_FILE = "fitopybox_fingerprint.json"
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+def iter_input_files(path):
+    """Файл или все файлы папки в стабильном порядке"""
+    if os.path.isdir(path):
+        for directory, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.join(directory, name)
+    else:
+        yield path
+def pyinstaller_version():
+    try:
+        return metadata.version("pyinstaller")
+    except metadata.PackageNotFoundError:
+        return ""
+toolchain_infos = {}
+def read_toolchain_info(python):
+    """Сведения об инструментах, файлы, по mtime которых они проверяются, и эти mtime"""
+    from .toolchain import mtime, toolchain_entry
+    if python:
+        try:
+            entry = toolchain_entry(python)
+        except RuntimeError:
+            return [python], [mtime(python)], {"executable": python, "python": "", "pyinstaller": ""}
+        return [python, entry.get("purelib", "")], entry["stamp"], {
+            "executable": python, "python": entry["python"], "pyinstaller": entry["pyinstaller"],
+            "stamp": entry["stamp"]}
+    pyinstaller_path = shutil.which("pyinstaller") or ""
+    stamp = [mtime(pyinstaller_path)]
+    return [pyinstaller_path], stamp, {
+        "python": sys.version,
+        "executable": sys.executable,
+        "pyinstaller": pyinstaller_version(),
+        "pyinstaller_path": pyinstaller_path,
+        "pyinstaller_mtime": stamp[0]
+    }
+def toolchain_info(python=""):
+    """Версии интерпретатора и PyInstaller, влияющие на результат сборки.
+    Для выбранного интерпретатора сведения берутся из реестра инструментов (без запуска при неизменном окружении).
+    Без выбранного интерпретатора описывается тот, в котором установлен pyinstaller из PATH.
+    Сведения запоминаются по интерпретатору и проверяются по mtime интерпретатора и site-packages:
+    команда строится при каждом изменении поля окна, и чтение реестра и метаданных каждый раз заметно замедляет её."""
+    from .toolchain import mtime, path_interpreter
+    python = python or path_interpreter()
+    cached = toolchain_infos.get(python)
+    if cached is not None and [mtime(path) for path in cached[0]] == cached[1]:
+        return cached[2]
+    paths, stamp, info = read_toolchain_info(python)
+    toolchain_infos[python] = (paths, stamp, info)
+    return info
+def compute_fingerprint(config):
+    """Хэш скрипта, его локальных модулей, доп. файлов, иконки, окружения и параметров"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(config.to_dict(), sort_keys=True).encode("utf-8"))
+    digest.update(json.dumps(toolchain_info(config.python), sort_keys=True).encode("utf-8"))
+    if config.cached_onefile:
+        # Стартер и загрузчик входят в итоговый файл: их изменение тоже требует пересборки
+        from .extractcache import launcher_key, stub_key
+        digest.update(launcher_key(config).encode("ascii"))
+        digest.update(stub_key(config).encode("ascii"))
+    inputs = [config.script] + find_local_modules(config.script)
+    inputs.extend(os.path.join(config.script_dir, file) for file in config.additional_files)
+    if config.icon:
+        inputs.append(os.path.join(config.script_dir, config.icon))
+    for path in inputs:
+        for file in iter_input_files(path):
+            digest.update(file.encode("utf-8"))
+            try:
+                digest.update(file_digest(file).encode("ascii"))
+            except OSError:
+                digest.update(b"missing")
+    return digest.hexdigest()
+def fingerprint_path(config):
+    return os.path.join(config.work_dir, FINGERPRINT_FILE)
+def is_up_to_date(config, fingerprint):
+    """Совпадает ли отпечаток с последней успешной сборкой и существует ли результат"""
+    try:
+        with open(fingerprint_path(config), "r") as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return False
+    return state.get("fingerprint") == fingerprint and os.path.exists(config.artifact_path)
+def record_fingerprint(config, fingerprint):
+    path = fingerprint_path(config)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"fingerprint": fingerprint, "artifact": config.artifact_path}, f, indent=4)
+    except OSError as e:
+        print(f"Ошибка сохранения отпечатка сборки: {e}")
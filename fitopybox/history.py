@@ -0,0 +1,147 @@
+"""Хранение истории сборок в SQLite с индексами и атомарной записью"""
+import json
+import os
+import sqlite3
+from datetime import datetime
+HISTORY_DB = "build_history.db"
+LEGACY_HISTORY_FILE = "build_history.json"
+PAGE_SIZE = 200
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    file TEXT NOT NULL,
+    command TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'success',
+    data TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS builds_file ON builds (file);
+CREATE INDEX IF NOT EXISTS builds_timestamp ON builds (timestamp);
+CREATE INDEX IF NOT EXISTS builds_status ON builds (status);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+INSERT_SQL = "INSERT INTO builds (timestamp, file, command, status, data) VALUES (?, ?, ?, ?, ?)"
+UPDATE_SQL = "UPDATE builds SET timestamp = ?, file = ?, command = ?, status = ?, data = ? WHERE id = ?"
+def entry_columns(entry):
+    """Значения столбцов таблицы; прочие поля записи хранятся в JSON"""
+    entry = dict(entry)
+    timestamp = entry.pop("timestamp", None) or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    file_path = entry.pop("file", "")
+    command = entry.pop("command", "")
+    status = entry.pop("status", "success")
+    return (timestamp, file_path, command, status, json.dumps(entry, ensure_ascii=False))
+class HistoryStore:
+    """История сборок; каждая запись добавляется отдельной транзакцией"""
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.migrate_legacy_history()
+    def close(self):
+        self.connection.close()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc_info):
+        self.close()
+    def migrate_legacy_history(self):
+        """Перенос записей из build_history.json, лежащего рядом с базой"""
+        legacy_path = os.path.join(os.path.dirname(os.path.abspath(self.path)), LEGACY_HISTORY_FILE)
+        if not os.path.exists(legacy_path):
+            return
+        migrated = self.connection.execute("SELECT value FROM meta WHERE key = 'legacy_migrated'").fetchone()
+        if not migrated:
+            try:
+                with open(legacy_path, "r") as f:
+                    entries = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                entries = []
+            with self.connection:
+                self.connection.executemany(INSERT_SQL, [entry_columns(entry) for entry in entries])
+                self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_migrated', ?)",
+                                        (str(len(entries)),))
+        try:
+            os.replace(legacy_path, legacy_path + ".migrated")
+        except OSError as e:
+            print(f"Не удалось переименовать старую историю: {e}")
+    def add(self, entry):
+        """Добавление записи; возвращает её идентификатор"""
+        with self.connection:
+            cursor = self.connection.execute(INSERT_SQL, entry_columns(entry))
+        return cursor.lastrowid
+    @staticmethod
+    def where_clause(search="", status="", file_path=""):
+        conditions = []
+        params = []
+        if search:
+            # % и _ в строке поиска - обычные символы, а не шаблоны LIKE
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            pattern = f"%{escaped}%"
+            conditions.append("(file LIKE ? ESCAPE '\\' OR command LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern])
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if file_path:
+            conditions.append("file = ?")
+            params.append(file_path)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+    def count(self, search="", status="", file_path=""):
+        where, params = self.where_clause(search, status, file_path)
+        return self.connection.execute(f"SELECT COUNT(*) FROM builds{where}", params).fetchone()[0]
+    def page(self, before_id=None, limit=PAGE_SIZE, search="", status="", file_path=""):
+        """Записи от новых к старым, начиная с записи перед before_id"""
+        where, params = self.where_clause(search, status, file_path)
+        if before_id is not None:
+            where += (" AND " if where else " WHERE ") + "id < ?"
+            params.append(before_id)
+        rows = self.connection.execute(
+            f"SELECT * FROM builds{where} ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [row_to_entry(row) for row in rows]
+    def get(self, entry_id):
+        row = self.connection.execute("SELECT * FROM builds WHERE id = ?", (entry_id,)).fetchone()
+        return row_to_entry(row) if row else None
+    def update(self, entry_id, **fields):
+        """Дополнение записи новыми сведениями"""
+        entry = self.get(entry_id)
+        if entry is None:
+            return
+        entry.update(fields)
+        entry.pop("id")
+        with self.connection:
+            self.connection.execute(UPDATE_SQL, entry_columns(entry) + (entry_id,))
+    def files(self):
+        """Все собиравшиеся файлы (цели сборки)"""
+        rows = self.connection.execute("SELECT DISTINCT file FROM builds ORDER BY file").fetchall()
+        return [row[0] for row in rows]
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM builds")
+def row_to_entry(row):
+    entry = json.loads(row["data"] or "{}")
+    entry.update(id=row["id"], timestamp=row["timestamp"], file=row["file"],
+                 command=row["command"], status=row["status"])
+    return entry
+def load_history(path=HISTORY_DB, limit=None):
+    """Записи истории от старых к новым (limit - только последние записи)"""
+    with HistoryStore(path) as store:
+        entries = store.page(limit=limit if limit is not None else -1)
+    return list(reversed(entries))
+def add_history_entry(command, file_path, path=HISTORY_DB, **fields):
+    """Добавление записи о сборке; fields - дополнительные сведения (статус и т.п.)"""
+    history_entry = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "command": command,
+        "file": file_path
+    }
+    history_entry.update(fields)
+    try:
+        with HistoryStore(path) as store:
+            return store.add(history_entry)
+    except sqlite3.Error as e:
+        print(f"Ошибка сохранения истории: {e}")
+        return None
+def clear_history(path=HISTORY_DB):
+    with HistoryStore(path) as store:
+        store.clear()
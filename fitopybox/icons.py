@@ -0,0 +1,129 @@
+"""Иконки сборки: PNG, SVG и другие изображения в многоразмерный ICO с кэшем по хэшу содержимого"""
+import hashlib
+import importlib.util
+import io
+import os
+import struct
+from .paths import cache_dir
+ICON_SIZES = [16, 24, 32, 48, 64, 128, 256]
+ICON_EXTENSIONS = [".ico", ".png", ".svg", ".jpg", ".jpeg", ".bmp"]
+ICON_CACHE_DIR = "icons"
+ICON_CACHE_VERSION = 1
+ICON_FILE = "icon.ico"
+_keys = {}
+def needs_conversion(path):
+    return bool(path) and os.path.splitext(path)[1].lower() != ".ico"
+def icon_key(path):
+    """Ключ кэша по содержимому файла и набору размеров; хэш пересчитывается только при изменении mtime или размера"""
+    stat = os.stat(path)
+    stamp = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if stamp not in _keys:
+        digest = hashlib.sha256(f"{ICON_CACHE_VERSION}:{ICON_SIZES}".encode("ascii"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+        _keys[stamp] = digest.hexdigest()[:24]
+    return _keys[stamp]
+def cached_icon_dir(path):
+    return os.path.join(cache_dir(ICON_CACHE_DIR), icon_key(path))
+def cached_icon_path(path):
+    """Путь к ICO в кэше (файл может быть ещё не создан); None, если исходного файла нет"""
+    try:
+        return os.path.join(cached_icon_dir(path), ICON_FILE)
+    except OSError:
+        return None
+def cached_images(path):
+    """PNG каждого размера из кэша: размер -> путь; пустой словарь, если иконка ещё не подготовлена"""
+    directory = cached_icon_dir(path)
+    images = {size: os.path.join(directory, f"{size}.png") for size in ICON_SIZES}
+    if not os.path.isfile(os.path.join(directory, ICON_FILE)):
+        return {}
+    return images
+def render_pillow(path, size):
+    from PIL import Image
+    with Image.open(path) as image:
+        image = image.convert("RGBA")
+        image.thumbnail((size, size), Image.LANCZOS)
+        canvas = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+        canvas.paste(image, ((size - image.width) // 2, (size - image.height) // 2))
+    output = io.BytesIO()
+    canvas.save(output, "PNG")
+    return output.getvalue()
+def render_qt(path, size):
+    """Отрисовка средствами Qt (QImage и QSvgRenderer работают без QApplication и вне потока интерфейса)"""
+    from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QRectF, Qt
+    from PyQt6.QtGui import QImage, QPainter
+    canvas = QImage(size, size, QImage.Format.Format_ARGB32)
+    canvas.fill(0)
+    painter = QPainter(canvas)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+    if path.lower().endswith(".svg"):
+        from PyQt6.QtSvg import QSvgRenderer
+        renderer = QSvgRenderer(path)
+        if not renderer.isValid():
+            painter.end()
+            raise ValueError(f"Не удалось прочитать SVG: {path}")
+        view = renderer.defaultSize()
+        scale = size / max(view.width(), view.height(), 1)
+        width, height = view.width() * scale, view.height() * scale
+        renderer.render(painter, QRectF((size - width) / 2, (size - height) / 2, width, height))
+    else:
+        image = QImage(path)
+        if image.isNull():
+            painter.end()
+            raise ValueError(f"Не удалось прочитать изображение: {path}")
+        image = image.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+        painter.drawImage((size - image.width()) // 2, (size - image.height()) // 2, image)
+    painter.end()
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    canvas.save(buffer, "PNG")
+    return bytes(data)
+def find_renderer(path):
+    """Pillow для растровых изображений, Qt для SVG или если Pillow не установлен"""
+    svg = path.lower().endswith(".svg")
+    if not svg and importlib.util.find_spec("PIL") is not None:
+        return render_pillow
+    if importlib.util.find_spec("PyQt6") is not None:
+        return render_qt
+    raise RuntimeError("Для преобразования иконки нужен Pillow (pip install pillow) или PyQt6")
+def write_ico(path, images):
+    """ICO с изображениями PNG (формат Windows Vista и новее); images - размер -> PNG"""
+    sizes = sorted(images)
+    header = struct.pack("<HHH", 0, 1, len(sizes))
+    offset = len(header) + 16 * len(sizes)
+    entries = []
+    for size in sizes:
+        entries.append(struct.pack("<BBBBHHII", size % 256, size % 256, 0, 0, 1, 32, len(images[size]), offset))
+        offset += len(images[size])
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header + b"".join(entries) + b"".join(images[size] for size in sizes))
+    os.replace(temp_path, path)
+def prepare_icon_file(path):
+    """Многоразмерный ICO для изображения (из кэша, если содержимое не менялось); размер -> путь к PNG"""
+    images = cached_images(path)
+    if images:
+        return images
+    render = find_renderer(path)
+    rendered = {size: render(path, size) for size in ICON_SIZES}
+    directory = cached_icon_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    for size, data in rendered.items():
+        with open(os.path.join(directory, f"{size}.png"), "wb") as f:
+            f.write(data)
+    write_ico(os.path.join(directory, ICON_FILE), rendered)
+    return cached_images(path)
+def prepare_icon(config):
+    """Подготовка иконки перед сборкой; при ошибке PyInstaller получит исходный файл"""
+    if not needs_conversion(config.icon):
+        return None
+    source = os.path.join(config.script_dir, config.icon)
+    try:
+        prepare_icon_file(source)
+        return cached_icon_path(source)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Ошибка преобразования иконки {source}: {e}")
+        return None
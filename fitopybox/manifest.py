@@ -0,0 +1,168 @@
+"""Манифест проекта с несколькими целями сборки и общая сборка с одной копией библиотек"""
+import hashlib
+import json
+import os
+from dataclasses import replace
+from .config import BuildConfig
+from .fingerprint import compute_fingerprint, fingerprint_path
+from .icons import prepare_icon
+from .workcache import managed_config, touch_entry
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+MANIFEST_FILE = "fitopybox.toml"
+SHARED_MODE = "shared"
+SEPARATE_MODE = "separate"
+TARGET_FIELDS = ["script", "name", "onefile", "console", "icon", "hidden_imports", "data", "exclude_modules"]
+class Manifest:
+    """Цели сборки проекта. В режиме shared все цели собираются в одну папку:
+    один анализ зависимостей, общие библиотеки и отдельный запускаемый файл для каждой цели."""
+    def __init__(self, path, name="", mode=SHARED_MODE, distpath="", targets=None):
+        self.path = os.path.abspath(path)
+        self.name = name or os.path.basename(self.root) or "suite"
+        self.mode = mode
+        self.distpath = distpath
+        self.targets = targets or []
+    @property
+    def root(self):
+        return os.path.dirname(self.path)
+    @property
+    def output_dir(self):
+        return os.path.join(self.root, self.distpath) if self.distpath else os.path.join(self.root, "dist")
+    def target_configs(self, **options):
+        """Параметры сборки каждой цели для раздельного режима; options - общие для всех целей
+        параметры запуска PyInstaller (python, optimize)"""
+        return [managed_config(replace(target, distpath=target.distpath or self.output_dir, **options))
+                for target in self.targets]
+    def suite_config(self, **options):
+        """Параметры общей сборки: папка dist/<имя проекта> и рабочая папка в кэше"""
+        return managed_config(BuildConfig(script=self.path, name=self.name, one_file=False, distpath=self.output_dir,
+                                          **options), variant=f"manifest:{self.name}")
+    def to_dict(self):
+        targets = []
+        for target in self.targets:
+            script = os.path.relpath(target.script, self.root) if target.script else ""
+            targets.append({"script": script.replace(os.sep, "/"), "name": target.name, "onefile": target.one_file,
+                            "console": not target.no_console, "icon": target.icon,
+                            "hidden_imports": target.hidden_imports, "data": target.additional_files,
+                            "exclude_modules": target.exclude_modules})
+        return {"project": {"name": self.name, "mode": self.mode, "distpath": self.distpath}, "targets": targets}
+def target_from_dict(data, root):
+    unknown = set(data) - set(TARGET_FIELDS)
+    if unknown:
+        raise ValueError(f"Неизвестные поля цели: {', '.join(sorted(unknown))}")
+    if not data.get("script"):
+        raise ValueError("У цели не указан script")
+    return BuildConfig(script=os.path.normpath(os.path.join(root, data["script"])), name=data.get("name", ""),
+                       one_file=data.get("onefile", True), no_console=not data.get("console", True),
+                       icon=data.get("icon", ""), hidden_imports=list(data.get("hidden_imports", [])),
+                       additional_files=list(data.get("data", [])),
+                       exclude_modules=list(data.get("exclude_modules", [])))
+def load_manifest(path):
+    """Чтение манифеста; пути целей задаются относительно папки манифеста"""
+    if tomllib is None:
+        raise RuntimeError("Для чтения манифеста нужен Python 3.11+ или пакет tomli")
+    with open(path, "rb") as f:
+        data = tomllib.load(f)
+    project = data.get("project", {})
+    mode = project.get("mode", SHARED_MODE)
+    if mode not in (SHARED_MODE, SEPARATE_MODE):
+        raise ValueError(f"Неизвестный режим сборки: {mode}")
+    root = os.path.dirname(os.path.abspath(path))
+    targets = [target_from_dict(target, root) for target in data.get("targets", [])]
+    if not targets:
+        raise ValueError("В манифесте нет целей [[targets]]")
+    names = [target.output_name for target in targets]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Повторяющиеся имена целей: {', '.join(duplicates)}")
+    return Manifest(path, project.get("name", ""), mode, project.get("distpath", ""), targets)
+def toml_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return "[" + ", ".join(toml_value(item) for item in value) + "]"
+    return json.dumps(value, ensure_ascii=False)
+def save_manifest(manifest, path=None):
+    data = manifest.to_dict()
+    lines = ["[project]"]
+    lines.extend(f"{key} = {toml_value(value)}" for key, value in data["project"].items())
+    for target in data["targets"]:
+        lines.extend(["", "[[targets]]"])
+        lines.extend(f"{key} = {toml_value(value)}" for key, value in target.items())
+    with open(path or manifest.path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+def script_key(path):
+    return os.path.normcase(os.path.abspath(path))
+def spec_source(manifest):
+    """Spec-файл PyInstaller: один Analysis по всем скриптам, EXE на каждую цель и общий COLLECT"""
+    targets = manifest.targets
+    scripts = [target.script for target in targets]
+    hidden_imports = sorted({module for target in targets for module in target.hidden_imports})
+    datas = sorted({(os.path.join(target.script_dir, file), destination) for target in targets
+                    for file, destination in target.data_mappings()})
+    excludes = sorted(set.intersection(*(set(target.exclude_modules) for target in targets)))
+    # Скрипты целей различаются по полному пути: у a/main.py и b/main.py одно имя в a.scripts,
+    # поэтому запись скрипта для EXE каждой цели создаётся здесь, а из a.scripts берутся только хуки запуска
+    lines = [
+        "# Создано FitoPyBox по манифесту " + manifest.path,
+        "import os",
+        f"a = Analysis({scripts!r}, pathex={[manifest.root]!r}, binaries=[], datas={datas!r},",
+        f"             hiddenimports={hidden_imports!r}, hookspath=[], runtime_hooks=[], excludes={excludes!r},",
+        "             noarchive=False)",
+        "pyz = PYZ(a.pure)",
+        f"target_scripts = {sorted({script_key(script) for script in scripts})!r}",
+        "bootstrap = [entry for entry in a.scripts",
+        "             if os.path.normcase(os.path.abspath(entry[1])) not in target_scripts]",
+        "executables = []"
+    ]
+    for target in targets:
+        entry = (os.path.splitext(os.path.basename(target.script))[0], os.path.abspath(target.script), "PYSOURCE")
+        icon = os.path.join(target.script_dir, target.icon_file) if target.icon else None
+        lines.extend([
+            f"executables.append(EXE(pyz, bootstrap + [{entry!r}], [],",
+            f"                       exclude_binaries=True, name={target.output_name!r}, debug=False, strip=False,",
+            f"                       upx=False, console={not target.no_console!r}, icon={icon!r}))"
+        ])
+    lines.append(f"coll = COLLECT(*executables, a.binaries, a.datas, strip=False, upx=False, name={manifest.name!r})")
+    return "\n".join(lines) + "\n"
+def shared_fingerprint(manifest, spec, options):
+    """Отпечаток общей сборки по отпечаткам всех целей (с интерпретатором общей сборки) и тексту spec-файла"""
+    digest = hashlib.sha256(spec.encode("utf-8"))
+    for target in manifest.targets:
+        digest.update(compute_fingerprint(replace(target, **options)).encode("ascii"))
+    return digest.hexdigest()
+def launcher_paths(manifest, suite):
+    suffix = ".exe" if os.name == "nt" else ""
+    return [os.path.join(suite.output_dir, manifest.name, target.output_name + suffix) for target in manifest.targets]
+def prepare_shared(manifest, force=False, **options):
+    """Spec-файл, команда, отпечаток и признак актуальности общей сборки. options - параметры запуска
+    PyInstaller (python, optimize), как у отдельной сборки в BuildConfig.launcher"""
+    names = [os.path.normcase(target.output_name) for target in manifest.targets]
+    if len(set(names)) != len(names):
+        raise ValueError("В общей сборке названия целей должны различаться")
+    suite = manifest.suite_config(**options)
+    touch_entry(suite)
+    for target in manifest.targets:
+        prepare_icon(target)
+    spec = spec_source(manifest)
+    spec_path = os.path.join(suite.workpath, f"{manifest.name}.spec")
+    os.makedirs(suite.workpath, exist_ok=True)
+    with open(spec_path, "w", encoding="utf-8") as f:
+        f.write(spec)
+    command = suite.launcher() + ["--noconfirm", "--workpath", suite.workpath, "--distpath", suite.output_dir,
+                                  spec_path]
+    fingerprint = shared_fingerprint(manifest, spec, options)
+    up_to_date = False
+    if not force:
+        try:
+            with open(fingerprint_path(suite), "r") as f:
+                up_to_date = json.load(f).get("fingerprint") == fingerprint
+        except (OSError, ValueError):
+            up_to_date = False
+        up_to_date = up_to_date and all(os.path.exists(path) for path in launcher_paths(manifest, suite))
+    return suite, command, fingerprint, up_to_date
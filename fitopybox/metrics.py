@@ -0,0 +1,89 @@
+"""Метрики сборок и их динамика по целям"""
+import csv
+import json
+import os
+from .artifacts import bundle_root, bundled_file_count, path_size
+METRIC_FIELDS = ["wall_time", "cpu_time", "peak_memory", "artifact_size", "bundled_files", "exit_status",
+                 "startup_cold", "startup_warm", "startup_memory"]
+METRIC_TITLES = {
+    "wall_time": "Время сборки, с",
+    "cpu_time": "Время ЦП, с",
+    "peak_memory": "Пиковая память, МБ",
+    "artifact_size": "Размер результата, МБ",
+    "bundled_files": "Файлов в сборке",
+    "exit_status": "Код завершения",
+    "startup_cold": "Холодный запуск, с",
+    "startup_warm": "Тёплый запуск, с",
+    "startup_memory": "Память при запуске, МБ"
+}
+REGRESSION_THRESHOLD = 0.2
+REGRESSION_FIELDS = ["wall_time", "artifact_size", "bundled_files", "startup_cold", "startup_warm"]
+def collect_metrics(config, returncode, usage):
+    """Метрики завершённой сборки: ресурсы процесса и параметры результата"""
+    metrics = {
+        "wall_time": round(usage.get("wall_time", 0), 3),
+        "cpu_time": round(usage["cpu_time"], 3) if "cpu_time" in usage else None,
+        "peak_memory": usage.get("peak_memory"),
+        "artifact_size": None,
+        "bundled_files": None,
+        "exit_status": returncode
+    }
+    if returncode == 0:
+        root = bundle_root(config)
+        if os.path.exists(root):
+            metrics["artifact_size"] = path_size(root)
+            metrics["bundled_files"] = bundled_file_count(config)
+    return metrics
+def display_value(field, value):
+    if value is None:
+        return ""
+    if field in ("peak_memory", "artifact_size", "startup_memory"):
+        return f"{value / (1024 * 1024):.1f}"
+    if field in ("wall_time", "cpu_time"):
+        return f"{value:.1f}"
+    if field in ("startup_cold", "startup_warm"):
+        return f"{value:.3f}"
+    return str(value)
+def metrics_trend(entries):
+    """Строки динамики по записям истории (от старых к новым) с изменением относительно предыдущей сборки"""
+    rows = []
+    previous = {}
+    for entry in entries:
+        metrics = entry.get("metrics")
+        if not metrics:
+            continue
+        row = {"timestamp": entry["timestamp"], "file": entry["file"], "status": entry["status"]}
+        regressions = []
+        for field in METRIC_FIELDS:
+            value = metrics.get(field)
+            row[field] = value
+            if field == "exit_status" or value is None:
+                continue
+            before = previous.get(field)
+            change = (value - before) / before if before else None
+            row[f"{field}_change"] = round(change, 4) if change is not None else None
+            if change is not None and change > REGRESSION_THRESHOLD and field in REGRESSION_FIELDS:
+                regressions.append(field)
+            if entry["status"] == "success":
+                previous[field] = value
+        row["regressions"] = regressions
+        rows.append(row)
+    return rows
+def write_csv(rows, stream):
+    fields = ["timestamp", "file", "status"]
+    for field in METRIC_FIELDS:
+        fields.append(field)
+        if field != "exit_status":
+            fields.append(f"{field}_change")
+    writer = csv.DictWriter(stream, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+def write_json(rows, stream):
+    json.dump(rows, stream, indent=4, ensure_ascii=False)
+def export_csv(rows, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        write_csv(rows, f)
+def export_json(rows, path):
+    with open(path, "w", encoding="utf-8") as f:
+        write_json(rows, f)
@@ -0,0 +1,16 @@
+"""Каталоги для кэшей FitoPyBox"""
+import os
+import sys
+def cache_dir(*parts):
+    """Каталог кэша пользователя; переопределяется переменной FITOPYBOX_CACHE_DIR"""
+    root = os.environ.get("FITOPYBOX_CACHE_DIR")
+    if not root:
+        if os.name == "nt":
+            root = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), "FitoPyBox", "cache")
+        elif sys.platform == "darwin":
+            root = os.path.join(os.path.expanduser("~"), "Library", "Caches", "FitoPyBox")
+        else:
+            root = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "fitopybox")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,65 @@
+"""Общие шаги до и после сборки для окна, пакетного и консольного режимов"""
+import os
+from .artifactstore import store_artifact
+from .assets import publish_assets, stage_assets
+from .extractcache import pack_cached_onefile
+from .fingerprint import compute_fingerprint, is_up_to_date, record_fingerprint
+from .history import add_history_entry
+from .icons import prepare_icon
+from .metrics import collect_metrics
+from .workcache import evict, touch_entry, update_entry_size
+def check_up_to_date(config, force=False, history=True, on_line=print):
+    """Отпечаток сборки и признак того, что сборку можно пропустить.
+    Архив ресурсов и иконка готовятся здесь же, до запуска PyInstaller.
+    Если архив ресурсов не удалось скопировать к готовой сборке, сборка запускается заново."""
+    touch_entry(config)
+    stage_assets(config)
+    prepare_icon(config)
+    fingerprint = compute_fingerprint(config)
+    if force or not is_up_to_date(config, fingerprint) or publish_assets(config, on_line) is False:
+        return fingerprint, False
+    if history:
+        add_history_entry(config.preview(), config.script, status="skipped")
+    return fingerprint, True
+TRACE_FILE = "fitopybox_trace.json"
+def finish_build(config, fingerprint, returncode, usage, cancelled=False, history=True, profiler=None, command=None,
+                 on_line=print):
+    """Сохранение отпечатка, метрик, профиля и записи истории после завершения PyInstaller.
+    Результат успешной сборки с записью в истории сохраняется в хранилище сборок.
+    В режиме с кэшем распаковки папка onedir здесь упаковывается в один файл (вывод - в on_line).
+    Ошибка копирования архива ресурсов (режим external) делает сборку неудачной.
+    command - текст команды для истории, если сборка шла не по config (например, по spec-файлу)."""
+    if not cancelled and returncode == 0 and config.cached_onefile:
+        try:
+            pack_cached_onefile(config, on_line)
+        except (OSError, RuntimeError) as e:
+            on_line(f"Ошибка упаковки в один файл: {e}")
+            returncode = 1
+    if not cancelled and returncode == 0 and publish_assets(config, on_line) is False:
+        returncode = 1
+    if cancelled:
+        status = "cancelled"
+    elif returncode == 0:
+        status = "success"
+        record_fingerprint(config, fingerprint)
+    else:
+        status = "failed"
+    metrics = collect_metrics(config, returncode, usage)
+    update_entry_size(config)
+    evict(keep=[config.workpath])
+    fields = {"metrics": metrics}
+    if profiler is not None and profiler.phases:
+        fields["profile"] = profiler.summary()
+        trace_path = os.path.join(config.work_dir, TRACE_FILE)
+        try:
+            os.makedirs(config.work_dir, exist_ok=True)
+            profiler.export_trace(trace_path)
+            fields["trace"] = trace_path
+        except OSError as e:
+            print(f"Ошибка сохранения трассировки: {e}")
+    history_id = None
+    if history and status == "success":
+        fields["artifact_id"] = store_artifact(config)
+    if history:
+        history_id = add_history_entry(command or config.preview(), config.script, status=status, **fields)
+    return status, metrics, history_id
@@ -0,0 +1,100 @@
+"""Разбор журнала PyInstaller по этапам сборки и выгрузка в формате Chrome trace"""
+import json
+import re
+LOG_LINE = re.compile(r"^(\d+) (TRACE|DEBUG|INFO|WARNING|DEPRECATION|ERROR|CRITICAL|FATAL): (.*)$")
+PHASE_MARKERS = [
+    (re.compile(r"^checking Analysis"), "Analysis"),
+    (re.compile(r"^Initializing module dependency graph"), "Граф модулей"),
+    (re.compile(r"^Running Analysis"), "Analysis: скрипт"),
+    (re.compile(r"^Processing module hooks"), "Хуки модулей"),
+    (re.compile(r"^(Performing binary vs\. data reclassification|Looking for ctypes DLLs)"), "Классификация двоичных файлов"),
+    (re.compile(r"^Analyzing run-time hooks"), "Хуки времени выполнения"),
+    (re.compile(r"^Looking for dynamic libraries"), "Поиск двоичных зависимостей"),
+    (re.compile(r"^Warnings written to"), "Отчёты Analysis"),
+    (re.compile(r"^checking PYZ"), "PYZ"),
+    (re.compile(r"^checking PKG"), "PKG"),
+    (re.compile(r"^checking EXE"), "EXE"),
+    (re.compile(r"^checking COLLECT"), "COLLECT"),
+    (re.compile(r"^checking BUNDLE"), "BUNDLE")
+]
+HOOK_MARKERS = [
+    re.compile(r"^Loading module hook '(?:hook-)?(.+?)\.py' from"),
+    re.compile(r"^Processing (?:pre-safe import module|pre-find module path) hook (\S+) from"),
+    re.compile(r"^Processing standard module hook '(?:hook-)?(.+?)\.py' from")
+]
+TOP_HOOKS = 20
+class BuildProfiler:
+    """Сбор отметок времени этапов и хуков из строк журнала PyInstaller"""
+    def __init__(self):
+        self.phases = []
+        self.hooks = []
+        self.last_time = 0
+        self.current_hook = None
+    def feed(self, line):
+        match = LOG_LINE.match(line)
+        if not match:
+            return
+        elapsed = int(match.group(1)) / 1000
+        message = match.group(3)
+        if not self.phases:
+            self.phases.append({"name": "Запуск", "start": 0})
+        self.last_time = elapsed
+        if self.current_hook is not None:
+            self.current_hook["end"] = elapsed
+            self.current_hook = None
+        for pattern, name in PHASE_MARKERS:
+            if pattern.match(message):
+                if not self.phases or self.phases[-1]["name"] != name:
+                    self.phases.append({"name": name, "start": elapsed})
+                break
+        for pattern in HOOK_MARKERS:
+            hook = pattern.match(message)
+            if hook:
+                self.current_hook = {"module": hook.group(1), "start": elapsed, "end": elapsed}
+                self.hooks.append(self.current_hook)
+                break
+    def phase_breakdown(self):
+        """Этапы с началом, концом и длительностью в секундах"""
+        result = []
+        for index, phase in enumerate(self.phases):
+            end = self.phases[index + 1]["start"] if index + 1 < len(self.phases) else self.last_time
+            result.append({"name": phase["name"], "start": phase["start"], "end": end,
+                           "duration": round(end - phase["start"], 3)})
+        return result
+    def hook_timings(self):
+        """Хуки от самых долгих к быстрым (время до следующей строки журнала)"""
+        timings = {}
+        for hook in self.hooks:
+            timings[hook["module"]] = timings.get(hook["module"], 0) + hook["end"] - hook["start"]
+        return sorted(({"module": module, "duration": round(duration, 3)} for module, duration in timings.items()),
+                      key=lambda item: item["duration"], reverse=True)
+    def summary(self):
+        """Краткий профиль для записи истории"""
+        return {"phases": self.phase_breakdown(), "hooks": self.hook_timings()[:TOP_HOOKS],
+                "total": round(self.last_time, 3)}
+    def chrome_trace(self):
+        """События в формате Chrome trace (chrome://tracing, Perfetto)"""
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "PyInstaller"}},
+                  {"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "Этапы"}},
+                  {"name": "thread_name", "ph": "M", "pid": 1, "tid": 2, "args": {"name": "Хуки"}}]
+        for phase in self.phase_breakdown():
+            events.append({"name": phase["name"], "cat": "phase", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": int(phase["start"] * 1e6), "dur": int(phase["duration"] * 1e6)})
+        for hook in self.hooks:
+            events.append({"name": hook["module"], "cat": "hook", "ph": "X", "pid": 1, "tid": 2,
+                           "ts": int(hook["start"] * 1e6), "dur": int((hook["end"] - hook["start"]) * 1e6)})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+    def export_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+    def report_lines(self):
+        """Текстовая сводка по этапам и самым долгим хукам"""
+        lines = ["Этапы сборки:"]
+        for phase in self.phase_breakdown():
+            lines.append(f"  {phase['name']:<32} {phase['duration']:8.2f} с")
+        hooks = [hook for hook in self.hook_timings()[:5] if hook["duration"] > 0]
+        if hooks:
+            lines.append("Самые долгие хуки:")
+            for hook in hooks:
+                lines.append(f"  {hook['module']:<32} {hook['duration']:8.2f} с")
+        return lines
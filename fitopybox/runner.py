@@ -0,0 +1,85 @@
+"""Запуск PyInstaller с построчным выводом и отменой всего дерева процессов"""
+import os
+import signal
+import subprocess
+import sys
+import time
+def kill_process_tree(process):
+    """Завершение процесса вместе со всеми дочерними процессами"""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                           capture_output=True)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError):
+        process.kill()
+def start_build_process(command, cwd=None, stdin=None):
+    """Запуск процесса сборки в отдельной группе процессов"""
+    popen_kwargs = {}
+    if os.name == "nt":
+        popen_kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        popen_kwargs["start_new_session"] = True
+    return subprocess.Popen(command, cwd=cwd or None, stdin=stdin,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, encoding="utf-8", errors="replace",
+                            bufsize=1, **popen_kwargs)
+def windows_process_usage(process):
+    """Процессорное время и пиковая память процесса Windows по его дескриптору"""
+    import ctypes
+    from ctypes import wintypes
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+    handle = wintypes.HANDLE(int(process._handle))
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    times = [wintypes.FILETIME() for _ in range(4)]
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+        return {}
+    if not ctypes.windll.kernel32.GetProcessTimes(handle, *(ctypes.byref(t) for t in times)):
+        return {}
+    seconds = [((t.dwHighDateTime << 32) + t.dwLowDateTime) / 1e7 for t in times]
+    return {"cpu_time": seconds[2] + seconds[3], "peak_memory": counters.PeakWorkingSetSize}
+def wait_with_usage(process):
+    """Ожидание завершения процесса и сбор процессорного времени и пиковой памяти"""
+    usage = {}
+    if os.name == "nt":
+        returncode = process.wait()
+        try:
+            usage = windows_process_usage(process)
+        except (OSError, AttributeError, ValueError):
+            usage = {}
+        return returncode, usage
+    try:
+        _, status, rusage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        return process.wait(), usage
+    process.returncode = os.waitstatus_to_exitcode(status)
+    peak_memory = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+    usage = {"cpu_time": rusage.ru_utime + rusage.ru_stime, "peak_memory": peak_memory}
+    return process.returncode, usage
+def stream_output(process, on_line):
+    """Передача вывода процесса построчно; возвращает код завершения и затраченные ресурсы"""
+    started = time.monotonic()
+    for line in process.stdout:
+        on_line(line.rstrip("\r\n"))
+    process.stdout.close()
+    returncode, usage = wait_with_usage(process)
+    usage["wall_time"] = time.monotonic() - started
+    return returncode, usage
+def run_build(command, cwd=None, on_line=print):
+    """Синхронная сборка; при прерывании процесс завершается вместе с потомками"""
+    process = start_build_process(command, cwd)
+    try:
+        return stream_output(process, on_line)
+    except KeyboardInterrupt:
+        kill_process_tree(process)
+        process.wait()
+        raise
@@ -0,0 +1,377 @@
+"""Служба сборки: пул заранее запущенных процессов с PyInstaller и очередь заданий через локальный сокет"""
+import json
+import os
+import queue
+import secrets
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+from collections import OrderedDict, deque
+from dataclasses import replace
+from .config import BuildConfig
+from .paths import cache_dir
+from .pipeline import check_up_to_date, finish_build
+from .profiling import BuildProfiler
+from .runner import kill_process_tree, start_build_process, stream_output
+SERVICE_FILE = "service.json"
+SERVICE_HOST = "127.0.0.1"
+SERVICE_WORKERS = 2
+CONNECT_TIMEOUT = 5
+WORKER_READY = "fitopybox-worker-ready"
+WORKER_SCRIPT = """
+import json, logging, os, sys, time, traceback
+import PyInstaller.__main__
+import PyInstaller.building.build_main
+import PyInstaller.depend.analysis
+print(%r, flush=True)
+job = json.loads(sys.stdin.readline())
+logging._startTime = time.time()
+os.chdir(job["cwd"])
+try:
+    PyInstaller.__main__.run(job["args"])
+    code = 0
+except SystemExit as e:
+    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+except BaseException:
+    traceback.print_exc()
+    code = 1
+sys.stdout.flush()
+sys.stderr.flush()
+os._exit(code)
+""" % WORKER_READY
+def service_info_path():
+    return os.path.join(cache_dir(), SERVICE_FILE)
+def read_service_info():
+    """Адрес и ключ запущенной службы или None"""
+    try:
+        with open(service_info_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+def job_args(config):
+    """Аргументы PyInstaller с явными папками: умолчания PyInstaller вычисляются от текущей папки
+    при импорте, то есть в процессе службы, а не в папке скрипта"""
+    workpath = config.workpath or os.path.join(config.script_dir, "build")
+    return ["--distpath", config.output_dir, "--workpath", workpath,
+            "--specpath", config.specpath or config.script_dir] + config.pyinstaller_args()
+def send_message(stream, message):
+    stream.write(json.dumps(message, ensure_ascii=False) + "\n")
+    stream.flush()
+class WarmWorker:
+    """Процесс Python с уже импортированным PyInstaller, ожидающий одно задание.
+    После задания процесс завершается, поэтому состояние PyInstaller между сборками не переносится."""
+    def __init__(self, python, optimize):
+        command = [python] + (["-" + "O" * optimize] if optimize else []) + ["-u", "-c", WORKER_SCRIPT]
+        self.error = ""
+        try:
+            self.process = start_build_process(command, cwd=cache_dir(), stdin=subprocess.PIPE)
+        except OSError as e:
+            self.process = None
+            self.error = str(e)
+            return
+        ready = self.process.stdout.readline().strip()
+        if ready != WORKER_READY:
+            rest = self.process.stdout.read()
+            kill_process_tree(self.process)
+            self.error = (ready + "\n" + rest).strip() or f"код завершения {self.process.wait()}"
+    def run(self, config, on_line):
+        """Передача задания; возвращает код завершения и затраченные ресурсы, как stream_output"""
+        self.process.stdin.write(json.dumps({"cwd": config.script_dir, "args": job_args(config)}) + "\n")
+        self.process.stdin.close()
+        return stream_output(self.process, on_line)
+    def kill(self):
+        if self.process is not None:
+            kill_process_tree(self.process)
+class WarmPool:
+    """Запас готовых процессов для одного интерпретатора и уровня оптимизации.
+    Взятый процесс сразу заменяется новым, который прогревается в фоне."""
+    def __init__(self, python, optimize, size):
+        self.python = python
+        self.optimize = optimize
+        self.ready = queue.Queue()
+        self.closed = False
+        for _ in range(max(1, size)):
+            self.spawn()
+    def spawn(self):
+        threading.Thread(target=self.warm, daemon=True).start()
+    def warm(self):
+        worker = WarmWorker(self.python, self.optimize)
+        if self.closed:
+            worker.kill()
+            return
+        self.ready.put(worker)
+    def acquire(self):
+        worker = self.ready.get()
+        if not worker.error:
+            self.spawn()
+        return worker
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self.ready.get_nowait().kill()
+            except queue.Empty:
+                break
+class BuildJob:
+    """Задание службы: параметры сборки, клиент (для очереди по кругу) и события для клиента"""
+    def __init__(self, config, client, force=False, history=True):
+        self.config = config
+        self.client = client
+        self.force = force
+        self.history = history
+        self.events = queue.Queue()
+        self.worker = None
+        self.cancelled = False
+        self.done = False
+        self.lock = threading.Lock()
+    def conflicts(self, other):
+        """Задания не выполняются одновременно, если у них общая рабочая папка или общий результат"""
+        def key(path):
+            return os.path.normcase(os.path.abspath(path))
+        return key(self.config.work_dir) == key(other.config.work_dir) or \
+            key(self.config.artifact_path) == key(other.config.artifact_path)
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            if self.worker is not None:
+                self.worker.kill()
+class BuildService:
+    """Очередь заданий с выбором клиентов по кругу и ограничением числа одновременных сборок"""
+    def __init__(self, workers=SERVICE_WORKERS, python=""):
+        self.workers = max(1, workers)
+        self.python = python or sys.executable
+        self.pools = {}
+        self.queues = OrderedDict()
+        self.running = []
+        self.condition = threading.Condition()
+        self.closed = False
+        self.pool(self.python, 0)
+        threading.Thread(target=self.schedule, daemon=True).start()
+    def pool(self, python, optimize):
+        with self.condition:
+            if (python, optimize) not in self.pools:
+                self.pools[(python, optimize)] = WarmPool(python, optimize, self.workers)
+            return self.pools[(python, optimize)]
+    def submit(self, job):
+        job.config = replace(job.config, python=job.config.python or self.python)
+        with self.condition:
+            self.queues.setdefault(job.client, deque()).append(job)
+            job.events.put({"type": "queued", "position": sum(len(jobs) for jobs in self.queues.values())})
+            self.condition.notify_all()
+    def cancel(self, job):
+        """Отмена задания: из очереди оно удаляется, выполняемое прерывается"""
+        with self.condition:
+            jobs = self.queues.get(job.client)
+            if jobs is not None and job in jobs:
+                jobs.remove(job)
+                if not jobs:
+                    del self.queues[job.client]
+                job.done = True
+                job.events.put({"type": "finished", "status": "cancelled"})
+                return
+        job.cancel()
+    def next_job(self):
+        """Клиенты по кругу; у клиента - первое задание, папки которого не заняты выполняемыми сборками"""
+        for client in list(self.queues):
+            jobs = self.queues[client]
+            for job in jobs:
+                if not any(job.conflicts(other) for other in self.running):
+                    jobs.remove(job)
+                    if jobs:
+                        self.queues.move_to_end(client)
+                    else:
+                        del self.queues[client]
+                    return job
+        return None
+    def schedule(self):
+        with self.condition:
+            while not self.closed:
+                job = self.next_job() if len(self.running) < self.workers else None
+                if job is None:
+                    self.condition.wait()
+                    continue
+                self.running.append(job)
+                threading.Thread(target=self.execute, args=(job,), daemon=True).start()
+    def execute(self, job):
+        try:
+            result = self.run_job(job)
+        except Exception as e:
+            result = {"status": "failed", "error": str(e)}
+        with self.condition:
+            self.running.remove(job)
+            self.condition.notify_all()
+        job.done = True
+        job.events.put(dict(result, type="finished"))
+    def run_job(self, job):
+        config = job.config
+        fingerprint, up_to_date = check_up_to_date(config, job.force, history=job.history)
+        if up_to_date:
+            return {"status": "skipped", "artifact": config.artifact_path}
+        key = (config.python, config.optimize)
+        worker = self.pool(*key).acquire()
+        if worker.error:
+            with self.condition:
+                self.pools.pop(key, None)
+            return {"status": "failed", "error": f"Не удалось запустить PyInstaller в {config.python}: {worker.error}"}
+        with job.lock:
+            if job.cancelled:
+                worker.kill()
+                return {"status": "cancelled"}
+            job.worker = worker
+        job.events.put({"type": "started"})
+        profiler = BuildProfiler()
+        def on_line(line):
+            profiler.feed(line)
+            job.events.put({"type": "line", "text": line})
+        returncode, usage = worker.run(config, on_line)
+        status, metrics, history_id = finish_build(config, fingerprint, returncode, usage, job.cancelled,
+                                                   history=job.history, profiler=profiler, on_line=on_line)
+        return {"status": status, "returncode": returncode, "metrics": metrics, "history_id": history_id,
+                "artifact": config.artifact_path, "report": profiler.report_lines() if status != "cancelled" else []}
+    def status(self):
+        with self.condition:
+            return {"workers": self.workers, "python": self.python,
+                    "running": [{"client": job.client, "script": job.config.script} for job in self.running],
+                    "queued": [{"client": job.client, "script": job.config.script}
+                               for jobs in self.queues.values() for job in jobs]}
+    def close(self):
+        with self.condition:
+            self.closed = True
+            running = list(self.running)
+            pools = list(self.pools.values())
+            self.condition.notify_all()
+        for job in running:
+            job.cancel()
+        for pool in pools:
+            pool.close()
+class ServiceHandler(socketserver.StreamRequestHandler):
+    """Одно соединение: запрос строкой JSON, ответ - поток событий JSON по строке на событие"""
+    def handle(self):
+        service = self.server.service
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8") or "{}")
+        except ValueError:
+            return
+        if not secrets.compare_digest(str(request.get("token", "")), self.server.token):
+            self.reply({"type": "error", "error": "Неверный ключ службы сборки"})
+            return
+        kind = request.get("type")
+        if kind == "status":
+            self.reply(dict(service.status(), type="status"))
+        elif kind == "stop":
+            self.reply({"type": "stopped"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif kind == "build":
+            config = BuildConfig.from_dict(request.get("config", {}))
+            job = BuildJob(config, request.get("client") or "anonymous", request.get("force", False),
+                           request.get("history", True))
+            service.submit(job)
+            threading.Thread(target=self.watch_client, args=(service, job), daemon=True).start()
+            while True:
+                event = job.events.get()
+                try:
+                    self.reply(event)
+                except OSError:
+                    service.cancel(job)
+                    break
+                if event["type"] == "finished":
+                    break
+        else:
+            self.reply({"type": "error", "error": f"Неизвестный запрос: {kind}"})
+    def watch_client(self, service, job):
+        """Клиент отменяет сборку, закрывая соединение"""
+        try:
+            self.rfile.readline()
+        except (OSError, ValueError):
+            pass
+        if not job.done:
+            service.cancel(job)
+    def reply(self, message):
+        self.wfile.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+class ServiceServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+def serve(workers=SERVICE_WORKERS, python="", port=0, on_ready=None):
+    """Запуск службы до остановки (запрос stop или Ctrl+C); адрес и ключ записываются в кэш FitoPyBox"""
+    service = BuildService(workers, python)
+    server = ServiceServer((SERVICE_HOST, port), ServiceHandler)
+    server.service = service
+    server.token = secrets.token_hex(16)
+    info = {"host": SERVICE_HOST, "port": server.server_address[1], "token": server.token, "pid": os.getpid(),
+            "python": service.python, "workers": service.workers}
+    temp_path = f"{service_info_path()}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    os.replace(temp_path, service_info_path())
+    if on_ready:
+        on_ready(info)
+    try:
+        server.serve_forever()
+    finally:
+        service.close()
+        server.server_close()
+        if (read_service_info() or {}).get("pid") == os.getpid():
+            os.remove(service_info_path())
+class ServiceClient:
+    """Клиент службы сборки для окна, консольного режима и CI"""
+    def __init__(self, info=None, client=""):
+        self.info = info or read_service_info()
+        if not self.info:
+            raise ConnectionError("Служба сборки не запущена (python -m fitopybox serve)")
+        self.client = client or f"{socket.gethostname()}:{os.getpid()}"
+        self.connection = None
+    def connect(self, message):
+        connection = socket.create_connection((self.info["host"], self.info["port"]), timeout=CONNECT_TIMEOUT)
+        connection.settimeout(None)
+        stream = connection.makefile("rw", encoding="utf-8", newline="\n")
+        send_message(stream, dict(message, token=self.info["token"]))
+        return connection, stream
+    def request(self, message):
+        connection, stream = self.connect(message)
+        with connection, stream:
+            line = stream.readline()
+        if not line:
+            raise ConnectionError("Служба сборки закрыла соединение")
+        return json.loads(line)
+    def status(self):
+        return self.request({"type": "status"})
+    def stop(self):
+        return self.request({"type": "stop"})
+    def build(self, config, force=False, history=True, on_line=None, on_event=None):
+        """Отправка задания и ожидание результата; журнал передаётся в on_line, остальные события - в on_event"""
+        connection, stream = self.connect({"type": "build", "config": config.to_dict(), "client": self.client,
+                                           "force": force, "history": history})
+        self.connection = connection
+        try:
+            for line in stream:
+                event = json.loads(line)
+                if event["type"] == "line":
+                    if on_line:
+                        on_line(event["text"])
+                elif on_event:
+                    on_event(event)
+                if event["type"] in ("finished", "error"):
+                    return event
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.connection = None
+            stream.close()
+            connection.close()
+        return {"type": "finished", "status": "cancelled"}
+    def cancel(self):
+        connection = self.connection
+        if connection is not None:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+def service_available():
+    try:
+        ServiceClient().status()
+        return True
+    except (OSError, ValueError):
+        return False
@@ -0,0 +1,181 @@
+"""Замер запуска собранной программы: холодный и тёплый старт, время до первого вывода, пиковая память"""
+import os
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from .artifacts import find_executable
+from .history import HistoryStore, add_history_entry
+from .runner import kill_process_tree, wait_with_usage
+STARTUP_RUNS = 10
+STARTUP_TIMEOUT = 30
+SAMPLE_FIELDS = ["wall_time", "first_output", "peak_memory"]
+HISTORY_SEARCH_LIMIT = 50
+def bundle_files(config, executable):
+    """Файлы, которые читает программа при запуске: сам файл или вся папка onedir"""
+    directory = os.path.dirname(executable)
+    if os.path.normcase(directory) == os.path.normcase(os.path.abspath(config.output_dir)):
+        return [executable]
+    return [os.path.join(root, name) for root, _, files in os.walk(directory) for name in files]
+def drop_file_cache(paths):
+    """Вытеснение файлов из страничного кэша ОС; False, если ОС этого не позволяет"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            return False
+        finally:
+            os.close(fd)
+    return True
+OUTPUT_TAIL = 64 * 1024
+def run_once(executable, timeout=STARTUP_TIMEOUT, until_output=False, capture=False, env=None):
+    """Один запуск: время до завершения, до первого вывода и пиковая память процесса.
+    capture=True сохраняет конец вывода программы в sample["output"]; env - дополнительные переменные окружения."""
+    popen_kwargs = {"env": dict(os.environ, **env)} if env else {}
+    if os.name == "nt":
+        popen_kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        popen_kwargs["start_new_session"] = True
+    started = time.perf_counter()
+    process = subprocess.Popen([executable], cwd=os.path.dirname(executable), stdin=subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **popen_kwargs)
+    sample = {"first_output": None, "timed_out": False, "stopped": False}
+    output = bytearray()
+    def read_output():
+        first = True
+        while True:
+            chunk = process.stdout.read1(65536)
+            if not chunk:
+                break
+            if capture:
+                output.extend(chunk)
+                del output[:-OUTPUT_TAIL]
+            if first:
+                sample["first_output"] = time.perf_counter() - started
+                first = False
+                if until_output:
+                    sample["stopped"] = True
+                    kill_process_tree(process)
+        process.stdout.close()
+    def stop():
+        sample["timed_out"] = True
+        kill_process_tree(process)
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+    timer = threading.Timer(timeout, stop)
+    timer.start()
+    try:
+        returncode, usage = wait_with_usage(process)
+    finally:
+        timer.cancel()
+    sample["wall_time"] = time.perf_counter() - started
+    reader.join(timeout=5)
+    sample["peak_memory"] = usage.get("peak_memory")
+    sample["returncode"] = returncode
+    if capture:
+        sample["output"] = output.decode("utf-8", errors="replace")
+    if until_output and sample["first_output"] is not None:
+        sample["wall_time"] = sample["first_output"]
+    return sample
+def percentile(values, fraction):
+    """Значение по методу ближайшего ранга"""
+    ordered = sorted(values)
+    rank = max(1, round(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+def summarize(samples):
+    """Медиана и p95 по каждой величине серии запусков"""
+    summary = {"runs": len(samples),
+               "failed": sum(1 for sample in samples
+                             if sample["returncode"] and not sample["timed_out"] and not sample["stopped"]),
+               "timed_out": sum(1 for sample in samples if sample["timed_out"])}
+    for field in SAMPLE_FIELDS:
+        values = [sample[field] for sample in samples if sample.get(field) is not None]
+        summary[field] = {"median": statistics.median(values), "p95": percentile(values, 0.95)} if values else None
+    return summary
+def benchmark_startup(config, runs=STARTUP_RUNS, timeout=STARTUP_TIMEOUT, cold=True, until_output=False, on_run=None):
+    """Серии холодных и тёплых запусков собранной программы.
+    Холодный запуск - после вытеснения файлов сборки из кэша (Linux); тёплым запускам предшествует
+    один неучитываемый прогрев. Для одного файла с кэшем распаковки добавляется серия первых запусков,
+    каждый с пустым кэшем распаковки. on_run(series, index, sample) вызывается после каждого запуска."""
+    executable = find_executable(config)
+    if executable is None:
+        raise FileNotFoundError(f"Исполняемый файл не найден: {config.artifact_path}")
+    files = bundle_files(config, executable)
+    result = {"executable": executable, "runs": runs, "until_output": until_output, "cold_requested": cold,
+              "cold_cache_dropped": False, "first": None, "cold": None, "warm": None}
+    if config.cached_onefile:
+        samples = []
+        for index in range(runs):
+            with tempfile.TemporaryDirectory(prefix="fitopybox_extract_") as extract_root:
+                samples.append(run_once(executable, timeout, until_output, env={"FITOPYBOX_APP_CACHE": extract_root}))
+            if on_run:
+                on_run("first", index, samples[-1])
+        result["first"] = summarize(samples)
+    if cold and drop_file_cache(files):
+        result["cold_cache_dropped"] = True
+        samples = []
+        for index in range(runs):
+            drop_file_cache(files)
+            samples.append(run_once(executable, timeout, until_output))
+            if on_run:
+                on_run("cold", index, samples[-1])
+        result["cold"] = summarize(samples)
+    run_once(executable, timeout, until_output)
+    samples = []
+    for index in range(runs):
+        samples.append(run_once(executable, timeout, until_output))
+        if on_run:
+            on_run("warm", index, samples[-1])
+    result["warm"] = summarize(samples)
+    return result
+def startup_metrics(result):
+    """Медианы замера в виде метрик сборки для истории и статистики"""
+    metrics = {}
+    for series in ("cold", "warm"):
+        summary = result.get(series)
+        metrics[f"startup_{series}"] = round(summary["wall_time"]["median"], 4) if summary and summary["wall_time"] else None
+    warm = result.get("warm")
+    metrics["startup_memory"] = int(warm["peak_memory"]["median"]) if warm and warm["peak_memory"] else None
+    return metrics
+def record_startup(config, result):
+    """Сохранение замера в запись последней успешной сборки с теми же параметрами
+    (или просто последней успешной сборки скрипта). Если сборок нет, добавляется запись со статусом benchmark."""
+    command = config.preview()
+    with HistoryStore() as store:
+        entries = store.page(limit=HISTORY_SEARCH_LIMIT, status="success", file_path=config.script)
+        entry = next((entry for entry in entries if entry["command"] == command), entries[0] if entries else None)
+        if entry is not None:
+            metrics = dict(entry.get("metrics") or {})
+            metrics.update(startup_metrics(result))
+            store.update(entry["id"], startup=result, metrics=metrics)
+            return entry["id"]
+    return add_history_entry(command, config.script, status="benchmark",
+                             startup=result, metrics=startup_metrics(result))
+def report_lines(result):
+    """Текстовая сводка замера: медиана и p95 по сериям"""
+    lines = [f"Файл: {result['executable']}, запусков в серии: {result['runs']}"]
+    titles = {"first": "Первый запуск (распаковка в кэш)", "cold": "Холодный запуск", "warm": "Тёплый запуск"}
+    for series in ("first", "cold", "warm"):
+        summary = result.get(series)
+        if summary is None:
+            if series == "cold" and result.get("cold_requested"):
+                lines.append("Холодный запуск: сброс кэша файлов недоступен на этой платформе")
+            continue
+        lines.append(f"{titles[series]}:")
+        for field, title, scale, unit in (("wall_time", "время запуска", 1000, "мс"),
+                                          ("first_output", "до первого вывода", 1000, "мс"),
+                                          ("peak_memory", "пиковая память", 1 / (1024 * 1024), "МБ")):
+            values = summary.get(field)
+            if values:
+                lines.append(f"  {title:<20} медиана {values['median'] * scale:9.1f} {unit}, "
+                             f"p95 {values['p95'] * scale:9.1f} {unit}")
+        if summary["failed"] or summary["timed_out"]:
+            lines.append(f"  с ошибкой: {summary['failed']}, превышено время ожидания: {summary['timed_out']}")
+    return lines
@@ -0,0 +1,201 @@
+"""Реестр инструментов сборки: интерпретаторы Python и версии PyInstaller в них, с кэшем на диске"""
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from .paths import cache_dir
+TOOLCHAIN_CACHE_VERSION = 1
+TOOLCHAIN_FILE = "toolchains.json"
+PROBE_TIMEOUT = 30
+PYINSTALLER_REQUIREMENT = "pyinstaller>=6.3"
+VENV_NAMES = [".venv", "venv", "env"]
+PYTHON_NAME = re.compile(r"^python(3(\.\d+)?)?(\.exe)?$", re.IGNORECASE)
+PROBE_SCRIPT = """
+import json, sys, sysconfig
+from importlib import metadata
+try:
+    version = metadata.version("pyinstaller")
+except metadata.PackageNotFoundError:
+    version = ""
+print(json.dumps({"python": sys.version.split()[0], "pyinstaller": version, "prefix": sys.prefix,
+                  "venv": sys.prefix != getattr(sys, "base_prefix", sys.prefix),
+                  "purelib": sysconfig.get_paths()["purelib"]}))
+"""
+def venv_interpreter(venv):
+    if os.name == "nt":
+        return os.path.join(venv, "Scripts", "python.exe")
+    return os.path.join(venv, "bin", "python")
+def candidate_interpreters(project_dir=""):
+    """Интерпретаторы для проверки: текущий, активное и проектные окружения, python* из PATH"""
+    candidates = []
+    if not getattr(sys, "frozen", False):
+        candidates.append(sys.executable)
+    for variable in ("VIRTUAL_ENV", "CONDA_PREFIX"):
+        if os.environ.get(variable):
+            candidates.append(venv_interpreter(os.environ[variable]))
+            candidates.append(os.path.join(os.environ[variable], "python.exe"))
+    if project_dir:
+        for name in VENV_NAMES:
+            candidates.append(venv_interpreter(os.path.join(project_dir, name)))
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            continue
+        candidates.extend(os.path.join(directory, name) for name in names if PYTHON_NAME.match(name))
+    if os.name == "nt":
+        root = os.path.join(os.environ.get("LOCALAPPDATA", ""), "Programs", "Python")
+        candidates.extend(sorted(glob.glob(os.path.join(root, "Python3*", "python.exe"))))
+    result = []
+    seen = set()
+    for path in candidates:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen and os.path.isfile(path) and os.access(path, os.X_OK):
+            seen.add(key)
+            result.append(os.path.abspath(path))
+    return result
+def mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+def probe_interpreter(executable):
+    """Версии Python и PyInstaller интерпретатора (PyInstaller не импортируется, версия берётся из метаданных)"""
+    completed = subprocess.run([executable, "-c", PROBE_SCRIPT], cwd=cache_dir(), capture_output=True, text=True,
+                               timeout=PROBE_TIMEOUT, stdin=subprocess.DEVNULL)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip() or f"код завершения {completed.returncode}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+class ToolchainRegistry:
+    """Сведения об интерпретаторах, проверяемые по mtime интерпретатора и папки site-packages.
+    Установка или удаление пакета меняет mtime site-packages, и интерпретатор проверяется заново."""
+    def __init__(self):
+        self.path = os.path.join(cache_dir(), TOOLCHAIN_FILE)
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == TOOLCHAIN_CACHE_VERSION:
+                self.entries = data.get("toolchains", {})
+        except (OSError, ValueError):
+            pass
+    def lookup(self, executable):
+        """Сведения из кэша или None, если интерпретатор нужно проверить заново"""
+        entry = self.entries.get(executable)
+        if entry is None:
+            return None
+        if entry["stamp"] != [mtime(executable), mtime(entry.get("purelib", ""))]:
+            return None
+        return entry
+    def get(self, executable, refresh=False):
+        """Сведения об интерпретаторе; неудачная проверка тоже запоминается (поле error),
+        чтобы, например, заглушки pyenv для неустановленных версий не запускались каждый раз"""
+        entry = None if refresh else self.lookup(executable)
+        if entry is None:
+            try:
+                entry = probe_interpreter(executable)
+            except (OSError, ValueError, IndexError, RuntimeError, subprocess.TimeoutExpired) as e:
+                entry = {"error": str(e)}
+            entry["executable"] = executable
+            entry["stamp"] = [mtime(executable), mtime(entry.get("purelib", ""))]
+            self.entries[executable] = entry
+            self.dirty = True
+        return entry
+    def invalidate(self, executable):
+        if self.entries.pop(executable, None) is not None:
+            self.dirty = True
+    def discover(self, project_dir="", refresh=False):
+        """Доступные интерпретаторы; ссылки и заглушки (pyenv) на одно окружение объединяются"""
+        path_lookups.clear()
+        toolchains = []
+        seen = set()
+        for executable in candidate_interpreters(project_dir):
+            entry = self.get(executable, refresh)
+            if "error" in entry:
+                continue
+            key = os.path.normcase(entry["prefix"])
+            if key not in seen:
+                seen.add(key)
+                toolchains.append(entry)
+        self.save()
+        return toolchains
+    def save(self):
+        if not self.dirty:
+            return
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": TOOLCHAIN_CACHE_VERSION, "toolchains": self.entries}, f, indent=4)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Ошибка сохранения реестра инструментов: {e}")
+def discover_toolchains(project_dir="", refresh=False):
+    return ToolchainRegistry().discover(project_dir, refresh)
+def toolchain_entry(executable):
+    """Сведения об одном интерпретаторе (из кэша, при изменении - после проверки)"""
+    registry = ToolchainRegistry()
+    entry = registry.get(executable)
+    registry.save()
+    if "error" in entry:
+        raise RuntimeError(f"Не удалось проверить интерпретатор {executable}: {entry['error']}")
+    return entry
+def toolchain_label(toolchain):
+    pyinstaller = f"PyInstaller {toolchain['pyinstaller']}" if toolchain["pyinstaller"] else "без PyInstaller"
+    kind = ", окружение" if toolchain["venv"] else ""
+    return f"Python {toolchain['python']}{kind} — {pyinstaller} ({toolchain['executable']})"
+def path_pyinstaller():
+    """PyInstaller из PATH, который используется, если интерпретатор не выбран"""
+    return shutil.which("pyinstaller")
+SHELL_WRAPPER = re.compile(r"""^'''exec' "?([^"\s]+)"?""")
+path_interpreters = {}
+path_lookups = {}
+def script_interpreter(script):
+    """Интерпретатор из первой строки сценария запуска pip (#!, обёртка sh для длинных путей, #!/usr/bin/env)"""
+    with open(script, "rb") as f:
+        lines = f.read(4096).decode("utf-8", "replace").splitlines()
+    if not lines or not lines[0].startswith("#!"):
+        return ""
+    parts = lines[0][2:].split()
+    if not parts:
+        return ""
+    if os.path.basename(parts[0]) == "sh" and len(lines) > 1:
+        match = SHELL_WRAPPER.match(lines[1])
+        return match.group(1) if match else ""
+    if os.path.basename(parts[0]) == "env":
+        names = [part for part in parts[1:] if not part.startswith("-")]
+        return (shutil.which(names[0]) or "") if names else ""
+    return parts[0]
+def path_interpreter():
+    """Интерпретатор, в котором установлен pyinstaller из PATH; "", если его не удалось определить.
+    Запоминается по PATH и по пути и mtime файла pyinstaller, чтобы не искать и не читать его при каждом
+    построении команды; поиск интерпретаторов (discover) начинает поиск в PATH заново."""
+    path = os.environ.get("PATH", "")
+    pyinstaller = path_lookups.get(path)
+    if pyinstaller is None or pyinstaller and not os.path.isfile(pyinstaller):
+        pyinstaller = path_lookups[path] = path_pyinstaller() or ""
+    if not pyinstaller:
+        return ""
+    key = (pyinstaller, mtime(pyinstaller))
+    if key not in path_interpreters:
+        if os.name == "nt":
+            # Scripts\pyinstaller.exe лежит рядом с python.exe окружения или в папке установки Python
+            scripts = os.path.dirname(pyinstaller)
+            candidates = [os.path.join(scripts, "python.exe"), os.path.join(os.path.dirname(scripts), "python.exe")]
+        else:
+            try:
+                candidates = [script_interpreter(pyinstaller)]
+            except OSError:
+                candidates = []
+        path_interpreters[key] = next((path for path in candidates if path and os.path.isfile(path)), "")
+    return path_interpreters[key]
+def pyinstaller_requirement():
+    """Требование PyInstaller для установки и изолированных окружений (по умолчанию - не ниже 6.3);
+    переопределяется переменной FITOPYBOX_PYINSTALLER, например pyinstaller==6.10.0"""
+    return os.environ.get("FITOPYBOX_PYINSTALLER", "").strip() or PYINSTALLER_REQUIREMENT
+def install_command(python):
+    return [python, "-m", "pip", "install", pyinstaller_requirement()]
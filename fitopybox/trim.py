@@ -0,0 +1,290 @@
+"""Агрессивная обрезка сборки: исключение модулей, недостижимых из скрипта без необязательных импортов"""
+import ast
+import hashlib
+import os
+import re
+import sys
+from dataclasses import replace
+from .analyzer import analyze_bundle, parse_xref
+from .artifacts import find_executable, path_size, bundle_root
+from .assets import publish_assets, stage_assets
+from .deps import ScanCache, parse_files, scan_project
+from .extractcache import pack_cached_onefile
+from .icons import prepare_icon
+from .runner import kill_process_tree, start_build_process, stream_output
+from .startup import run_once
+TRIM_TYPES = {"SourceModule", "Package", "ExtensionModule", "CompiledModule", "NamespacePackage"}
+DEFAULT_TRIM_ALLOWLIST = ["encodings", "importlib", "multiprocessing", "concurrent", "asyncio", "ctypes",
+                          "pkg_resources", "pyimod01_archive", "pyimod02_importers", "pyimod03_ctypes"]
+OPTIONAL_IMPORT_ERRORS = {"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}
+MISSING_MODULE = re.compile(r"No module named '([^']+)'")
+TRIM_ATTEMPTS = 5
+SMOKE_TIMEOUT = 15
+def catches_import_error(node):
+    """Обработчики try перехватывают ImportError (необязательная зависимость)"""
+    for handler in node.handlers:
+        if handler.type is None:
+            return True
+        types = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+        for exception in types:
+            name = exception.id if isinstance(exception, ast.Name) else getattr(exception, "attr", "")
+            if name in OPTIONAL_IMPORT_ERRORS:
+                return True
+    return False
+def is_type_checking(test):
+    return (isinstance(test, ast.Name) and test.id == "TYPE_CHECKING") or \
+        (isinstance(test, ast.Attribute) and test.attr == "TYPE_CHECKING")
+def classify_imports(python_file):
+    """Импорты файла с признаком обязательности: [имя, уровень, 1 - выполняется при импорте модуля].
+    Импорты в функциях, под TYPE_CHECKING и в try с перехватом ImportError считаются необязательными."""
+    with open(python_file, "rb") as f:
+        source = f.read()
+    content_hash = hashlib.sha256(source).hexdigest()
+    try:
+        tree = ast.parse(source, filename=python_file)
+    except (SyntaxError, ValueError):
+        return content_hash, []
+    imports = []
+    def visit(node, hard):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append([alias.name, 0, hard])
+            return
+        if isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+            imports.append([module, node.level, hard])
+            for alias in node.names:
+                if alias.name != "*":
+                    imports.append([f"{module}.{alias.name}" if module else alias.name, node.level, hard])
+            return
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            hard = 0
+        elif isinstance(node, ast.If) and is_type_checking(node.test):
+            for child in node.body:
+                visit(child, 0)
+            for child in node.orelse:
+                visit(child, hard)
+            return
+        elif isinstance(node, ast.Try) and catches_import_error(node):
+            for child in node.body:
+                visit(child, 0)
+            for child in node.handlers + node.orelse + node.finalbody:
+                visit(child, hard)
+            return
+        for child in ast.iter_child_nodes(node):
+            visit(child, hard)
+    visit(tree, 1)
+    return content_hash, imports
+def absolute_name(name, level, module, is_package):
+    """Абсолютное имя модуля для относительного импорта внутри пакета"""
+    if not level:
+        return name
+    package = module if is_package else module.rpartition(".")[0]
+    parts = package.split(".") if package else []
+    if level > 1:
+        parts = parts[:len(parts) - (level - 1)]
+    return ".".join(parts + ([name] if name else []))
+def parents(module):
+    parts = module.split(".")
+    return [".".join(parts[:index]) for index in range(1, len(parts))]
+class TrimPlan:
+    """Модули графа PyInstaller, достижимые из скрипта, и список исключений для остальных"""
+    def __init__(self, graph, reachable, excludes):
+        self.graph = graph
+        self.reachable = reachable
+        self.excludes = excludes
+        self.savings = None
+    @property
+    def unreachable(self):
+        return [name for name, node in self.graph.items() if node["type"] in TRIM_TYPES and name not in self.reachable]
+    def to_dict(self):
+        return {"excludes": self.excludes, "reachable": len(self.reachable),
+                "unreachable": len(self.unreachable), "savings": self.savings}
+class ImportClassifier:
+    """Обязательные и необязательные импорты файлов библиотек с кэшем на диске"""
+    def __init__(self, paths, workers=None):
+        self.cache = ScanCache(sys.executable, kind="trim")
+        self.imports = {}
+        misses = []
+        for path in paths:
+            cached = self.cache.lookup(path)
+            if cached is None:
+                misses.append(path)
+            else:
+                self.imports[path] = cached
+        for path, parsed in zip(misses, parse_files(misses, workers, scanner=classify_imports)):
+            if parsed is not None:
+                self.imports[path] = parsed[1]
+                self.cache.store(path, *parsed)
+        self.cache.save()
+    def hard_targets(self, module, path):
+        """Имена, которые модуль импортирует при выполнении своего кода; None - источник неизвестен"""
+        imports = self.imports.get(path)
+        if imports is None:
+            return None
+        is_package = os.path.basename(path).startswith("__init__.")
+        hard, soft = set(), set()
+        for name, level, required in imports:
+            target = absolute_name(name, level, module, is_package)
+            if target:
+                (hard if required else soft).add(target)
+        return hard, soft
+def explained_by(target, names):
+    return any(name == target or name.startswith(target + ".") for name in names)
+def project_module_names(config):
+    """Имена локальных модулей проекта (их импорты считаются используемыми целиком)"""
+    names = set()
+    try:
+        scan = scan_project(config.script)
+    except (OSError, ValueError):
+        return names
+    root = config.script_dir
+    for path in scan.files:
+        relative = os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, ".")
+        if relative.endswith(".__init__"):
+            relative = relative[:-len(".__init__")]
+        names.add(relative)
+    return names
+def plan_trim(config, allowlist=(), graph=None, workers=None):
+    """Обход графа PyInstaller только по обязательным импортам и исключения для недостижимых пакетов"""
+    graph = graph if graph is not None else parse_xref(os.path.join(config.work_dir, f"xref-{config.output_name}.html"))
+    if not graph:
+        raise FileNotFoundError(f"Граф модулей PyInstaller не найден в {config.work_dir}. Сначала соберите скрипт.")
+    project_dir = os.path.normcase(config.script_dir) + os.sep
+    project_modules = project_module_names(config)
+    def is_project(name, node):
+        if node["type"] == "Script" or name in project_modules:
+            return True
+        path = os.path.normcase(node["path"])
+        return path.startswith(project_dir) and "site-packages" not in path
+    sources = [node["path"] for name, node in graph.items()
+               if node["path"].endswith(".py") and not is_project(name, node)]
+    classifier = ImportClassifier(sources, workers)
+    allowed = list(allowlist) + DEFAULT_TRIM_ALLOWLIST
+    seeds = [name for name, node in graph.items()
+             if not node["imported_by"] or is_project(name, node)
+             or any(name == prefix or name.startswith(prefix + ".") for prefix in allowed)]
+    seeds.extend(module for module in config.hidden_imports if module in graph)
+    reachable = set()
+    queue = list(seeds)
+    while queue:
+        name = queue.pop()
+        if name in reachable:
+            continue
+        reachable.add(name)
+        queue.extend(parent for parent in parents(name) if parent in graph)
+        node = graph.get(name)
+        if node is None:
+            continue
+        targets = None
+        if not is_project(name, node) and node["path"].endswith(".py"):
+            targets = classifier.hard_targets(name, node["path"])
+        for imported in node["imports"]:
+            if imported in reachable:
+                continue
+            if targets is not None:
+                hard, soft = targets
+                if not explained_by(imported, hard) and explained_by(imported, soft):
+                    continue
+            queue.append(imported)
+    # C-ускорители (_bisect, _pickle и т.п.) импортируются в try, но без них код работает медленнее
+    for name in list(reachable):
+        for imported in graph.get(name, {"imports": []})["imports"]:
+            if imported.startswith("_") and "." not in imported and graph.get(imported, {}).get("type") == "ExtensionModule":
+                reachable.add(imported)
+    unreachable = {name for name, node in graph.items() if node["type"] in TRIM_TYPES and name not in reachable}
+    excludes = sorted(name for name in unreachable
+                      if not any(parent in unreachable for parent in parents(name))
+                      and name not in config.exclude_modules)
+    return TrimPlan(graph, reachable, excludes)
+def trimmed_config(config, excludes):
+    """Параметры пробной сборки с исключениями в отдельных папках (основная сборка не меняется)"""
+    trim_dir = os.path.join(config.script_dir, "build", "trim")
+    return replace(config, exclude_modules=list(config.exclude_modules) + [module for module in excludes
+                                                                            if module not in config.exclude_modules],
+                   workpath=os.path.join(trim_dir, "work"), distpath=os.path.join(trim_dir, "dist"),
+                   specpath=trim_dir)
+def smoke_test(config, timeout=SMOKE_TIMEOUT):
+    """Пробный запуск: программа не должна падать с ошибкой импорта.
+    Программа, которая не завершилась за timeout (окно, сервер), считается запустившейся."""
+    executable = find_executable(config)
+    if executable is None:
+        return {"ok": False, "missing": None, "output": "Исполняемый файл не найден"}
+    sample = run_once(executable, timeout, capture=True)
+    missing = MISSING_MODULE.search(sample["output"])
+    failed = bool(missing) or "ImportError" in sample["output"] or \
+        (sample["returncode"] != 0 and not sample["timed_out"])
+    return {"ok": not failed, "missing": missing.group(1) if missing else None,
+            "returncode": sample["returncode"], "timed_out": sample["timed_out"], "output": sample["output"][-2000:]}
+def run_trim(config, allowlist=(), verify=True, timeout=SMOKE_TIMEOUT, on_line=print, on_process=None,
+             attempts=TRIM_ATTEMPTS):
+    """Пробная сборка с автоматическими исключениями и проверкой запуском.
+    Если проверка сообщает об отсутствующем модуле, он добавляется в разрешённые и сборка повторяется."""
+    allowlist = list(allowlist)
+    baseline = None
+    if verify and find_executable(config):
+        on_line("Проверка исходной сборки...")
+        baseline = smoke_test(config, timeout)
+    result = {"status": "failed", "excludes": [], "allowlist": allowlist, "attempts": 0,
+              "size_before": None, "size_after": None, "smoke": None}
+    if os.path.exists(bundle_root(config)):
+        result["size_before"] = path_size(bundle_root(config))
+    graph = parse_xref(os.path.join(config.work_dir, f"xref-{config.output_name}.html"))
+    for attempt in range(1, attempts + 1):
+        result["attempts"] = attempt
+        plan = plan_trim(config, allowlist, graph)
+        result["excludes"] = plan.excludes
+        on_line(f"Попытка {attempt}: исключается {len(plan.excludes)} модулей, "
+                f"недостижимо {len(plan.unreachable)} из {len(graph)}")
+        trial = trimmed_config(config, plan.excludes)
+        stage_assets(trial)
+        prepare_icon(trial)
+        process = start_build_process(trial.to_command(), cwd=trial.script_dir)
+        if on_process:
+            on_process(process)
+        try:
+            returncode, _ = stream_output(process, on_line)
+        except BaseException:
+            kill_process_tree(process)
+            raise
+        if returncode != 0:
+            result["status"] = "build_failed"
+            return result
+        if trial.cached_onefile:
+            try:
+                pack_cached_onefile(trial, on_line)
+            except (OSError, RuntimeError) as e:
+                on_line(f"Ошибка упаковки в один файл: {e}")
+                result["status"] = "build_failed"
+                return result
+        if publish_assets(trial, on_line) is False:
+            result["status"] = "build_failed"
+            return result
+        result["size_after"] = path_size(bundle_root(trial))
+        result["artifact"] = find_executable(trial)
+        if not verify:
+            result["status"] = "unverified"
+            return result
+        smoke = smoke_test(trial, timeout)
+        result["smoke"] = smoke
+        if baseline is not None and not baseline["ok"] and smoke["returncode"] == baseline["returncode"] \
+                and not smoke["missing"]:
+            smoke["ok"] = True
+        if smoke["ok"]:
+            result["status"] = "success"
+            return result
+        missing = smoke["missing"]
+        if not missing or missing in allowlist:
+            result["status"] = "smoke_failed"
+            return result
+        on_line(f"Запуск не удался: нет модуля {missing}; он добавлен в разрешённые")
+        allowlist.append(missing)
+    result["status"] = "smoke_failed"
+    return result
+def estimate_savings(config, plan):
+    """Оценка экономии по составу текущей сборки"""
+    try:
+        report = analyze_bundle(config)
+    except (OSError, ValueError):
+        return None
+    return sum(report.size_of_prefix(module) for module in plan.excludes)
@@ -0,0 +1,178 @@
+"""Матрица вариантов сборки: параллельная сборка сочетаний параметров и сравнение размера, времени сборки и запуска"""
+import itertools
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from .artifacts import bundle_root, path_size
+from .pipeline import check_up_to_date, finish_build
+from .runner import kill_process_tree, start_build_process, stream_output
+from .startup import STARTUP_TIMEOUT, benchmark_startup
+from .toolchain import path_interpreter
+from .workcache import managed_config
+VARIANT_OPTIONS = {
+    "onefile": ("one_file", [True, False]),
+    "upx": ("no_upx", [False, True]),
+    "optimize": ("optimize", [0, 2]),
+    "strip": ("strip", [False, True]),
+    "noarchive": ("no_archive", [False, True])
+}
+OPTION_TITLES = {
+    "onefile": "Один файл / папка",
+    "upx": "Сжатие UPX",
+    "optimize": "Оптимизация байт-кода (-OO)",
+    "strip": "Удаление отладочных символов (--strip)",
+    "noarchive": "Модули без архива PYZ (--debug=noarchive)"
+}
+DEFAULT_VARIANT_OPTIONS = ["onefile", "upx"]
+CRITERIA = {
+    "balanced": "Баланс размера и запуска",
+    "size": "Размер",
+    "startup": "Время запуска",
+    "build": "Время сборки"
+}
+VARIANT_RUNS = 5
+VARIANT_FILE = "fitopybox_variant.json"
+def unavailable_options():
+    """Параметры, варианты которых не будут отличаться в этой системе, с причиной"""
+    reasons = {}
+    if shutil.which("upx") is None:
+        reasons["upx"] = "UPX не найден, сборки с ним и без него совпадут"
+    if os.name == "nt" or shutil.which("strip") is None:
+        reasons["strip"] = "утилита strip недоступна"
+    return reasons
+def variant_label(options):
+    """Краткое имя варианта, например onedir-noupx-O2; служит и именем папки"""
+    parts = []
+    if "one_file" in options:
+        parts.append("onefile" if options["one_file"] else "onedir")
+    if "no_upx" in options:
+        parts.append("noupx" if options["no_upx"] else "upx")
+    if "optimize" in options:
+        parts.append(f"O{options['optimize']}")
+    if "strip" in options:
+        parts.append("strip" if options["strip"] else "nostrip")
+    if "no_archive" in options:
+        parts.append("noarchive" if options["no_archive"] else "pyz")
+    return "-".join(parts) or "base"
+def variant_matrix(names):
+    """Все сочетания значений выбранных параметров"""
+    fields = [VARIANT_OPTIONS[name] for name in names]
+    return [dict(zip([field for field, _ in fields], values))
+            for values in itertools.product(*(values for _, values in fields))]
+def variant_config(config, options):
+    """Параметры сборки варианта с отдельными папками результата и рабочих файлов.
+    Все варианты собираются одним интерпретатором: выбранным или тем, в котором установлен pyinstaller из PATH."""
+    label = variant_label(options)
+    root = os.path.join(config.script_dir, "build", "variants", label)
+    return managed_config(replace(config, workpath="", distpath=os.path.join(root, "dist"), specpath=root,
+                                  python=config.python or path_interpreter(), **options), variant=f"variant:{label}")
+def read_variant_info(config):
+    try:
+        with open(os.path.join(config.work_dir, VARIANT_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+def write_variant_info(config, info):
+    try:
+        with open(os.path.join(config.work_dir, VARIANT_FILE), "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=4)
+    except OSError as e:
+        print(f"Ошибка сохранения сведений о варианте: {e}")
+def build_variant(config, result, force=False, on_line=None, on_process=None, stop=None):
+    """Сборка одного варианта без записи в историю. Для варианта без изменений время сборки
+    берётся из его прошлой сборки."""
+    if stop is not None and stop.is_set():
+        result["status"] = "cancelled"
+        return result
+    fingerprint, up_to_date = check_up_to_date(config, force, history=False)
+    if up_to_date:
+        result["status"] = "skipped"
+        result["build_time"] = read_variant_info(config).get("build_time")
+    else:
+        process = start_build_process(config.to_command(), cwd=config.script_dir)
+        if on_process:
+            on_process(process)
+        try:
+            returncode, usage = stream_output(process, lambda line: on_line(result["label"], line) if on_line else None)
+        except BaseException:
+            kill_process_tree(process)
+            raise
+        cancelled = stop is not None and stop.is_set()
+        result["status"], metrics, _ = finish_build(config, fingerprint, returncode, usage, cancelled, history=False)
+        result["build_time"] = metrics["wall_time"]
+        if result["status"] == "success":
+            write_variant_info(config, {"build_time": metrics["wall_time"]})
+    if result["status"] in ("success", "skipped"):
+        result["size"] = path_size(bundle_root(config))
+        result["artifact"] = config.artifact_path
+    return result
+def run_matrix(config, names, workers=None, runs=VARIANT_RUNS, timeout=STARTUP_TIMEOUT, until_output=False,
+               force=False, on_line=None, on_variant=None, on_process=None, stop=None):
+    """Параллельная сборка всех вариантов, затем поочерёдный замер запуска собранных.
+    Запуск замеряется после всех сборок, чтобы параллельный PyInstaller не искажал время.
+    on_variant(index, result) вызывается после сборки и после замера каждого варианта."""
+    stop = stop or threading.Event()
+    matrix = variant_matrix(names)
+    configs = [variant_config(config, options) for options in matrix]
+    results = [{"label": variant_label(options), "options": options, "status": "pending", "build_time": None,
+                "size": None, "startup": None, "startup_p95": None, "startup_memory": None, "artifact": None}
+               for options in matrix]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(configs)))
+    def build(index):
+        build_variant(configs[index], results[index], force, on_line, on_process, stop)
+        if on_variant:
+            on_variant(index, results[index])
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(build, range(len(configs))))
+    for index, result in enumerate(results):
+        if stop.is_set() or result["status"] not in ("success", "skipped") or not runs:
+            continue
+        try:
+            summary = benchmark_startup(configs[index], runs=runs, timeout=timeout, cold=False,
+                                        until_output=until_output)["warm"]
+        except FileNotFoundError:
+            continue
+        if summary["wall_time"]:
+            result["startup"] = summary["wall_time"]["median"]
+            result["startup_p95"] = summary["wall_time"]["p95"]
+        if summary["peak_memory"]:
+            result["startup_memory"] = int(summary["peak_memory"]["median"])
+        if on_variant:
+            on_variant(index, result)
+    return results
+def rank_variants(results, criterion="balanced"):
+    """Собранные варианты от лучшего к худшему. Баланс - сумма размера и времени запуска,
+    отнесённых к лучшим значениям среди вариантов."""
+    built = [result for result in results if result["size"] is not None]
+    if not built:
+        return []
+    def ratio(field, result):
+        values = [item[field] for item in built if item[field]]
+        if not values or result[field] is None:
+            return float("inf") if values else 0
+        return result[field] / min(values)
+    keys = {
+        "size": lambda result: result["size"],
+        "startup": lambda result: float("inf") if result["startup"] is None else result["startup"],
+        "build": lambda result: float("inf") if result["build_time"] is None else result["build_time"],
+        "balanced": lambda result: ratio("size", result) + ratio("startup", result)
+    }
+    return sorted(built, key=keys[criterion])
+def report_lines(results, criterion="balanced"):
+    """Таблица сравнения вариантов; лучший по критерию отмечен звёздочкой"""
+    ranked = rank_variants(results, criterion)
+    best = ranked[0]["label"] if ranked else None
+    lines = [f"  {'Вариант':<28} {'Статус':<10} {'Сборка, с':>10} {'Размер, МБ':>11} {'Запуск, мс':>11} {'p95, мс':>9}"]
+    for result in results:
+        def value(field, scale, digits):
+            return "—" if result[field] is None else f"{result[field] * scale:.{digits}f}"
+        mark = "*" if result["label"] == best else " "
+        lines.append(f"{mark} {result['label']:<28} {result['status']:<10} {value('build_time', 1, 1):>10} "
+                     f"{value('size', 1 / (1024 * 1024), 1):>11} {value('startup', 1000, 1):>11} "
+                     f"{value('startup_p95', 1000, 1):>9}")
+    if best:
+        lines.append(f"Лучший вариант ({CRITERIA[criterion].lower()}): {best}")
+    return lines
@@ -0,0 +1,130 @@
+"""Режим наблюдения: отслеживание исходников сборки и автоматическая пересборка при их изменении"""
+import os
+import threading
+import time
+from .deps import scan_project
+from .fingerprint import iter_input_files
+from .pipeline import check_up_to_date, finish_build
+from .runner import kill_process_tree, start_build_process, stream_output
+WATCH_DEBOUNCE = 0.5
+WATCH_POLL_INTERVAL = 0.5
+def file_state(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+class SourceWatcher:
+    """Отслеживаемые файлы сборки (скрипт, его локальные модули, доп. файлы, иконка) и их mtime и размер.
+    После изменения .py файлов граф импортов обновляется через кэш разбора: заново разбираются только изменённые файлы."""
+    def __init__(self, config):
+        self.config = config
+        self.modules = []
+        self.states = {}
+        self.rescan()
+    def rescan(self):
+        try:
+            self.modules = scan_project(self.config.script).local_modules
+        except OSError:
+            self.modules = []
+        self.states = {path: file_state(path) for path in self.files()}
+    def inputs(self):
+        """Входные пути сборки, как в отпечатке: файлы и папки"""
+        config = self.config
+        inputs = [os.path.normpath(os.path.abspath(config.script))] + self.modules
+        inputs.extend(os.path.normpath(os.path.join(config.script_dir, file)) for file in config.additional_files)
+        if config.icon:
+            inputs.append(os.path.normpath(os.path.join(config.script_dir, config.icon)))
+        return inputs
+    def files(self):
+        files = []
+        for path in self.inputs():
+            files.extend(iter_input_files(path))
+        return files
+    def directories(self):
+        """Папки для наблюдения: папки доп. файлов и папки отслеживаемых файлов
+        (редакторы часто сохраняют файл через переименование, и наблюдение за самим файлом теряется)"""
+        directories = set()
+        for path in self.inputs():
+            if os.path.isdir(path):
+                directories.update(directory for directory, _, _ in os.walk(path))
+            else:
+                directories.add(os.path.dirname(path))
+        return sorted(directory for directory in directories if os.path.isdir(directory))
+    def check(self):
+        """Изменившиеся с прошлой проверки файлы (изменённые, новые и удалённые)"""
+        states = {path: file_state(path) for path in self.files()}
+        changed = sorted(path for path in set(states) | set(self.states) if states.get(path) != self.states.get(path))
+        if any(path.endswith(".py") for path in changed):
+            self.rescan()
+        else:
+            self.states = states
+        return changed
+class WatchBuild(threading.Thread):
+    """Одна сборка в режиме наблюдения; cancel() завершает PyInstaller вместе с дочерними процессами"""
+    def __init__(self, config, on_line=None, on_result=None):
+        super().__init__(daemon=True)
+        self.config = config
+        self.on_line = on_line
+        self.on_result = on_result
+        self.process = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+    def run(self):
+        started = time.time()
+        fingerprint, up_to_date = check_up_to_date(self.config, on_line=self.on_line or print)
+        if up_to_date:
+            status, metrics = "skipped", {}
+        else:
+            with self.lock:
+                if self.cancelled:
+                    return
+                try:
+                    self.process = start_build_process(self.config.to_command(), cwd=self.config.script_dir)
+                except OSError as e:
+                    self.process = None
+                    if self.on_line:
+                        self.on_line(f"Не удалось запустить PyInstaller: {e}")
+            if self.process is None:
+                status, metrics = "failed", {}
+            else:
+                returncode, usage = stream_output(self.process, self.on_line)
+                status, metrics, _ = finish_build(self.config, fingerprint, returncode, usage, self.cancelled,
+                                                  on_line=self.on_line or print)
+        if self.on_result:
+            self.on_result(status, metrics, started)
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            if self.process is not None:
+                kill_process_tree(self.process)
+def run_watch(config, on_line=print, on_result=None, on_change=None, stop=None,
+              debounce=WATCH_DEBOUNCE, interval=WATCH_POLL_INTERVAL):
+    """Сборка и пересборка при каждом изменении исходников до установки stop.
+    Серия сохранений объединяется: пересборка начинается, когда файлы не меняются debounce секунд.
+    Незавершённая сборка при новом изменении отменяется."""
+    stop = stop or threading.Event()
+    watcher = SourceWatcher(config)
+    build = WatchBuild(config, on_line, on_result)
+    build.start()
+    changed = set()
+    changed_at = 0
+    try:
+        while not stop.wait(interval):
+            paths = watcher.check()
+            if paths:
+                changed.update(paths)
+                changed_at = time.monotonic()
+                continue
+            if not changed or time.monotonic() - changed_at < debounce:
+                continue
+            if on_change:
+                on_change(sorted(changed))
+            changed.clear()
+            build.cancel()
+            build.join()
+            build = WatchBuild(config, on_line, on_result)
+            build.start()
+    finally:
+        build.cancel()
+        build.join()
@@ -0,0 +1,110 @@
+"""Общий кэш рабочих папок PyInstaller (--workpath) с ограничением размера и вытеснением LRU"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import replace
+from .artifacts import path_size
+from .fingerprint import toolchain_info
+from .paths import cache_dir
+WORK_CACHE_DIR = "work"
+WORK_CACHE_INFO = "fitopybox_cache.json"
+DEFAULT_WORK_CACHE_LIMIT = 5 * 1024 * 1024 * 1024
+ACTIVE_WINDOW = 60 * 60
+def work_cache_limit():
+    """Предельный размер кэша в байтах; переопределяется FITOPYBOX_WORK_CACHE_LIMIT_MB"""
+    try:
+        return int(os.environ["FITOPYBOX_WORK_CACHE_LIMIT_MB"]) * 1024 * 1024
+    except (KeyError, ValueError):
+        return DEFAULT_WORK_CACHE_LIMIT
+def work_cache_key(config, variant=""):
+    """Ключ рабочей папки: проект, интерпретатор, версия PyInstaller"""
+    digest = hashlib.sha1()
+    toolchain = toolchain_info(config.python)
+    for part in (os.path.normcase(config.script_dir), toolchain["executable"], toolchain["python"],
+                 toolchain["pyinstaller"], variant):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+def managed_config(config, variant=""):
+    """Параметры сборки с рабочей папкой из общего кэша (если workpath не задан явно)"""
+    if config.workpath or not config.script:
+        return config
+    return replace(config, workpath=os.path.join(cache_dir(WORK_CACHE_DIR), work_cache_key(config, variant)))
+def is_managed(config):
+    root = os.path.normcase(os.path.abspath(cache_dir(WORK_CACHE_DIR)))
+    return bool(config.workpath) and os.path.normcase(os.path.dirname(os.path.abspath(config.workpath))) == root
+def read_info(entry_dir):
+    try:
+        with open(os.path.join(entry_dir, WORK_CACHE_INFO), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+def write_info(entry_dir, info):
+    temp_path = os.path.join(entry_dir, f"{WORK_CACHE_INFO}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False, indent=4)
+        os.replace(temp_path, os.path.join(entry_dir, WORK_CACHE_INFO))
+    except OSError as e:
+        print(f"Ошибка записи сведений кэша сборки: {e}")
+def touch_entry(config):
+    """Отметка использования рабочей папки перед сборкой"""
+    if not is_managed(config):
+        return
+    os.makedirs(config.workpath, exist_ok=True)
+    info = read_info(config.workpath)
+    toolchain = toolchain_info(config.python)
+    info.update(project=config.script_dir, python=toolchain["executable"], pyinstaller=toolchain["pyinstaller"],
+                last_used=time.time())
+    write_info(config.workpath, info)
+def update_entry_size(config):
+    """Размер рабочей папки после сборки (чтобы не обходить кэш при каждом вытеснении)"""
+    if not is_managed(config) or not os.path.isdir(config.workpath):
+        return
+    info = read_info(config.workpath)
+    info["size"] = path_size(config.workpath)
+    info["last_used"] = time.time()
+    write_info(config.workpath, info)
+def cache_entries():
+    """Рабочие папки кэша от давно использованных к недавним"""
+    root = cache_dir(WORK_CACHE_DIR)
+    entries = []
+    for entry in os.scandir(root):
+        if not entry.is_dir():
+            continue
+        info = read_info(entry.path)
+        if "size" not in info:
+            info["size"] = path_size(entry.path)
+        if "last_used" not in info:
+            info["last_used"] = entry.stat().st_mtime
+        info["path"] = entry.path
+        entries.append(info)
+    return sorted(entries, key=lambda info: info["last_used"])
+def cache_size():
+    return sum(info["size"] for info in cache_entries())
+def evict(limit=None, keep=()):
+    """Удаление давно использованных папок, пока кэш больше предела.
+    Папки из keep и использованные в последний час (возможно, идёт сборка) не удаляются."""
+    limit = work_cache_limit() if limit is None else limit
+    entries = cache_entries()
+    total = sum(info["size"] for info in entries)
+    keep = {os.path.normcase(os.path.abspath(path)) for path in keep}
+    removed = []
+    for info in entries:
+        if total <= limit:
+            break
+        if os.path.normcase(info["path"]) in keep or time.time() - info["last_used"] < ACTIVE_WINDOW:
+            continue
+        shutil.rmtree(info["path"], ignore_errors=True)
+        total -= info["size"]
+        removed.append(info["path"])
+    return removed
+def clear_work_cache():
+    """Удаление всех рабочих папок; возвращает освобождённый объём в байтах"""
+    freed = 0
+    for info in cache_entries():
+        shutil.rmtree(info["path"], ignore_errors=True)
+        freed += info["size"]
+    return freed
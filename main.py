@@ -1,111 +1,65 @@
+import time
+STARTUP_STARTED = time.perf_counter()
 import sys
 import os
-import re
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                            QHBoxLayout, QPushButton, QLabel, QLineEdit, 
-                            QCheckBox, QFileDialog, QTextEdit, QComboBox,
-                            QDialog, QTabWidget, QScrollArea, QFrame,
-                            QMessageBox, QMenuBar, QMenu, QStatusBar, QSpacerItem,
-                            QSizePolicy, QStackedWidget)
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QIcon, QPixmap, QFont, QPalette, QColor
 import subprocess
-import json
-from datetime import datetime
-def find_requirements_file(python_file):
-    """Поиск файла requirements.txt в директории Python файла"""
-    directory = os.path.dirname(python_file)
-    requirements_file = os.path.join(directory, "requirements.txt")
-    if os.path.exists(requirements_file):
-        return requirements_file
-    return None
-def extract_imports(python_file):
-    """Извлечение импортов из Python файла"""
-    imports = set()
-    try:
-        with open(python_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        import_pattern = r'^(?:from\s+(\w+)(?:\.\w+)*\s+import|import\s+(\w+))'
-        matches = re.finditer(import_pattern, content, re.MULTILINE)
-        for match in matches:
-            module = match.group(1) or match.group(2)
-            if module and not module.startswith('_'):
-                imports.add(module)
-        req_file = find_requirements_file(python_file)
-        if req_file:
-            with open(req_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        package = line.split('==')[0].split('>=')[0].split('<=')[0].strip()
-                        imports.add(package)
-    except Exception as e:
-        print(f"Ошибка при извлечении импортов: {e}")
-    return list(imports)
-class IconPreviewDialog(QDialog):
-    def __init__(self, icon_path, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Предпросмотр иконки")
-        self.setMinimumSize(300, 300)
-        layout = QVBoxLayout(self)
-        sizes = [16, 32, 48, 64, 128, 256]
-        for size in sizes:
-            icon = QIcon(icon_path)
-            pixmap = icon.pixmap(QSize(size, size))
-            label = QLabel()
-            label.setPixmap(pixmap)
-            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            layout.addWidget(label)
-        close_button = QPushButton("Закрыть")
-        close_button.clicked.connect(self.accept)
-        layout.addWidget(close_button)
-class BuildHistoryDialog(QDialog):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("История сборок")
-        self.setMinimumSize(600, 400)
-        layout = QVBoxLayout(self)
-        self.history_text = QTextEdit()
-        self.history_text.setReadOnly(True)
-        layout.addWidget(self.history_text)
-        button_layout = QHBoxLayout()
-        clear_button = QPushButton("Очистить историю")
-        clear_button.clicked.connect(self.clear_history)
-        close_button = QPushButton("Закрыть")
-        close_button.clicked.connect(self.accept)
-        button_layout.addWidget(clear_button)
-        button_layout.addWidget(close_button)
-        layout.addLayout(button_layout)
-        self.load_history()
-    def load_history(self):
-        try:
-            with open("build_history.json", "r") as f:
-                history = json.load(f)
-                text = ""
-                for entry in reversed(history):
-                    text += f"[{entry['timestamp']}]\n"
-                    text += f"Файл: {entry['file']}\n"
-                    text += f"Команда: {entry['command']}\n"
-                    text += "-" * 50 + "\n"
-                self.history_text.setText(text)
-        except FileNotFoundError:
-            self.history_text.setText("История пуста")
-    def clear_history(self):
-        reply = QMessageBox.question(self, "Подтверждение", 
-                                   "Вы уверены, что хотите очистить историю?",
-                                   QMessageBox.StandardButton.Yes | 
-                                   QMessageBox.StandardButton.No)
-        if reply == QMessageBox.StandardButton.Yes:
-            with open("build_history.json", "w") as f:
-                json.dump([], f)
-            self.history_text.clear()
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
+                            QHBoxLayout, QPushButton, QLabel, QLineEdit,
+                            QCheckBox, QFileDialog, QTextEdit, QComboBox,
+                            QDialog, QFrame, QMessageBox, QStatusBar,
+                            QStackedWidget, QPlainTextEdit)
+from PyQt6.QtCore import QFileSystemWatcher, QTimer
+from PyQt6.QtGui import QIcon
+from fitopybox.config import BuildConfig
+# Диалоги (модуль dialogs) и модули сборки импортируются при первом использовании, чтобы окно открывалось быстрее
+class StartupTrace:
+    """Время этапов запуска окна: флаг --startup-trace или переменная FITOPYBOX_STARTUP_TRACE=1"""
+    def __init__(self, started, enabled):
+        self.enabled = enabled
+        self.started = started
+        self.last = started
+        self.marks = []
+    def mark(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.marks.append((name, now - self.last))
+        self.last = now
+    def report(self):
+        if not self.enabled:
+            return
+        for name, duration in self.marks:
+            print(f"{name:<24} {duration * 1000:8.1f} мс", file=sys.stderr)
+        print(f"{'Всего':<24} {(self.last - self.started) * 1000:8.1f} мс", file=sys.stderr)
+        self.enabled = False
 class FitoPyBox(QMainWindow):
-    def __init__(self):
+    def __init__(self, trace=None):
         super().__init__()
+        self.trace = trace or StartupTrace(time.perf_counter(), False)
         self.setWindowTitle("FitoPyBox")
         self.setMinimumSize(1000, 800)
-        self.setup_styles() 
+        self.build_thread = None
+        self.deps_thread = None
+        self.toolchain_thread = None
+        self.install_thread = None
+        self.environment_thread = None
+        self.environment_python = None
+        self.launcher_thread = None
+        self.icon_thread = None
+        self.source_watcher = None
+        self.file_watcher = None
+        self.watch_build = False
+        self.rebuild_pending = False
+        self.changed_sources = []
+        self.setup_styles()
+        self.trace.mark("Стили")
         self.setup_ui()
+        self.trace.mark("Интерфейс")
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.trace.enabled:
+            self.trace.mark("Первая отрисовка")
+            self.trace.report()
     def setup_styles(self):
         self.setStyleSheet("""
             QMainWindow, QDialog {
@@ -185,7 +139,7 @@ class FitoPyBox(QMainWindow):
                 color: #ffffff;
                 font-size: 14px;
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: #2d2d2d;
                 color: #ffffff;
                 border: 2px solid #3d3d3d;
@@ -193,6 +147,20 @@ class FitoPyBox(QMainWindow):
                 padding: 8px;
                 font-size: 14px;
             }
+            QTableView {
+                background-color: #2d2d2d;
+                color: #ffffff;
+                gridline-color: #3d3d3d;
+                border: 2px solid #3d3d3d;
+                border-radius: 5px;
+                selection-background-color: #0d47a1;
+            }
+            QHeaderView::section {
+                background-color: #3d3d3d;
+                color: #ffffff;
+                padding: 4px;
+                border: none;
+            }
             QFrame {
                 background-color: #2d2d2d;
                 border: 1px solid #3d3d3d;
@@ -257,6 +225,30 @@ class FitoPyBox(QMainWindow):
         self.create_menu()
         self.stacked_widget = QStackedWidget()
         main_layout.addWidget(self.stacked_widget)
+        self.page_builders = [self.create_file_page, self.create_settings_page,
+                              self.create_advanced_page, self.create_build_page]
+        self.built_pages = set()
+        for _ in self.page_builders:
+            container = QWidget()
+            QVBoxLayout(container).setContentsMargins(0, 0, 0, 0)
+            self.stacked_widget.addWidget(container)
+        self.ensure_page(0)
+        self.statusBar = QStatusBar()
+        self.setStatusBar(self.statusBar)
+        self.statusBar.showMessage("Готов к работе")
+    def ensure_page(self, *indexes):
+        """Создание страниц мастера при первом обращении"""
+        for index in indexes:
+            if index not in self.built_pages:
+                self.built_pages.add(index)
+                self.stacked_widget.widget(index).layout().addWidget(self.page_builders[index]())
+    def show_page(self, index):
+        self.ensure_page(index)
+        self.stacked_widget.setCurrentIndex(index)
+        if index == self.stacked_widget.count() - 1:
+            self.update_command_preview()
+            self.show_result_buttons(False)
+    def create_file_page(self):
         page1 = QWidget()
         page1_layout = QVBoxLayout(page1)
         page1_layout.setSpacing(15)
@@ -287,7 +279,8 @@ class FitoPyBox(QMainWindow):
         nav_layout1.addStretch(1)
         nav_layout1.addWidget(self.next_button1)
         page1_layout.addLayout(nav_layout1)
-        self.stacked_widget.addWidget(page1)
+        return page1
+    def create_settings_page(self):
         page2 = QWidget()
         page2_layout = QVBoxLayout(page2)
         page2_layout.setSpacing(15)
@@ -310,8 +303,45 @@ class FitoPyBox(QMainWindow):
         self.no_console = QCheckBox("Запуск без консоли")
         self.one_file.setChecked(True)
         options_layout.addWidget(self.one_file)
+        self.extract_cache = QCheckBox("Распаковывать один раз в постоянный кэш (быстрый повторный запуск)")
+        self.extract_cache.setToolTip("Файл распаковывается при первом запуске каждой версии, дальше программа "
+                                      "запускается из кэша; старые версии удаляются автоматически")
+        self.one_file.toggled.connect(self.extract_cache.setEnabled)
+        self.extract_cache.toggled.connect(self.update_command_preview)
+        options_layout.addWidget(self.extract_cache)
         options_layout.addWidget(self.no_console)
+        self.no_upx = QCheckBox("Без сжатия UPX")
+        self.strip = QCheckBox("Удалить отладочные символы из библиотек (strip)")
+        self.no_archive = QCheckBox("Модули Python файлами, без архива PYZ")
+        options_layout.addWidget(self.no_upx)
+        options_layout.addWidget(self.strip)
+        options_layout.addWidget(self.no_archive)
+        optimize_layout = QHBoxLayout()
+        optimize_layout.addWidget(QLabel("Оптимизация байт-кода:"))
+        self.optimize = QComboBox()
+        self.optimize.addItems(["Нет", "-O (без assert)", "-OO (без assert и docstring)"])
+        optimize_layout.addWidget(self.optimize)
+        optimize_layout.addStretch(1)
+        options_layout.addLayout(optimize_layout)
         build_layout.addLayout(options_layout)
+        toolchain_layout = QHBoxLayout()
+        toolchain_layout.setSpacing(10)
+        toolchain_layout.addWidget(QLabel("Интерпретатор:"))
+        self.toolchain = QComboBox()
+        self.toolchain.addItem("pyinstaller из PATH", "")
+        self.toolchain.currentIndexChanged.connect(self.update_command_preview)
+        toolchain_layout.addWidget(self.toolchain, 1)
+        refresh_toolchains_button = QPushButton("Обновить")
+        refresh_toolchains_button.clicked.connect(lambda: self.discover_toolchains(refresh=True))
+        toolchain_layout.addWidget(refresh_toolchains_button)
+        build_layout.addLayout(toolchain_layout)
+        self.isolated_env = QCheckBox("Изолированное окружение: только PyInstaller и пакеты из requirements.txt")
+        self.isolated_env.setToolTip("Окружение создаётся один раз для requirements.txt и интерпретатора и "
+                                     "берётся из кэша; в сборку не попадают посторонние пакеты")
+        self.isolated_env.toggled.connect(self.update_command_preview)
+        build_layout.addWidget(self.isolated_env)
+        # Поиск интерпретаторов запускается после построения страницы, в фоне
+        QTimer.singleShot(0, self.discover_toolchains)
         icon_layout = QHBoxLayout()
         icon_layout.setSpacing(10)
         self.icon_path = QLineEdit()
@@ -335,7 +365,8 @@ class FitoPyBox(QMainWindow):
         nav_layout2.addStretch(1)
         nav_layout2.addWidget(self.next_button2)
         page2_layout.addLayout(nav_layout2)
-        self.stacked_widget.addWidget(page2)
+        return page2
+    def create_advanced_page(self):
         page3 = QWidget()
         page3_layout = QVBoxLayout(page3)
         page3_layout.setSpacing(15)
@@ -351,6 +382,10 @@ class FitoPyBox(QMainWindow):
         imports_layout.addWidget(QLabel("Скрытые импорты (через запятую):"))
         self.hidden_imports = QLineEdit()
         imports_layout.addWidget(self.hidden_imports)
+        imports_layout.addWidget(QLabel("Исключить модули (через запятую):"))
+        self.exclude_modules = QLineEdit()
+        self.exclude_modules.setPlaceholderText("Например: tkinter, numpy.f2py")
+        imports_layout.addWidget(self.exclude_modules)
         advanced_layout.addLayout(imports_layout)
         files_layout = QHBoxLayout()
         files_layout.setSpacing(10)
@@ -361,9 +396,25 @@ class FitoPyBox(QMainWindow):
         files_layout.addWidget(self.additional_files, 1)
         files_layout.addWidget(files_button)
         advanced_layout.addLayout(files_layout)
+        assets_layout = QHBoxLayout()
+        assets_layout.setSpacing(10)
+        assets_layout.addWidget(QLabel("Доп. файлы в сборке:"))
+        self.asset_mode = QComboBox()
+        self.asset_mode.addItem("Файлами, с сохранением папок", "files")
+        self.asset_mode.addItem("Одним архивом внутри сборки", "packed")
+        self.asset_mode.addItem("Архивом рядом с исполняемым файлом", "external")
+        self.asset_mode.setToolTip("Архив читается через mmap: в режиме одного файла ресурсы не распаковываются "
+                                   "при каждом запуске, а неизменённые файлы не копируются заново")
+        assets_layout.addWidget(self.asset_mode, 1)
+        helper_button = QPushButton("Создать модуль доступа")
+        helper_button.clicked.connect(self.create_assets_helper)
+        assets_layout.addWidget(helper_button)
+        advanced_layout.addLayout(assets_layout)
         resource_note_label = QLabel(
-            "<p><b>Примечание:</b> Для доступа к этим файлам в вашем скрипте используйте <code>sys._MEIPASS</code>.</p>" +
-            "<p>Пример: <code>os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), 'ваш_файл.ext')</code></p>"
+            "<p><b>Примечание:</b> Пути внутри папки скрипта сохраняются. Для чтения файлов создайте модуль "
+            "<code>fitopybox_assets.py</code> (кнопка выше) - он работает при запуске из исходников и в любом режиме сборки.</p>" +
+            "<p>Пример: <code>import fitopybox_assets; data = fitopybox_assets.read_bytes('images/logo.png')</code> "
+            "(<code>fitopybox_assets.path(...)</code> - путь к файлу для библиотек, которым нужен файл)</p>"
         )
         resource_note_label.setStyleSheet("font-size: 11px; color: #aaaaaa;")
         resource_note_label.setWordWrap(True)
@@ -379,7 +430,9 @@ class FitoPyBox(QMainWindow):
         nav_layout3.addStretch(1)
         nav_layout3.addWidget(self.next_button3)
         page3_layout.addLayout(nav_layout3)
-        self.stacked_widget.addWidget(page3)
+        return page3
+    def create_build_page(self):
+        from dialogs import BUILD_LOG_MAX_LINES
         page4 = QWidget()
         page4_layout = QVBoxLayout(page4)
         page4_layout.setSpacing(15)
@@ -393,8 +446,26 @@ class FitoPyBox(QMainWindow):
         self.command_preview = QTextEdit()
         self.command_preview.setReadOnly(True)
         preview_layout.addWidget(self.command_preview, 1)
-        page4_layout.addWidget(preview_group)
-        page4_layout.addStretch(1)
+        log_label = QLabel("Журнал сборки:")
+        log_label.setStyleSheet("font-weight: bold; font-size: 16px;")
+        preview_layout.addWidget(log_label)
+        self.build_log = QPlainTextEdit()
+        self.build_log.setReadOnly(True)
+        self.build_log.setMaximumBlockCount(BUILD_LOG_MAX_LINES)
+        self.build_log.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.build_log.setStyleSheet("font-family: Consolas, monospace; font-size: 12px;")
+        preview_layout.addWidget(self.build_log, 2)
+        page4_layout.addWidget(preview_group, 1)
+        self.force_rebuild = QCheckBox("Пересобрать, даже если ничего не изменилось")
+        page4_layout.addWidget(self.force_rebuild)
+        self.watch_sources = QCheckBox("Пересобирать автоматически при изменении исходников")
+        self.watch_sources.setToolTip("Отслеживаются скрипт, его локальные модули, дополнительные файлы и иконка")
+        self.watch_sources.toggled.connect(self.set_watch_enabled)
+        page4_layout.addWidget(self.watch_sources)
+        self.use_service = QCheckBox("Собирать через службу сборки")
+        self.use_service.setToolTip("Служба запускается командой python -m fitopybox serve и держит PyInstaller "
+                                    "загруженным, поэтому сборки начинаются без задержки на запуск")
+        page4_layout.addWidget(self.use_service)
         self.nav_layout4 = QHBoxLayout()
         self.back_button4 = QPushButton("Назад")
         self.back_button4.clicked.connect(self.go_previous_page)
@@ -410,76 +481,115 @@ class FitoPyBox(QMainWindow):
             }
         """)
         self.create_button.clicked.connect(self.create_exe)
+        self.cancel_build_button = QPushButton("Отменить сборку")
+        self.cancel_build_button.clicked.connect(self.cancel_build)
+        self.cancel_build_button.setVisible(False)
         self.open_folder_button = QPushButton("Открыть папку")
         self.open_folder_button.clicked.connect(self.open_output_folder)
-        self.run_exe_button = QPushButton("Запустить .exe")
+        self.run_exe_button = QPushButton("Запустить")
         self.run_exe_button.clicked.connect(self.run_created_exe)
+        self.benchmark_button = QPushButton("Замер запуска")
+        self.benchmark_button.clicked.connect(self.show_startup_benchmark)
+        self.analyze_button = QPushButton("Анализ размера")
+        self.analyze_button.clicked.connect(self.show_bundle_analysis)
+        self.trim_button = QPushButton("Обрезка")
+        self.trim_button.clicked.connect(self.show_trim)
         self.new_build_button = QPushButton("Новая сборка")
         self.new_build_button.clicked.connect(self.start_new_build)
         self.nav_layout4.addWidget(self.back_button4)
         self.nav_layout4.addStretch(1)
         self.nav_layout4.addWidget(self.create_button)
+        self.nav_layout4.addWidget(self.cancel_build_button)
         self.nav_layout4.addWidget(self.open_folder_button)
         self.nav_layout4.addWidget(self.run_exe_button)
+        self.nav_layout4.addWidget(self.benchmark_button)
+        self.nav_layout4.addWidget(self.analyze_button)
+        self.nav_layout4.addWidget(self.trim_button)
         self.nav_layout4.addWidget(self.new_build_button)
         page4_layout.addLayout(self.nav_layout4)
-        self.stacked_widget.addWidget(page4)
-        self.statusBar = QStatusBar()
-        self.setStatusBar(self.statusBar)
-        self.statusBar.showMessage("Готов к работе")
-        self.load_history()
-        self.update_command_preview()
-        self.update_navigation_buttons()
-        self.show_result_buttons(False)
+        return page4
     def show_result_buttons(self, visible):
         """Показывает или скрывает кнопки после сборки"""
         self.back_button4.setVisible(not visible)
         self.create_button.setVisible(not visible)
         self.open_folder_button.setVisible(visible)
         self.run_exe_button.setVisible(visible)
+        self.benchmark_button.setVisible(visible)
+        self.analyze_button.setVisible(visible)
+        self.trim_button.setVisible(visible)
         self.new_build_button.setVisible(visible)
     def go_next_page(self):
         current_index = self.stacked_widget.currentIndex()
         if current_index < self.stacked_widget.count() - 1:
-            self.stacked_widget.setCurrentIndex(current_index + 1)
-            if self.stacked_widget.currentIndex() == self.stacked_widget.count() - 1:
-                self.update_command_preview() 
-                self.show_result_buttons(False) 
-            self.update_navigation_buttons()
+            self.show_page(current_index + 1)
     def go_previous_page(self):
         current_index = self.stacked_widget.currentIndex()
         if current_index > 0:
-            self.stacked_widget.setCurrentIndex(current_index - 1)
-            self.update_navigation_buttons()
-            if current_index == self.stacked_widget.count() - 1:
-                self.show_result_buttons(False)
-    def update_navigation_buttons(self):
-        current_index = self.stacked_widget.currentIndex()
-        total_pages = self.stacked_widget.count()
-        self.next_button1.setVisible(False)
-        self.back_button2.setVisible(False)
-        self.next_button2.setVisible(False)
-        self.back_button3.setVisible(False)
-        self.next_button3.setVisible(False)
-        if current_index == 0:
-            self.next_button1.setVisible(True)
-        elif current_index == 1:
-            self.back_button2.setVisible(True)
-            self.next_button2.setVisible(True)
-        elif current_index == 2:
-            self.back_button3.setVisible(True)
-            self.next_button3.setVisible(True)
+            self.show_page(current_index - 1)
     def create_menu(self):
         menubar = self.menuBar()
         file_menu = menubar.addMenu("Файл")
+        batch_action = file_menu.addAction("Пакетная сборка...")
+        batch_action.triggered.connect(self.show_batch_build)
+        variants_action = file_menu.addAction("Сравнить варианты сборки...")
+        variants_action.triggered.connect(self.show_variant_matrix)
         exit_action = file_menu.addAction("Выход")
         exit_action.triggered.connect(self.close)
         history_menu = menubar.addMenu("История")
         view_history_action = history_menu.addAction("Просмотр истории")
         view_history_action.triggered.connect(self.show_history)
+        stats_action = history_menu.addAction("Статистика сборок")
+        stats_action.triggered.connect(self.show_stats)
         clear_history_action = history_menu.addAction("Очистить историю")
         clear_history_action.triggered.connect(self.clear_history)
+        cache_menu = menubar.addMenu("Кэш")
+        cache_size_action = cache_menu.addAction("Размер кэша сборки")
+        cache_size_action.triggered.connect(self.show_work_cache_size)
+        clear_cache_action = cache_menu.addAction("Очистить кэш сборки")
+        clear_cache_action.triggered.connect(self.clear_work_cache)
+        cache_menu.addSeparator()
+        store_size_action = cache_menu.addAction("Размер хранилища сборок")
+        store_size_action.triggered.connect(self.show_artifact_store_size)
+        clear_store_action = cache_menu.addAction("Очистить хранилище сборок")
+        clear_store_action.triggered.connect(self.clear_artifact_store)
+    def show_batch_build(self):
+        from dialogs import BatchBuildDialog
+        self.ensure_page(1, 2)
+        defaults = {
+            "one_file": self.one_file.isChecked(),
+            "no_console": self.no_console.isChecked(),
+            "icon": self.icon_path.text(),
+            "hidden_imports": self.hidden_imports.text(),
+            "exclude_modules": self.exclude_modules.text(),
+            "python": self.isolated_python() or self.toolchain.currentData() or "",
+            "optimize": self.optimize.currentIndex()
+        }
+        dialog = BatchBuildDialog(defaults, self)
+        dialog.exec()
+    def show_variant_matrix(self):
+        if not self.file_path.text():
+            QMessageBox.warning(self, "Предупреждение", "Сначала выберите Python файл")
+            return
+        from dialogs import VariantMatrixDialog
+        dialog = VariantMatrixDialog(self.build_config(), self)
+        if dialog.exec() == QDialog.DialogCode.Accepted and dialog.selected_options:
+            self.apply_variant(dialog.selected_options)
+    def apply_variant(self, options):
+        """Перенос параметров выбранного варианта в поля мастера"""
+        checks = {"one_file": self.one_file, "no_upx": self.no_upx, "strip": self.strip, "no_archive": self.no_archive}
+        for field, value in options.items():
+            if field in checks:
+                checks[field].setChecked(value)
+            elif field == "optimize":
+                self.optimize.setCurrentIndex(value)
+        self.update_command_preview()
+        self.statusBar.showMessage("Параметры варианта применены. Пересоберите файл, чтобы получить его.")
+    def show_stats(self):
+        from dialogs import BuildStatsDialog
+        dialog = BuildStatsDialog(self)
+        dialog.exec()
     def show_history(self):
+        from dialogs import BuildHistoryDialog
         dialog = BuildHistoryDialog(self)
         dialog.exec()
     def clear_history(self):
@@ -488,62 +598,165 @@ class FitoPyBox(QMainWindow):
                                    QMessageBox.StandardButton.Yes |
                                    QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            with open("build_history.json", "w") as f:
-                json.dump([], f)
+            from fitopybox.history import clear_history
+            clear_history()
             self.statusBar.showMessage("История очищена")
+    def show_work_cache_size(self):
+        from fitopybox.metrics import display_value
+        from fitopybox.workcache import cache_size, work_cache_limit
+        self.statusBar.showMessage(f"Кэш сборки: {display_value('artifact_size', cache_size())} МБ "
+                                   f"из {display_value('artifact_size', work_cache_limit())} МБ")
+    def clear_work_cache(self):
+        if self.build_thread is not None and self.build_thread.isRunning():
+            QMessageBox.warning(self, "Предупреждение", "Дождитесь завершения сборки")
+            return
+        reply = QMessageBox.question(self, "Подтверждение",
+                                   "Удалить временные файлы PyInstaller всех проектов? Следующие сборки будут полными.",
+                                   QMessageBox.StandardButton.Yes |
+                                   QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            from fitopybox.metrics import display_value
+            from fitopybox.workcache import clear_work_cache
+            freed = clear_work_cache()
+            self.statusBar.showMessage(f"Кэш сборки очищен, освобождено {display_value('artifact_size', freed)} МБ")
+    def show_artifact_store_size(self):
+        from fitopybox.artifactstore import store_limit, store_size
+        from fitopybox.metrics import display_value
+        self.statusBar.showMessage(f"Хранилище сборок: {display_value('artifact_size', store_size())} МБ "
+                                   f"из {display_value('artifact_size', store_limit())} МБ")
+    def clear_artifact_store(self):
+        reply = QMessageBox.question(self, "Подтверждение",
+                                   "Удалить сохранённые результаты всех сборок? Восстановить их из истории будет нельзя.",
+                                   QMessageBox.StandardButton.Yes |
+                                   QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            from fitopybox.artifactstore import clear_artifacts
+            from fitopybox.metrics import display_value
+            freed = clear_artifacts()
+            self.statusBar.showMessage(f"Хранилище сборок очищено, освобождено {display_value('artifact_size', freed)} МБ")
     def preview_icon(self):
         if not self.icon_path.text():
             QMessageBox.warning(self, "Предупреждение", "Сначала выберите иконку")
             return
+        from dialogs import IconPreviewDialog
         dialog = IconPreviewDialog(self.icon_path.text(), self)
         dialog.exec()
     def browse_file(self):
         file_name, _ = QFileDialog.getOpenFileName(self, "Выберите Python файл", "", "Python Files (*.py)")
         if file_name:
             self.file_path.setText(file_name)
+            if 1 in self.built_pages:
+                self.discover_toolchains()
+            self.ensure_page(1)
             if not self.exe_name.text():
                 self.exe_name.setText(os.path.splitext(os.path.basename(file_name))[0])
             self.statusBar.showMessage(f"Выбран файл: {file_name}")
     def browse_icon(self):
-        file_name, _ = QFileDialog.getOpenFileName(self, "Выберите иконку", "", "Icon Files (*.ico)")
+        file_name, _ = QFileDialog.getOpenFileName(self, "Выберите иконку", "",
+                                                   "Icon Files (*.ico *.png *.svg *.jpg *.jpeg *.bmp)")
         if file_name:
             self.icon_path.setText(file_name)
             self.statusBar.showMessage(f"Выбрана иконка: {file_name}")
+            from fitopybox.icons import needs_conversion
+            if needs_conversion(file_name):
+                self.prepare_icon(file_name)
+    def prepare_icon(self, file_name):
+        """Фоновое создание ICO всех размеров; сборки и предпросмотр потом берут его из кэша"""
+        from dialogs import TaskThread
+        from fitopybox.icons import prepare_icon_file
+        thread = TaskThread(prepare_icon_file, file_name, parent=self)
+        thread.result_ready.connect(lambda images: self.statusBar.showMessage(
+            f"Иконка подготовлена: {len(images)} размеров ({min(images)}-{max(images)} px)"))
+        thread.error_occurred.connect(lambda message: self.statusBar.showMessage(
+            f"Ошибка преобразования иконки: {message}"))
+        thread.finished.connect(self.on_icon_thread_finished)
+        thread.start()
+        self.icon_thread = thread
+    def on_icon_thread_finished(self):
+        self.sender().deleteLater()
+        if self.icon_thread is self.sender():
+            self.icon_thread = None
+    def create_assets_helper(self):
+        """Модуль fitopybox_assets.py рядом со скриптом вместо ручного кода с sys._MEIPASS"""
+        if not self.file_path.text():
+            QMessageBox.warning(self, "Предупреждение", "Сначала выберите Python файл")
+            return
+        from fitopybox.assets import HELPER_MODULE, write_helper
+        directory = os.path.dirname(os.path.abspath(self.file_path.text()))
+        if os.path.exists(os.path.join(directory, HELPER_MODULE + ".py")):
+            reply = QMessageBox.question(self, "Модуль доступа к ресурсам",
+                                         f"Файл {HELPER_MODULE}.py уже существует. Перезаписать?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        try:
+            path = write_helper(directory)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось создать модуль: {e}")
+            return
+        self.statusBar.showMessage(f"Создан модуль доступа к ресурсам: {path}")
     def browse_additional_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Выберите дополнительные файлы")
         if files:
             self.additional_files.setText(";".join(files))
             self.statusBar.showMessage(f"Добавлено файлов: {len(files)}")
+    def build_config(self, python=""):
+        """Параметры сборки из полей мастера; python - интерпретатор, если в мастере он не выбран"""
+        from fitopybox.workcache import managed_config
+        self.ensure_page(1, 2)
+        interpreter = self.isolated_python() or self.toolchain.currentData() or python
+        return managed_config(BuildConfig.from_fields(self.file_path.text(),
+                                                      name=self.exe_name.text(),
+                                                      one_file=self.one_file.isChecked(),
+                                                      extract_cache=self.extract_cache.isChecked(),
+                                                      no_console=self.no_console.isChecked(),
+                                                      icon=self.icon_path.text(),
+                                                      hidden_imports=self.hidden_imports.text(),
+                                                      additional_files=self.additional_files.text(),
+                                                      exclude_modules=self.exclude_modules.text(),
+                                                      no_upx=self.no_upx.isChecked(),
+                                                      strip=self.strip.isChecked(),
+                                                      no_archive=self.no_archive.isChecked(),
+                                                      optimize=self.optimize.currentIndex(),
+                                                      python=interpreter,
+                                                      asset_mode=self.asset_mode.currentData()))
+    def isolated_python(self):
+        return self.environment_python if self.isolated_env.isChecked() else None
     def update_command_preview(self):
-        command = ["pyinstaller"]
-        if self.one_file.isChecked():
-            command.append("--onefile")
-        if self.no_console.isChecked():
-            command.append("--noconsole")
-        if self.icon_path.text():
-            command.extend(["--icon", self.icon_path.text()])
-        if self.hidden_imports.text():
-            imports = [imp.strip() for imp in self.hidden_imports.text().split(",") if imp.strip()]
-            for imp in imports:
-                command.extend(["--hidden-import", imp])
-        if self.additional_files.text():
-            files = [f.strip() for f in self.additional_files.text().split(";") if f.strip()]
-            for file in files:
-                command.append(f"--add-data={file}{os.pathsep}.")
-        if self.file_path.text():
-            command.append(self.file_path.text())
-        self.command_preview.setText(" ".join(command))
+        if 3 not in self.built_pages:
+            return
+        self.command_preview.setText(self.build_config().preview())
     def create_exe(self):
         if not self.file_path.text():
             QMessageBox.warning(self, "Предупреждение", "Выберите Python файл для конвертации")
-            self.stacked_widget.setCurrentIndex(0)
-            self.update_navigation_buttons()
+            self.show_page(0)
+            return
+        if self.install_thread is not None:
+            self.statusBar.showMessage("Дождитесь окончания установки PyInstaller")
+            return
+        if self.environment_thread is not None:
+            self.statusBar.showMessage("Дождитесь окончания подготовки окружения")
+            return
+        if self.launcher_thread is not None:
+            self.statusBar.showMessage("Дождитесь окончания сборки загрузчика")
+            return
+        if self.isolated_env.isChecked() and not self.prepare_environment():
             return
+        if self.use_service.isChecked():
+            self.start_service_build()
+            return
+        from fitopybox.toolchain import path_pyinstaller, toolchain_entry
+        self.ensure_page(1)
+        python = self.isolated_python() or self.toolchain.currentData()
         try:
-            subprocess.run(["pyinstaller", "--version"], check=True, capture_output=True)
-        except FileNotFoundError:
+            found = toolchain_entry(python)["pyinstaller"] if python else path_pyinstaller()
+        except RuntimeError as e:
+            QMessageBox.critical(self, "Ошибка PyInstaller", str(e))
+            self.statusBar.showMessage("Ошибка PyInstaller")
+            return
+        if not found:
             reply = QMessageBox.question(self, "PyInstaller не найден",
-                                       "PyInstaller не найден в вашей системе. Хотите установить его?",
+                                       "PyInstaller не найден в выбранном окружении. Хотите установить его?",
                                        QMessageBox.StandardButton.Yes |
                                        QMessageBox.StandardButton.No)
             if reply == QMessageBox.StandardButton.Yes:
@@ -551,81 +764,342 @@ class FitoPyBox(QMainWindow):
             else:
                 self.statusBar.showMessage("Сборка отменена: PyInstaller не найден")
             return
-        except subprocess.CalledProcessError as e:
-             QMessageBox.critical(self, "Ошибка PyInstaller", f"Ошибка при проверке PyInstaller: {e}")
-             self.statusBar.showMessage("Ошибка PyInstaller")
-             return
-        command = [c for c in self.command_preview.toPlainText().split(" ") if c]
-        if self.exe_name.text():
-             try:
-                 file_index = command.index(self.file_path.text())
-                 command.insert(file_index, self.exe_name.text())
-                 command.insert(file_index, "--name")
-             except ValueError:
-                 command.extend(["--name", self.exe_name.text()])
-        try:
-            self.statusBar.showMessage("Создание .exe файла...")
-            process = subprocess.Popen(command, cwd=os.path.dirname(self.file_path.text()))
-            process.wait()
-            if process.returncode == 0:
-                self.add_to_history()
-                self.statusBar.showMessage("Файл успешно создан!")
-                QMessageBox.information(self, "Успех", "Файл .exe успешно создан!")
-                self.show_result_buttons(True) 
-            else:
-                 self.statusBar.showMessage("Ошибка при создании .exe")
-                 QMessageBox.critical(self, "Ошибка", f"Ошибка при создании .exe. Код завершения: {process.returncode}")
-                 self.show_result_buttons(False) 
-        except Exception as e:
+        from dialogs import BuildThread
+        config = self.build_config()
+        self.command_preview.setText(config.preview())
+        if config.cached_onefile and not self.prepare_launcher(config):
+            return
+        self.build_log.clear()
+        self.build_config_in_progress = config
+        self.build_thread = BuildThread(None, config.script_dir, self, config=config,
+                                        force=self.force_rebuild.isChecked())
+        self.build_thread.output_received.connect(self.build_log.appendPlainText)
+        self.build_thread.build_finished.connect(self.on_build_finished)
+        self.set_build_running(True)
+        self.statusBar.showMessage("Создание .exe файла...")
+        self.build_thread.start()
+    def start_service_build(self):
+        """Сборка через запущенную службу; проверка изменений и история - на стороне службы"""
+        from dialogs import ServiceBuildThread
+        from fitopybox.service import read_service_info
+        info = read_service_info()
+        if info is None:
+            QMessageBox.warning(self, "Служба сборки",
+                                "Служба сборки не запущена. Запустите её командой:\npython -m fitopybox serve")
+            self.statusBar.showMessage("Служба сборки не запущена")
+            return
+        config = self.build_config(info["python"])
+        self.command_preview.setText(config.preview())
+        self.build_log.clear()
+        self.build_config_in_progress = config
+        self.build_thread = ServiceBuildThread(config, self.force_rebuild.isChecked(), self)
+        self.build_thread.output_received.connect(self.build_log.appendPlainText)
+        self.build_thread.build_finished.connect(self.on_build_finished)
+        self.set_build_running(True)
+        self.statusBar.showMessage("Создание .exe файла через службу сборки...")
+        self.build_thread.start()
+    def set_watch_enabled(self, enabled):
+        """Включение режима наблюдения: изменения файлов собираются в серию и запускают пересборку"""
+        if not enabled:
+            if self.file_watcher is not None:
+                self.file_watcher.deleteLater()
+            self.file_watcher = None
+            self.source_watcher = None
+            self.rebuild_pending = False
+            self.statusBar.showMessage("Наблюдение за изменениями выключено")
+            return
+        if not self.file_path.text():
+            QMessageBox.warning(self, "Предупреждение", "Выберите Python файл для конвертации")
+            self.watch_sources.setChecked(False)
+            return
+        from fitopybox.watch import WATCH_DEBOUNCE, SourceWatcher
+        self.source_watcher = SourceWatcher(self.build_config())
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setSingleShot(True)
+        self.watch_timer.setInterval(int(WATCH_DEBOUNCE * 1000))
+        self.watch_timer.timeout.connect(self.on_sources_changed)
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.watch_timer.start)
+        self.file_watcher.directoryChanged.connect(self.watch_timer.start)
+        self.update_watched_paths()
+        self.statusBar.showMessage(f"Наблюдение за изменениями: файлов {len(self.source_watcher.states)}")
+    def update_watched_paths(self):
+        """Пути для QFileSystemWatcher; файлы, заменённые при сохранении, добавляются заново"""
+        watched = set(self.file_watcher.files() + self.file_watcher.directories())
+        paths = set(self.source_watcher.states) | set(self.source_watcher.directories())
+        if watched - paths:
+            self.file_watcher.removePaths(sorted(watched - paths))
+        missing = sorted(path for path in paths - watched if os.path.exists(path))
+        if missing:
+            self.file_watcher.addPaths(missing)
+    def on_sources_changed(self):
+        """Серия изменений закончилась: проверка по mtime и размеру, затем пересборка"""
+        if self.source_watcher is None:
+            return
+        self.source_watcher.config = self.build_config()
+        changed = self.source_watcher.check()
+        self.update_watched_paths()
+        if not changed:
+            return
+        self.changed_sources = changed
+        if self.build_thread is not None:
+            self.rebuild_pending = True
+            self.cancel_build()
+            return
+        self.start_watch_build()
+    def start_watch_build(self):
+        self.watch_build = True
+        self.create_exe()
+        if self.build_thread is None:
+            self.watch_build = False
+            return
+        names = ", ".join(os.path.basename(path) for path in self.changed_sources)
+        self.build_log.appendPlainText(f"Пересборка после изменения: {names}")
+        self.statusBar.showMessage(f"Пересборка после изменения файлов: {len(self.changed_sources)}...")
+    def show_watch_result(self, status, metrics):
+        """Итог автоматической пересборки в строке состояния, без диалогов"""
+        from fitopybox.metrics import display_value
+        finished = time.strftime("%H:%M:%S")
+        if status == "success":
+            self.statusBar.showMessage(f"Автосборка {finished}: успешно за {metrics['wall_time']:.1f} с, "
+                                       f"размер {display_value('artifact_size', metrics['artifact_size'])} МБ")
+        elif status == "skipped":
+            self.statusBar.showMessage(f"Автосборка {finished}: изменений нет")
+        elif status == "cancelled":
+            self.statusBar.showMessage(f"Автосборка {finished}: отменена")
+        else:
+            self.statusBar.showMessage(f"Автосборка {finished}: ошибка, код завершения {metrics.get('exit_status', '-')}")
+        self.show_result_buttons(status in ("success", "skipped"))
+    def set_build_running(self, running):
+        """Переключает кнопки страницы сборки на время работы PyInstaller"""
+        self.back_button4.setEnabled(not running)
+        self.create_button.setVisible(not running)
+        self.cancel_build_button.setVisible(running)
+    def cancel_build(self):
+        for thread in (self.build_thread, self.launcher_thread):
+            if thread is not None and thread.isRunning():
+                thread.cancel()
+                self.statusBar.showMessage("Отмена сборки...")
+    def on_build_finished(self, returncode):
+        from fitopybox.metrics import display_value
+        thread = self.build_thread
+        thread.wait()
+        thread.deleteLater()
+        self.build_thread = None
+        self.set_build_running(False)
+        status, metrics = thread.result["status"], thread.result.get("metrics", {})
+        for line in thread.result.get("report", []):
+            self.build_log.appendPlainText(line)
+        watch_build = self.watch_build
+        self.watch_build = False
+        if self.rebuild_pending:
+            self.rebuild_pending = False
+            self.start_watch_build()
+            return
+        if watch_build:
+            self.show_watch_result(status, metrics)
+            return
+        if status == "cancelled":
+            self.statusBar.showMessage("Сборка отменена")
+            self.show_result_buttons(False)
+        elif status == "skipped":
+            self.statusBar.showMessage(f"Сборка пропущена: изменений нет ({self.build_config_in_progress.artifact_path})")
+            self.show_result_buttons(True)
+        elif status == "success":
+            self.statusBar.showMessage(f"Файл успешно создан за {metrics['wall_time']:.1f} с, "
+                                       f"размер {display_value('artifact_size', metrics['artifact_size'])} МБ")
+            QMessageBox.information(self, "Успех", "Файл .exe успешно создан!")
+            self.show_result_buttons(True)
+        else:
             self.statusBar.showMessage("Ошибка при создании .exe")
-            QMessageBox.critical(self, "Ошибка", f"Произошла ошибка: {e}")
-            self.show_result_buttons(False) 
-    def install_pyinstaller(self):
+            QMessageBox.critical(self, "Ошибка", "Ошибка при создании .exe. Код завершения: "
+                                 f"{metrics.get('exit_status', returncode)}")
+            self.show_result_buttons(False)
+    def closeEvent(self, event):
+        for thread in (self.build_thread, self.install_thread, self.launcher_thread):
+            if thread is not None and thread.isRunning():
+                thread.cancel()
+                thread.wait()
+        for thread in (self.toolchain_thread, self.icon_thread, self.environment_thread):
+            if thread is not None:
+                thread.wait()
+        super().closeEvent(event)
+    def discover_toolchains(self, refresh=False):
+        """Фоновый поиск интерпретаторов с PyInstaller; результаты берутся из кэша, пока окружения не менялись"""
+        if self.toolchain_thread is not None:
+            return
+        from dialogs import TaskThread
+        from fitopybox.toolchain import discover_toolchains
+        project_dir = os.path.dirname(os.path.abspath(self.file_path.text())) if self.file_path.text() else ""
+        self.toolchain_thread = TaskThread(discover_toolchains, project_dir, refresh, parent=self)
+        self.toolchain_thread.result_ready.connect(self.on_toolchains_found)
+        self.toolchain_thread.error_occurred.connect(
+            lambda message: self.statusBar.showMessage(f"Ошибка поиска интерпретаторов: {message}"))
+        self.toolchain_thread.finished.connect(self.on_toolchain_thread_finished)
+        self.toolchain_thread.start()
+    def on_toolchain_thread_finished(self):
+        self.toolchain_thread.deleteLater()
+        self.toolchain_thread = None
+    def on_toolchains_found(self, toolchains):
+        from fitopybox.toolchain import toolchain_label
+        selected = self.toolchain.currentData()
+        self.toolchain.blockSignals(True)
+        self.toolchain.clear()
+        self.toolchain.addItem("pyinstaller из PATH", "")
+        for toolchain in toolchains:
+            self.toolchain.addItem(toolchain_label(toolchain), toolchain["executable"])
+        index = self.toolchain.findData(selected)
+        self.toolchain.setCurrentIndex(max(index, 0))
+        self.toolchain.blockSignals(False)
+        with_pyinstaller = sum(1 for toolchain in toolchains if toolchain["pyinstaller"])
+        self.statusBar.showMessage(f"Найдено интерпретаторов: {len(toolchains)}, с PyInstaller: {with_pyinstaller}")
+        self.update_command_preview()
+    def prepare_environment(self):
+        """Изолированное окружение для сборки: True, если оно уже в кэше; иначе создание в фоне
+        с выводом pip в журнал и повторный запуск сборки после готовности"""
+        from fitopybox.buildenv import base_python, cached_environment
+        from fitopybox.deps import find_requirements_file
+        requirements = find_requirements_file(os.path.abspath(self.file_path.text()))
         try:
-            self.statusBar.showMessage("Установка PyInstaller...")
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller==6.3.0"])
+            python = base_python(self.toolchain.currentData() or "")
+            self.environment_python = cached_environment(python, requirements)
+        except (OSError, RuntimeError) as e:
+            QMessageBox.critical(self, "Изолированное окружение", str(e))
+            return False
+        if self.environment_python:
+            return True
+        from dialogs import EnvironmentThread
+        self.show_page(3)
+        self.build_log.clear()
+        self.environment_thread = EnvironmentThread(python, requirements, self)
+        self.environment_thread.output_received.connect(self.build_log.appendPlainText)
+        self.environment_thread.result_ready.connect(self.on_environment_ready)
+        self.environment_thread.error_occurred.connect(self.on_environment_error)
+        self.environment_thread.finished.connect(self.on_environment_thread_finished)
+        self.set_build_running(True)
+        self.cancel_build_button.setEnabled(False)
+        self.statusBar.showMessage("Подготовка изолированного окружения...")
+        self.environment_thread.start()
+        return False
+    def on_environment_thread_finished(self):
+        self.environment_thread.deleteLater()
+        self.environment_thread = None
+        self.set_build_running(False)
+        self.cancel_build_button.setEnabled(True)
+        if self.environment_python:
+            self.create_exe()
+    def on_environment_ready(self, python):
+        self.environment_python = python
+    def on_environment_error(self, message):
+        self.statusBar.showMessage("Ошибка подготовки окружения")
+        QMessageBox.critical(self, "Изолированное окружение", f"Не удалось создать окружение: {message}")
+    def prepare_launcher(self, config):
+        """Загрузчик режима с кэшем распаковки: True, если он уже в кэше; иначе сборка в фоне
+        с выводом PyInstaller в журнал и повторный запуск сборки после готовности"""
+        from fitopybox.extractcache import cached_launcher, launcher_build
+        if cached_launcher(config):
+            return True
+        from dialogs import BuildThread
+        command, staging = launcher_build(config)
+        self.build_log.clear()
+        self.launcher_thread = BuildThread(command, staging, self)
+        self.launcher_thread.output_received.connect(self.build_log.appendPlainText)
+        self.launcher_thread.build_finished.connect(
+            lambda returncode: self.on_launcher_finished(config, staging, returncode))
+        self.set_build_running(True)
+        self.statusBar.showMessage("Сборка загрузчика (один раз для интерпретатора и иконки)...")
+        self.launcher_thread.start()
+        return False
+    def on_launcher_finished(self, config, staging, returncode):
+        import shutil
+        from fitopybox.extractcache import install_launcher
+        thread = self.launcher_thread
+        thread.wait()
+        thread.deleteLater()
+        self.launcher_thread = None
+        self.set_build_running(False)
+        if thread.cancelled or returncode != 0:
+            shutil.rmtree(staging, ignore_errors=True)
+            self.statusBar.showMessage("Сборка отменена" if thread.cancelled else "Ошибка сборки загрузчика")
+            return
+        try:
+            install_launcher(config, staging)
+        except (OSError, RuntimeError) as e:
+            self.statusBar.showMessage("Ошибка сборки загрузчика")
+            QMessageBox.critical(self, "Ошибка", f"Не удалось собрать загрузчик: {e}")
+            return
+        self.create_exe()
+    def install_pyinstaller(self):
+        """Установка PyInstaller в выбранный интерпретатор в фоне, с выводом pip в журнал сборки"""
+        from dialogs import BuildThread
+        from fitopybox.toolchain import install_command, pyinstaller_requirement
+        python = self.toolchain.currentData() or ("" if getattr(sys, "frozen", False) else sys.executable)
+        if not python:
+            QMessageBox.warning(self, "Установка PyInstaller",
+                                "Выберите интерпретатор Python, в который нужно установить PyInstaller")
+            return
+        self.show_page(3)
+        self.build_log.clear()
+        self.install_thread = BuildThread(install_command(python), None, self)
+        self.install_thread.output_received.connect(self.build_log.appendPlainText)
+        self.install_thread.build_finished.connect(self.on_install_finished)
+        self.set_build_running(True)
+        self.cancel_build_button.setEnabled(False)
+        self.statusBar.showMessage(f"Установка {pyinstaller_requirement()} в {python}...")
+        self.install_thread.start()
+    def on_install_finished(self, returncode):
+        from fitopybox.toolchain import ToolchainRegistry
+        thread = self.install_thread
+        thread.wait()
+        thread.deleteLater()
+        self.install_thread = None
+        self.set_build_running(False)
+        self.cancel_build_button.setEnabled(True)
+        registry = ToolchainRegistry()
+        registry.invalidate(thread.command[0])
+        registry.save()
+        self.discover_toolchains()
+        if returncode == 0:
             self.statusBar.showMessage("PyInstaller успешно установлен.")
             QMessageBox.information(self, "Установка завершена", "PyInstaller успешно установлен.")
-        except subprocess.CalledProcessError as e:
+        else:
             self.statusBar.showMessage("Ошибка при установке PyInstaller")
-            QMessageBox.critical(self, "Ошибка установки", f"Не удалось установить PyInstaller: {e}")
-    def add_to_history(self):
-        history_entry = {
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "command": self.command_preview.toPlainText(),
-            "file": self.file_path.text()
-        }
-        history = self.load_history()
-        history.append(history_entry)
-        try:
-            with open("build_history.json", "w") as f:
-                json.dump(history, f, indent=4)
-        except Exception as e:
-             print(f"Ошибка сохранения истории: {e}")
-    def load_history(self):
-        try:
-            with open("build_history.json", "r") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+            QMessageBox.critical(self, "Ошибка установки",
+                                 f"Не удалось установить PyInstaller. Код завершения: {returncode}")
+    def add_to_history(self, command, file_path, **fields):
+        from fitopybox.history import add_history_entry
+        add_history_entry(command, file_path, **fields)
     def auto_find_dependencies(self):
         if not self.file_path.text():
             QMessageBox.warning(self, "Предупреждение", "Сначала выберите Python файл")
             return
-        try:
-            imports = extract_imports(self.file_path.text())
-            if imports:
-                self.hidden_imports.setText(", ".join(imports))
-                self.update_command_preview()
-                self.statusBar.showMessage(f"Найдено зависимостей: {len(imports)}")
-                QMessageBox.information(self, "Успех", 
-                    f"Найдены следующие зависимости:\n{', '.join(imports)}")
-            else:
-                self.statusBar.showMessage("Зависимости не найдены")
-                QMessageBox.information(self, "Информация", "Зависимости не найдены")
-        except Exception as e:
-            self.statusBar.showMessage("Ошибка при поиске зависимостей")
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при поиске зависимостей: {e}")
+        if self.deps_thread is not None:
+            return
+        self.statusBar.showMessage("Поиск зависимостей...")
+        from dialogs import TaskThread
+        from fitopybox.deps import extract_imports
+        self.deps_thread = TaskThread(extract_imports, self.file_path.text(), parent=self)
+        self.deps_thread.result_ready.connect(self.on_dependencies_found)
+        self.deps_thread.error_occurred.connect(self.on_dependencies_error)
+        self.deps_thread.finished.connect(self.on_dependencies_thread_finished)
+        self.deps_thread.start()
+    def on_dependencies_thread_finished(self):
+        self.deps_thread.deleteLater()
+        self.deps_thread = None
+    def on_dependencies_found(self, imports):
+        if imports:
+            self.ensure_page(2)
+            self.hidden_imports.setText(", ".join(imports))
+            self.update_command_preview()
+            self.statusBar.showMessage(f"Найдено зависимостей: {len(imports)}")
+            QMessageBox.information(self, "Успех", 
+                f"Найдены следующие зависимости:\n{', '.join(imports)}")
+        else:
+            self.statusBar.showMessage("Зависимости не найдены")
+            QMessageBox.information(self, "Информация", "Зависимости не найдены")
+    def on_dependencies_error(self, message):
+        self.statusBar.showMessage("Ошибка при поиске зависимостей")
+        QMessageBox.critical(self, "Ошибка", f"Ошибка при поиске зависимостей: {message}")
     def open_output_folder(self):
         if not self.file_path.text() or not self.exe_name.text():
             QMessageBox.warning(self, "Предупреждение", "Невозможно определить путь к файлу.")
@@ -642,13 +1116,14 @@ class FitoPyBox(QMainWindow):
             QMessageBox.warning(self, "Предупреждение", "Выходная папка не найдена.")
             self.statusBar.showMessage("Выходная папка не найдена")
     def run_created_exe(self):
-        if not self.file_path.text() or not self.exe_name.text():
+        if not self.file_path.text():
              QMessageBox.warning(self, "Предупреждение", "Невозможно определить путь к файлу.")
              return
-        exe_path = os.path.join(os.path.dirname(self.file_path.text()), "dist", self.exe_name.text() + ".exe")
-        if os.path.exists(exe_path):
+        from fitopybox.artifacts import find_executable
+        exe_path = find_executable(self.build_config())
+        if exe_path:
             try:
-                subprocess.Popen([exe_path])
+                subprocess.Popen([exe_path], cwd=os.path.dirname(exe_path))
                 self.statusBar.showMessage(f"Запущен файл: {exe_path}")
             except Exception as e:
                  QMessageBox.critical(self, "Ошибка", f"Не удалось запустить файл: {e}")
@@ -656,21 +1131,54 @@ class FitoPyBox(QMainWindow):
         else:
              QMessageBox.warning(self, "Предупреждение", "Исполняемый файл не найден.")
              self.statusBar.showMessage("Исполняемый файл не найден")
+    def show_startup_benchmark(self):
+        from dialogs import StartupBenchmarkDialog
+        from fitopybox.artifacts import find_executable
+        if not self.file_path.text() or find_executable(self.build_config()) is None:
+            QMessageBox.warning(self, "Предупреждение", "Исполняемый файл не найден. Сначала соберите скрипт.")
+            return
+        StartupBenchmarkDialog(self.build_config(), self).exec()
+    def add_exclusions(self, modules):
+        current = [module.strip() for module in self.exclude_modules.text().split(",") if module.strip()]
+        current.extend(module for module in modules if module not in current)
+        self.exclude_modules.setText(", ".join(current))
+        self.update_command_preview()
+        self.statusBar.showMessage("Исключения добавлены. Пересоберите файл, чтобы применить их.")
+    def show_bundle_analysis(self):
+        from dialogs import BundleAnalysisDialog
+        dialog = BundleAnalysisDialog(self.build_config(), self)
+        if dialog.exec() == QDialog.DialogCode.Accepted and dialog.selected_modules:
+            self.add_exclusions(dialog.selected_modules)
+    def show_trim(self):
+        from dialogs import TrimDialog
+        dialog = TrimDialog(self.build_config(), self)
+        if dialog.exec() == QDialog.DialogCode.Accepted and dialog.selected_modules:
+            self.add_exclusions(dialog.selected_modules)
     def start_new_build(self):
+        self.watch_sources.setChecked(False)
         self.file_path.clear()
         self.exe_name.clear()
         self.icon_path.clear()
         self.hidden_imports.clear()
+        self.exclude_modules.clear()
         self.additional_files.clear()
         self.command_preview.clear()
-        self.stacked_widget.setCurrentIndex(0)
-        self.update_navigation_buttons()
+        self.build_log.clear()
+        self.show_page(0)
         self.statusBar.showMessage("Готов к работе")
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+    trace = StartupTrace(STARTUP_STARTED, "--startup-trace" in sys.argv or
+                         os.environ.get("FITOPYBOX_STARTUP_TRACE") == "1")
+    trace.mark("Импорт модулей")
+    app = QApplication([arg for arg in sys.argv if arg != "--startup-trace"])
+    trace.mark("QApplication")
     if os.path.exists("FitoPyBox.ico"):
         app_icon = QIcon("FitoPyBox.ico")
         app.setWindowIcon(app_icon)
-    window = FitoPyBox()
+    window = FitoPyBox(trace)
     window.show()
+    trace.mark("Показ окна")
     sys.exit(app.exec()) 
\ No newline at end of file
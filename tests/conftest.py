@@ -0,0 +1,11 @@
+"""Общие фикстуры тестов: каталог кэшей FitoPyBox во временной папке"""
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+@pytest.fixture(autouse=True)
+def cache_root(tmp_path, monkeypatch):
+    """Кэши каждого теста (хранилище сборок, кэш разбора) - в его временной папке"""
+    root = tmp_path / "cache"
+    monkeypatch.setenv("FITOPYBOX_CACHE_DIR", str(root))
+    return root
@@ -0,0 +1,156 @@
+"""Хранилище сборок: сохранение, восстановление, запуск и удаление с учётом общих объектов"""
+import os
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fitopybox import artifactstore
+from fitopybox.artifactstore import (ACTIVE_WINDOW, collect_garbage, evict_artifacts, load_manifest, manifest_path,
+                                     object_path, restore_artifact, run_artifact, store_build, store_size)
+from fitopybox.config import BuildConfig
+SHARED_LIBRARY = b"shared library " * 64
+APP_SOURCE = "#!/bin/sh\necho {name}\n"
+def make_build(root, name, library=SHARED_LIBRARY):
+    """Папка onedir с исполняемым файлом и библиотекой, как после сборки PyInstaller"""
+    config = BuildConfig(script=os.path.join(str(root), f"{name}.py"), one_file=False,
+                         distpath=os.path.join(str(root), "dist"))
+    bundle = os.path.dirname(config.artifact_path)
+    os.makedirs(os.path.join(bundle, "_internal"), exist_ok=True)
+    with open(config.artifact_path, "w", encoding="utf-8") as f:
+        f.write(APP_SOURCE.format(name=name))
+    os.chmod(config.artifact_path, 0o755)
+    with open(os.path.join(bundle, "_internal", "libshared.so"), "wb") as f:
+        f.write(library)
+    with open(os.path.join(bundle, "_internal", f"{name}.dat"), "wb") as f:
+        f.write(name.encode("utf-8") * 100)
+    return config
+def object_keys(build_id):
+    return {entry["key"] for entry in load_manifest(build_id)["files"].values() if "key" in entry}
+def age(paths, seconds=2 * ACTIVE_WINDOW):
+    """Время последнего использования в прошлом: сборки и объекты выходят из окна активности"""
+    past = time.time() - seconds
+    for path in paths:
+        os.utime(path, (past, past))
+def age_build(build_id):
+    age([manifest_path(build_id)] + [object_path(key) for key in object_keys(build_id)])
+def read_tree(root):
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+def test_store_and_restore_round_trip(tmp_path):
+    config = make_build(tmp_path / "project", "app")
+    bundle = os.path.dirname(config.artifact_path)
+    original = read_tree(bundle)
+    build_id, added = store_build(config, config.script)
+    assert added == store_size() > 0
+    assert load_manifest(build_id)["kind"] == "dir"
+    restored = restore_artifact(build_id, str(tmp_path / "restored"))
+    assert read_tree(restored) == original
+    executable = os.path.join(restored, "app")
+    assert os.stat(executable).st_mode & stat.S_IXUSR
+    # Восстановленные файлы - независимые копии: запись в них не меняет объекты хранилища
+    assert os.stat(executable).st_nlink == 1
+    with open(executable, "a", encoding="utf-8") as f:
+        f.write("# изменено\n")
+    assert read_tree(restore_artifact(build_id, str(tmp_path / "again"))) == original
+def test_restore_to_original_folder_replaces_current_output(tmp_path):
+    config = make_build(tmp_path / "project", "app")
+    build_id, _ = store_build(config, config.script)
+    bundle = os.path.dirname(config.artifact_path)
+    original = read_tree(bundle)
+    with open(os.path.join(bundle, "_internal", "extra.txt"), "w", encoding="utf-8") as f:
+        f.write("после сборки")
+    assert restore_artifact(build_id) == bundle
+    assert read_tree(bundle) == original
+def test_same_build_is_stored_once(tmp_path):
+    config = make_build(tmp_path / "project", "app")
+    first_id, first_added = store_build(config)
+    second_id, second_added = store_build(config)
+    assert first_id == second_id
+    assert first_added > 0 and second_added == 0
+@pytest.mark.skipif(os.name == "nt", reason="исполняемый файл сборки - сценарий sh")
+def test_run_artifact_uses_checkout(tmp_path, capfd):
+    config = make_build(tmp_path / "project", "app")
+    build_id, _ = store_build(config)
+    assert run_artifact(build_id) == 0
+    assert capfd.readouterr().out.strip() == "app"
+def test_shared_object_stored_once(tmp_path):
+    first = make_build(tmp_path / "one", "first")
+    second = make_build(tmp_path / "two", "second")
+    first_id, first_added = store_build(first)
+    second_id, second_added = store_build(second)
+    shared = object_keys(first_id) & object_keys(second_id)
+    assert len(shared) == 1
+    assert second_added == sum(os.path.getsize(object_path(key)) for key in object_keys(second_id) - shared)
+    assert store_size() == first_added + second_added
+def test_evict_keeps_objects_of_remaining_builds(tmp_path):
+    first = make_build(tmp_path / "one", "first")
+    second = make_build(tmp_path / "two", "second")
+    first_id, _ = store_build(first)
+    second_id, _ = store_build(second)
+    shared = object_keys(first_id) & object_keys(second_id)
+    only_first = object_keys(first_id) - shared
+    age_build(first_id)
+    age_build(second_id)
+    assert evict_artifacts(limit=0, keep=[second_id]) == [first_id]
+    assert not os.path.exists(manifest_path(first_id))
+    assert all(os.path.exists(object_path(key)) for key in object_keys(second_id))
+    assert not any(os.path.exists(object_path(key)) for key in only_first)
+    assert store_size() == load_manifest(second_id)["size"]
+    restored = restore_artifact(second_id, str(tmp_path / "restored"))
+    assert read_tree(restored) == read_tree(os.path.dirname(second.artifact_path))
+def test_evict_skips_recently_used_builds(tmp_path):
+    config = make_build(tmp_path / "project", "app")
+    build_id, _ = store_build(config)
+    assert evict_artifacts(limit=0) == []
+    assert os.path.exists(manifest_path(build_id))
+def test_evict_keeps_object_reused_by_unfinished_store(tmp_path, monkeypatch):
+    """Объект, который сохраняемая сейчас сборка только что использовала повторно, не удаляется вместе
+    с последней старой сборкой, даже если описание новой сборки ещё не записано"""
+    old = make_build(tmp_path / "old", "old")
+    old_id, _ = store_build(old)
+    age_build(old_id)
+    new = make_build(tmp_path / "new", "new")
+    evicted = []
+    def evict_before_manifest(path):
+        # Вытеснение из другого процесса сразу после повторного использования объекта старой сборки,
+        # до записи описания новой
+        key, added = original_add_file(path)
+        if added == 0 and not evicted:
+            evicted.extend(evict_artifacts(limit=0))
+        return key, added
+    original_add_file = artifactstore.add_file
+    monkeypatch.setattr(artifactstore, "add_file", evict_before_manifest)
+    new_id, _ = store_build(new)
+    assert evicted == [old_id]
+    assert all(os.path.exists(object_path(key)) for key in object_keys(new_id))
+    restored = restore_artifact(new_id, str(tmp_path / "restored"))
+    assert read_tree(restored) == read_tree(os.path.dirname(new.artifact_path))
+def test_collect_garbage_removes_stale_unreferenced_objects(tmp_path):
+    first = make_build(tmp_path / "one", "first")
+    first_id, _ = store_build(first)
+    keys = object_keys(first_id)
+    os.remove(manifest_path(first_id))
+    assert collect_garbage() == 0
+    age(object_path(key) for key in keys)
+    assert collect_garbage() > 0
+    assert not any(os.path.exists(object_path(key)) for key in keys)
+    assert store_size() == 0
+def test_parallel_stores_keep_every_size_increment(tmp_path, monkeypatch):
+    configs = [make_build(tmp_path / f"project{number}", f"app{number}") for number in range(8)]
+    original_read_state = artifactstore.read_state
+    def slow_read_state():
+        # Окно между чтением и записью счётчика, в котором без блокировки теряются увеличения других сборок
+        state = original_read_state()
+        time.sleep(0.02)
+        return state
+    monkeypatch.setattr(artifactstore, "read_state", slow_read_state)
+    with ThreadPoolExecutor(max_workers=len(configs)) as executor:
+        results = list(executor.map(store_build, configs))
+    objects = {key for build_id, _ in results for key in object_keys(build_id)}
+    assert store_size() == sum(added for _, added in results) == sum(
+        os.path.getsize(object_path(key)) for key in objects)
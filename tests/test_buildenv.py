@@ -0,0 +1,46 @@
+"""Кэш изолированных окружений: ключ по выбранным pip версиям пакетов и запомненные запросы"""
+import os
+import sys
+from fitopybox import buildenv
+from fitopybox.buildenv import (ENV_CACHE_DIR, ENV_CACHE_VERSION, cached_environment, create_environment,
+                                environment_key, request_key, write_info)
+from fitopybox.paths import cache_dir
+from fitopybox.toolchain import PYINSTALLER_REQUIREMENT, pyinstaller_requirement, venv_interpreter
+WHEELS = ["/store/pyinstaller-6.3.0-py3-none-any.whl", "/store/altgraph-0.17.4-py2.py3-none-any.whl"]
+def make_environment(key, requests):
+    """Готовое окружение в кэше: интерпретатор и описание с запомненными запросами"""
+    env_dir = os.path.join(cache_dir(ENV_CACHE_DIR), key)
+    interpreter = venv_interpreter(env_dir)
+    os.makedirs(os.path.dirname(interpreter))
+    open(interpreter, "w").close()
+    write_info(env_dir, {"version": ENV_CACHE_VERSION, "python": sys.executable, "requests": requests,
+                         "created": 0, "last_used": 0})
+    return interpreter
+def test_pyinstaller_requirement_is_not_pinned(monkeypatch):
+    monkeypatch.delenv("FITOPYBOX_PYINSTALLER", raising=False)
+    assert pyinstaller_requirement() == PYINSTALLER_REQUIREMENT
+    assert "==" not in PYINSTALLER_REQUIREMENT
+    monkeypatch.setenv("FITOPYBOX_PYINSTALLER", "pyinstaller==6.10.0")
+    assert pyinstaller_requirement() == "pyinstaller==6.10.0"
+def test_environment_key_follows_resolved_versions():
+    newer = [WHEELS[0].replace("6.3.0", "6.10.0"), WHEELS[1]]
+    assert environment_key(sys.executable, WHEELS) == environment_key(sys.executable, list(reversed(WHEELS)))
+    assert environment_key(sys.executable, WHEELS) != environment_key(sys.executable, newer)
+def test_cached_environment_matches_remembered_request(monkeypatch):
+    monkeypatch.delenv("FITOPYBOX_PYINSTALLER", raising=False)
+    interpreter = make_environment(environment_key(sys.executable, WHEELS), [request_key(sys.executable, None)])
+    assert cached_environment(sys.executable, None) == interpreter
+    monkeypatch.setenv("FITOPYBOX_PYINSTALLER", "pyinstaller==6.10.0")
+    assert cached_environment(sys.executable, None) is None
+def test_same_resolution_reuses_environment(monkeypatch):
+    interpreter = make_environment(environment_key(sys.executable, WHEELS), [])
+    monkeypatch.setattr(buildenv, "resolve_wheels", lambda python, requirements_file, on_line: WHEELS)
+    def run_tool(command, cwd, on_line):
+        raise AssertionError("окружение создаётся заново")
+    monkeypatch.setattr(buildenv, "run_tool", run_tool)
+    lines = []
+    assert create_environment(sys.executable, None, lines.append) == interpreter
+    assert lines == [f"Окружение {environment_key(sys.executable, WHEELS)} с PyInstaller 6.3.0 уже создано"]
+    # Запрос запомнен: следующий раз обходится без pip
+    monkeypatch.setattr(buildenv, "resolve_wheels", None)
+    assert create_environment(sys.executable, None, lines.append) == interpreter
@@ -0,0 +1,113 @@
+"""Обход импортов проекта и кэш разбора файлов (ScanCache)"""
+import os
+from fitopybox import deps
+from fitopybox.deps import PARALLEL_SCAN_THRESHOLD, ScanCache, parse_requirements_file, scan_project
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return os.path.normpath(str(path))
+def make_project(root):
+    """Скрипт с локальным пакетом и внешними импортами"""
+    script = write(os.path.join(str(root), "main.py"), "import requests\nfrom pkg import helper\n")
+    write(os.path.join(str(root), "pkg", "__init__.py"), "")
+    helper = write(os.path.join(str(root), "pkg", "helper.py"), "import yaml\nfrom . import tools\n")
+    write(os.path.join(str(root), "pkg", "tools.py"), "import numpy as np\n")
+    return script, helper
+def set_mtime(path, shift):
+    """Сдвиг времени изменения файла, чтобы изменение было заметно и на грубых часах файловой системы"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + shift))
+def count_parsed(monkeypatch):
+    """Список файлов, которые scan_project разобрал заново (не взял из кэша)"""
+    parsed = []
+    original = deps.parse_files
+    def parse_files(paths, workers=None):
+        parsed.extend(paths)
+        return original(paths, workers)
+    monkeypatch.setattr(deps, "parse_files", parse_files)
+    return parsed
+def test_scan_project_follows_local_imports(tmp_path):
+    script, _ = make_project(tmp_path)
+    result = scan_project(script)
+    assert result.external == {"requests", "yaml", "numpy"}
+    assert [os.path.relpath(path, str(tmp_path)) for path in result.local_modules] == [
+        os.path.join("pkg", "__init__.py"), os.path.join("pkg", "helper.py"), os.path.join("pkg", "tools.py")]
+def test_unchanged_files_come_from_cache(tmp_path, monkeypatch):
+    script, _ = make_project(tmp_path)
+    first = scan_project(script)
+    parsed = count_parsed(monkeypatch)
+    second = scan_project(script)
+    assert parsed == []
+    assert second.external == first.external
+    assert second.local_modules == first.local_modules
+def test_size_change_invalidates_entry(tmp_path, monkeypatch):
+    script, helper = make_project(tmp_path)
+    scan_project(script)
+    write(helper, "import yaml\nimport lxml\nfrom . import tools\n")
+    assert ScanCache(str(tmp_path)).lookup(helper) is None
+    parsed = count_parsed(monkeypatch)
+    assert "lxml" in scan_project(script).external
+    assert parsed == [helper]
+def test_same_size_new_content_invalidates_entry(tmp_path):
+    script, helper = make_project(tmp_path)
+    scan_project(script)
+    write(helper, "import toml\nfrom . import tools\n")
+    set_mtime(helper, 2 * 10 ** 9)
+    assert ScanCache(str(tmp_path)).lookup(helper) is None
+    result = scan_project(script)
+    assert "toml" in result.external and "yaml" not in result.external
+def test_touched_file_with_same_content_stays_cached(tmp_path, monkeypatch):
+    script, helper = make_project(tmp_path)
+    scan_project(script)
+    set_mtime(helper, 2 * 10 ** 9)
+    cache = ScanCache(str(tmp_path))
+    imports = cache.lookup(helper)
+    assert imports is not None and ["yaml", 0] in [list(item) for item in imports]
+    # Совпадение по хэшу обновляет mtime в кэше: следующая проверка обходится без чтения файла
+    assert cache.dirty
+    assert cache.entries[helper]["mtime"] == os.stat(helper).st_mtime_ns
+    cache.save()
+    parsed = count_parsed(monkeypatch)
+    scan_project(script)
+    assert parsed == []
+def test_deleted_file_is_not_served_from_cache(tmp_path):
+    script, helper = make_project(tmp_path)
+    scan_project(script)
+    os.remove(helper)
+    assert ScanCache(str(tmp_path)).lookup(helper) is None
+    result = scan_project(script)
+    assert "yaml" not in result.external
+    assert helper not in result.files
+def test_first_scan_parses_only_reachable_files(tmp_path, monkeypatch):
+    script, _ = make_project(tmp_path)
+    for number in range(PARALLEL_SCAN_THRESHOLD + 10):
+        write(os.path.join(str(tmp_path), "unused", f"module{number}.py"), "import json\n")
+    parsed = count_parsed(monkeypatch)
+    scan_project(script)
+    assert sorted(parsed) == sorted([script] + [os.path.join(str(tmp_path), "pkg", name)
+                                                for name in ("__init__.py", "helper.py", "tools.py")])
+def test_wide_wave_is_parsed_in_one_batch(tmp_path, monkeypatch):
+    count = PARALLEL_SCAN_THRESHOLD + 1
+    script = write(os.path.join(str(tmp_path), "main.py"),
+                   "".join(f"import module{number}\n" for number in range(count)))
+    for number in range(count):
+        write(os.path.join(str(tmp_path), f"module{number}.py"), "import json\n")
+    batches = []
+    original = deps.parse_files
+    def parse_files(paths, workers=None):
+        batches.append(len(paths))
+        return original(paths, 1)
+    monkeypatch.setattr(deps, "parse_files", parse_files)
+    result = scan_project(script)
+    assert batches == [1, count]
+    assert result.external == {"json"}
+def test_requirement_includes_in_every_form(tmp_path):
+    forms = {"short.txt": "-r short.txt", "joined.txt": "-rjoined.txt", "long.txt": "--requirement long.txt",
+             "equals.txt": "--requirement=equals.txt"}
+    for number, name in enumerate(forms):
+        write(os.path.join(str(tmp_path), name), f"package{number}>=1.0\n")
+    write(os.path.join(str(tmp_path), "constraints.txt"), "excluded==1.0\n")
+    requirements = write(os.path.join(str(tmp_path), "requirements.txt"), "\n".join(
+        list(forms.values()) + ["-c constraints.txt", "--constraint=constraints.txt", "-cconstraints.txt", "main"]))
+    assert parse_requirements_file(requirements) == ["package0", "package1", "package2", "package3", "main"]
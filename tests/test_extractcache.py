@@ -0,0 +1,83 @@
+"""Один файл с кэшем распаковки: стартер запускает готовую версию без загрузчика"""
+import os
+import subprocess
+import sys
+import pytest
+from fitopybox.config import BuildConfig
+from fitopybox.extractcache import (LAUNCHER_SOURCE, build_stub, find_compiler, pack_bundle, read_payload_info,
+                                    stub_path)
+pytestmark = pytest.mark.skipif(os.name == "nt" or find_compiler() is None,
+                                reason="нужен компилятор C; программа в тесте - сценарий sh")
+APP_SOURCE = '#!/bin/sh\necho "$FITOPYBOX_LAUNCHER $*"\nexit 3\n'
+def make_bundle(root):
+    """Папка onedir с исполняемым сценарием вместо сборки PyInstaller и загрузчик на Python вместо onefile"""
+    config = BuildConfig(script=os.path.join(str(root), "app.py"), extract_cache=True, workpath=str(root / "work"),
+                         distpath=str(root / "dist"))
+    os.makedirs(os.path.join(config.bundle_dir, "_internal"))
+    executable = os.path.join(config.bundle_dir, "app")
+    with open(executable, "w", encoding="utf-8") as f:
+        f.write(APP_SOURCE)
+    os.chmod(executable, 0o755)
+    with open(os.path.join(config.bundle_dir, "_internal", "data.bin"), "wb") as f:
+        f.write(b"data" * 1000)
+    launcher = str(root / "launcher")
+    with open(launcher, "w", encoding="utf-8") as f:
+        f.write(f"#!{sys.executable}\n{LAUNCHER_SOURCE}")
+    os.chmod(launcher, 0o755)
+    return config, launcher
+def run(config, cache):
+    completed = subprocess.run([config.artifact_path, "one", "two"], capture_output=True, text=True,
+                               env=dict(os.environ, FITOPYBOX_APP_CACHE=cache))
+    return completed.returncode, completed.stdout.strip()
+def saved_launchers(app_dir):
+    return [name for name in os.listdir(app_dir) if name.startswith(".launcher-")]
+def test_stub_runs_extracted_version_directly(tmp_path):
+    config, launcher = make_bundle(tmp_path)
+    stub = build_stub(config, on_line=lambda line: None)
+    assert stub == stub_path(config, find_compiler())
+    summary = pack_bundle(config, launcher, stub)
+    assert summary["stub"]
+    assert read_payload_info(config.artifact_path)["key"] == summary["key"]
+    cache = str(tmp_path / "apps")
+    app_dir = os.path.join(cache, "app")
+    # Первый запуск: стартер сохраняет загрузчик в кэш, загрузчик распаковывает версию
+    assert run(config, cache) == (3, f"{config.artifact_path} one two")
+    assert os.path.isdir(os.path.join(app_dir, summary["key"]))
+    [saved] = saved_launchers(app_dir)
+    os.remove(os.path.join(app_dir, saved))
+    # Версия готова: загрузчик не нужен и заново не сохраняется
+    assert run(config, cache) == (3, f"{config.artifact_path} one two")
+    assert saved_launchers(app_dir) == []
+    # Повреждённая версия распаковывается заново через загрузчик
+    data = os.path.join(app_dir, summary["key"], "_internal", "data.bin")
+    with open(data, "wb") as f:
+        f.write(b"broken")
+    assert run(config, cache) == (3, f"{config.artifact_path} one two")
+    assert saved_launchers(app_dir) == [saved]
+    assert os.path.getsize(data) == 4000
+def test_stub_leaves_cleanup_to_launcher(tmp_path):
+    config, launcher = make_bundle(tmp_path)
+    summary = pack_bundle(config, launcher, build_stub(config, on_line=lambda line: None))
+    cache = str(tmp_path / "apps")
+    app_dir = os.path.join(cache, "app")
+    run(config, cache)
+    [saved] = saved_launchers(app_dir)
+    os.remove(os.path.join(app_dir, saved))
+    # Давно не проверявшийся кэш: запуск идёт через загрузчик, который удаляет старые версии
+    old = os.path.join(app_dir, "0123456789abcdef")
+    os.makedirs(old)
+    with open(os.path.join(old, ".fitopybox_extracted"), "w") as f:
+        f.write("0123456789abcdef")
+    for path in (os.path.join(old, ".fitopybox_extracted"), os.path.join(app_dir, ".lock")):
+        os.utime(path, (0, 0))
+    assert run(config, cache) == (3, f"{config.artifact_path} one two")
+    assert saved_launchers(app_dir) == [saved]
+    assert not os.path.exists(old)
+    assert os.path.isdir(os.path.join(app_dir, summary["key"]))
+def test_file_without_stub_starts_with_launcher(tmp_path):
+    config, launcher = make_bundle(tmp_path)
+    summary = pack_bundle(config, launcher)
+    assert not summary["stub"]
+    with open(config.artifact_path, "rb") as f, open(launcher, "rb") as source:
+        assert f.read(os.path.getsize(launcher)) == source.read()
+    assert read_payload_info(config.artifact_path)["key"] == summary["key"]
@@ -0,0 +1,70 @@
+"""История сборок в SQLite: перенос build_history.json и чтение записей"""
+import json
+import os
+import shutil
+from fitopybox.history import LEGACY_HISTORY_FILE, HistoryStore, add_history_entry, load_history
+LEGACY_ENTRIES = [
+    {"timestamp": "2024-01-01 10:00:00", "command": "pyinstaller --onefile app.py", "file": "/projects/app.py"},
+    {"timestamp": "2024-01-02 11:00:00", "command": "pyinstaller --onefile app.py", "file": "/projects/app.py",
+     "status": "failed"},
+    {"timestamp": "2024-01-03 12:00:00", "command": "pyinstaller tool.py", "file": "/projects/tool.py",
+     "status": "success", "metrics": {"wall_time": 12.5, "artifact_size": 1024}}
+]
+def write_legacy(directory, entries=LEGACY_ENTRIES):
+    path = os.path.join(str(directory), LEGACY_HISTORY_FILE)
+    with open(path, "w") as f:
+        json.dump(entries, f)
+    return path
+def test_migrate_legacy_history(tmp_path):
+    legacy_path = write_legacy(tmp_path)
+    database = str(tmp_path / "build_history.db")
+    entries = load_history(database)
+    assert [entry["timestamp"] for entry in entries] == [entry["timestamp"] for entry in LEGACY_ENTRIES]
+    assert [entry["status"] for entry in entries] == ["success", "failed", "success"]
+    assert entries[2]["metrics"] == {"wall_time": 12.5, "artifact_size": 1024}
+    assert not os.path.exists(legacy_path)
+    assert os.path.exists(legacy_path + ".migrated")
+def test_migrate_legacy_history_is_idempotent(tmp_path):
+    legacy_path = write_legacy(tmp_path)
+    database = str(tmp_path / "build_history.db")
+    with HistoryStore(database) as store:
+        assert store.count() == len(LEGACY_ENTRIES)
+    # Файл вернулся (например, его не удалось переименовать или его восстановили из копии):
+    # записи не переносятся второй раз
+    shutil.copyfile(legacy_path + ".migrated", legacy_path)
+    with HistoryStore(database) as store:
+        assert store.count() == len(LEGACY_ENTRIES)
+        store.migrate_legacy_history()
+        assert store.count() == len(LEGACY_ENTRIES)
+    assert not os.path.exists(legacy_path)
+def test_new_entries_follow_migrated_ones(tmp_path):
+    write_legacy(tmp_path)
+    database = str(tmp_path / "build_history.db")
+    entry_id = add_history_entry("pyinstaller app.py", "/projects/app.py", path=database, status="skipped")
+    with HistoryStore(database) as store:
+        assert store.count() == len(LEGACY_ENTRIES) + 1
+        assert store.page(limit=1)[0]["id"] == entry_id
+        assert store.count(file_path="/projects/app.py") == 3
+        assert store.count(status="failed") == 1
+def test_unreadable_legacy_history_is_skipped(tmp_path):
+    legacy_path = os.path.join(str(tmp_path), LEGACY_HISTORY_FILE)
+    with open(legacy_path, "w") as f:
+        f.write("[{ не JSON")
+    database = str(tmp_path / "build_history.db")
+    with HistoryStore(database) as store:
+        assert store.count() == 0
+    assert os.path.exists(legacy_path + ".migrated")
+def test_no_legacy_history(tmp_path):
+    database = str(tmp_path / "build_history.db")
+    assert load_history(database) == []
+    assert not os.path.exists(os.path.join(str(tmp_path), LEGACY_HISTORY_FILE + ".migrated"))
+def test_search_treats_wildcards_literally(tmp_path):
+    database = str(tmp_path / "build_history.db")
+    for file_path in ("/projects/my_app.py", "/projects/myXapp.py", "/projects/100%.py", "/projects/1000.py",
+                      "C:\\projects\\app.py"):
+        add_history_entry(f"pyinstaller {file_path}", file_path, path=database)
+    with HistoryStore(database) as store:
+        assert [entry["file"] for entry in store.page(search="my_app")] == ["/projects/my_app.py"]
+        assert [entry["file"] for entry in store.page(search="100%")] == ["/projects/100%.py"]
+        assert store.count(search="\\projects\\") == 1
+        assert store.count(search="projects") == 5
@@ -0,0 +1,41 @@
+"""Шаги после сборки: ошибки копирования архива ресурсов не теряются"""
+import os
+from fitopybox.assets import external_archive_path, publish_assets
+from fitopybox.config import EXTERNAL_ASSETS, BuildConfig
+from fitopybox.fingerprint import is_up_to_date
+from fitopybox.pipeline import finish_build
+def make_external_build(root):
+    """Сборка onedir в режиме external с готовым архивом ресурсов в рабочей папке"""
+    config = BuildConfig(script=os.path.join(str(root), "app.py"), one_file=False, asset_mode=EXTERNAL_ASSETS,
+                         additional_files=["data.txt"], distpath=os.path.join(str(root), "dist"),
+                         workpath=os.path.join(str(root), "work"))
+    os.makedirs(os.path.dirname(config.asset_archive), exist_ok=True)
+    with open(config.asset_archive, "wb") as f:
+        f.write(b"assets")
+    return config
+def block_output_folder(config):
+    """Файл на месте папки сборки: копирование архива ресурсов завершится ошибкой"""
+    os.makedirs(os.path.dirname(os.path.dirname(config.artifact_path)), exist_ok=True)
+    with open(os.path.dirname(config.artifact_path), "w") as f:
+        f.write("")
+def test_publish_assets_copies_archive(tmp_path):
+    config = make_external_build(tmp_path)
+    target = publish_assets(config, on_line=lambda line: None)
+    assert target == external_archive_path(config)
+    with open(target, "rb") as f:
+        assert f.read() == b"assets"
+def test_publish_assets_reports_copy_error(tmp_path):
+    config = make_external_build(tmp_path)
+    block_output_folder(config)
+    lines = []
+    assert publish_assets(config, on_line=lines.append) is False
+    assert lines and lines[0].startswith("Ошибка копирования архива ресурсов")
+def test_finish_build_fails_when_assets_are_not_published(tmp_path):
+    config = make_external_build(tmp_path)
+    block_output_folder(config)
+    lines = []
+    status, metrics, _ = finish_build(config, "fingerprint", 0, {}, history=False, on_line=lines.append)
+    assert status == "failed"
+    assert metrics["exit_status"] != 0
+    assert any(line.startswith("Ошибка копирования архива ресурсов") for line in lines)
+    assert not is_up_to_date(config, "fingerprint")
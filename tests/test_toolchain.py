@@ -0,0 +1,59 @@
+"""Интерпретатор за pyinstaller из PATH: один PyInstaller для сборок с -O и без него"""
+import os
+import sys
+import pytest
+from fitopybox import fingerprint, toolchain
+from fitopybox.config import BuildConfig
+from fitopybox.fingerprint import toolchain_info
+from fitopybox.toolchain import path_interpreter, script_interpreter
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="сценарии запуска pip в Windows - exe-файлы")
+def write_script(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.chmod(path, 0o755)
+    return str(path)
+def test_script_interpreter_from_shebang(tmp_path):
+    script = write_script(tmp_path / "pyinstaller", f"#!{sys.executable}\nimport sys\n")
+    assert script_interpreter(script) == sys.executable
+def test_script_interpreter_from_shell_wrapper(tmp_path):
+    # Так pip записывает сценарий, если путь к интерпретатору слишком длинный для #!
+    script = write_script(tmp_path / "pyinstaller",
+                          f"#!/bin/sh\n'''exec' \"{sys.executable}\" \"$0\" \"$@\"\n' '''\nimport sys\n")
+    assert script_interpreter(script) == sys.executable
+def test_script_interpreter_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", os.path.dirname(sys.executable))
+    script = write_script(tmp_path / "pyinstaller", f"#!/usr/bin/env {os.path.basename(sys.executable)}\n")
+    assert os.path.samefile(script_interpreter(script), sys.executable)
+def test_optimized_build_uses_path_pyinstaller_interpreter(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    write_script(bin_dir / "pyinstaller", f"#!{sys.executable}\n")
+    monkeypatch.setenv("PATH", str(bin_dir))
+    monkeypatch.setattr(toolchain, "path_interpreters", {})
+    monkeypatch.setattr(toolchain, "path_lookups", {})
+    assert path_interpreter() == sys.executable
+    plain = BuildConfig(script=str(tmp_path / "app.py"))
+    optimized = BuildConfig(script=str(tmp_path / "app.py"), optimize=2)
+    assert plain.launcher() == ["pyinstaller"]
+    assert optimized.launcher() == [sys.executable, "-OO", "-m", "PyInstaller"]
+    # Отпечаток и ключ рабочей папки описывают тот же интерпретатор, которым идёт сборка
+    assert toolchain_info("")["executable"] == sys.executable
+def test_toolchain_info_is_memoized_until_site_packages_change(tmp_path, monkeypatch):
+    python = write_script(tmp_path / "python", "#!/bin/sh\n")
+    purelib = tmp_path / "site-packages"
+    purelib.mkdir()
+    probes = []
+    def toolchain_entry(executable):
+        probes.append(executable)
+        return {"python": "3.11.7", "pyinstaller": "6.3.0", "purelib": str(purelib),
+                "stamp": [toolchain.mtime(executable), toolchain.mtime(str(purelib))]}
+    monkeypatch.setattr(toolchain, "toolchain_entry", toolchain_entry)
+    monkeypatch.setattr(fingerprint, "toolchain_infos", {})
+    first = toolchain_info(python)
+    assert toolchain_info(python) == first
+    assert probes == [python]
+    # Установка пакета меняет mtime site-packages: сведения читаются заново
+    stat = os.stat(purelib)
+    os.utime(purelib, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert toolchain_info(python)["stamp"] != first["stamp"]
+    assert probes == [python, python]